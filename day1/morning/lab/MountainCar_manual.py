@@ -1,86 +1,133 @@
-import gymnasium as gym
-import pygame
-import time
+import argparse
 import os
+import sys
+
+import gymnasium as gym
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from rl_training.headless import add_headless_arguments, controller_from_args, report, run_controller
+from rl_training.lazy import require
+from rl_training.manual import mountain_car_controller, mountain_car_rating, push_energy
+from rl_training.profiling import NULL_PROFILER, Profiler
+from rl_training.realtime import LogSink, ManualControlLoop
+from rl_training.recording import RecordTrajectories
 
 # Remove the dummy video driver line to allow visible windows
 # os.environ['SDL_VIDEODRIVER'] = 'dummy'  # <-- This line was preventing windows from showing
 
-# Initialize pygame properly
-pygame.init()
-
-# Initialize environment with human rendering
-env = gym.make("MountainCar-v0", render_mode="human")
-obs, _ = env.reset()
-
-print("🎮 Manual Control Started!")
-print("Controls:")
-print("  ← Left Arrow  = Push car left")
-print("  → Right Arrow = Push car right") 
-print("  ↓ Down Arrow  = No action")
-print("  ESC or Close Window = Quit")
-print("=" * 40)
-
-# Map keys to actions
-KEY_TO_ACTION = {
-    pygame.K_LEFT: 0,   # Push left
-    pygame.K_DOWN: 1,   # Do nothing  
-    pygame.K_RIGHT: 2,  # Push right
-}
-
-clock = pygame.time.Clock()
-running = True
-action = 1  # Start with 'do nothing'
-
-try:
-    while running:
-        # Process events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    running = False
-
-        # Get currently pressed keys
-        keys = pygame.key.get_pressed()
-        
+
+def run_headless(num_episodes, controller, seed=None, verbose=False, record=None, profile=None):
+    """Run episodes without a window or frame-rate cap and report their metrics"""
+    env = gym.make("MountainCar-v0")
+    if record:
+        env = RecordTrajectories(env, record, seed=seed)
+    profiler = Profiler("MountainCar headless") if profile else NULL_PROFILER
+    try:
+        episodes = run_controller(
+            env, controller, num_episodes, energy=push_energy,
+            rating=lambda episode: mountain_car_rating(episode["terminated"]), seed=seed,
+            profiler=profiler
+        )
+    finally:
+        env.close()
+    report(episodes, verbose, controller)
+    if profile:
+        profiler.print_report()
+        profiler.save(profile)
+    return episodes
+
+
+def run_interactive(record=None, profile=None, physics_hz=None, render_fps=None):
+    """
+    Keyboard control in a window: physics at a fixed rate, rendering and
+    console output decoupled from it (see rl_training.realtime)
+    """
+    # Initialize pygame properly (imported here, so headless runs never load it)
+    pygame = require("pygame", "The interactive window")
+
+    pygame.init()
+
+    # The loop blits rgb_array frames itself, at its own rate
+    env = gym.make("MountainCar-v0", render_mode="rgb_array")
+    if record:
+        # Keep every transition of the session (each reset is seeded, so it can be replayed)
+        env = RecordTrajectories(env, record)
+        print(f"💾 Recording transitions to {record}")
+
+    print("🎮 Manual Control Started!")
+    print("Controls:")
+    print("  ← Left Arrow  = Push car left")
+    print("  → Right Arrow = Push car right") 
+    print("  ↓ Down Arrow  = No action")
+    print("  ESC or Close Window = Quit")
+    print("  R = Reset episode")
+    print("=" * 40)
+
+    # Where the loop's time goes (input / env.step / callbacks / render / idle)
+    profiler = Profiler("MountainCar interactive") if profile else NULL_PROFILER
+    log = LogSink()
+    loop = ManualControlLoop(env, physics_hz, render_fps, title="MountainCar", end_pause=2.0,
+                             log=log, profiler=profiler)
+
+    def select_action(keys):
         # Determine action based on keys
         if keys[pygame.K_LEFT]:
-            action = 0
-            print("🔄 Pushing LEFT")
+            return 0
         elif keys[pygame.K_RIGHT]:
-            action = 2
-            print("🔄 Pushing RIGHT")
-        else:
-            action = 1
-            # print("⭕ No action")  # Commented out to reduce spam
+            return 2
+        return 1
 
-        # Step in the environment
-        obs, reward, terminated, truncated, info = env.step(action)
+    def on_step(obs, reward, terminated, truncated, action):
+        if action == 0:
+            log("🔄 Pushing LEFT")
+        elif action == 2:
+            log("🔄 Pushing RIGHT")
+        # else: log("⭕ No action")  # Commented out to reduce spam
 
         # Print useful information
         position, velocity = obs
-        print(f"Position: {position:.3f}, Velocity: {velocity:.3f}, Reward: {reward}")
-
-        if terminated or truncated:
-            if terminated:
-                print("🎉 SUCCESS! You reached the goal!")
-            else:
-                print("⏰ Time limit reached. Try again!")
-            print("Episode finished. Resetting in 2 seconds...")
-            time.sleep(2)
-            obs, _ = env.reset()
-
-        # Control loop speed (30 FPS)
-        clock.tick(30)
-
-except KeyboardInterrupt:
-    print("\n🛑 Interrupted by user")
-except Exception as e:
-    print(f"❌ Error: {e}")
-finally:
-    print("🔚 Closing environment...")
-    env.close()
-    pygame.quit()
-    print("✅ Cleanup complete!")
+        log(f"Position: {position:.3f}, Velocity: {velocity:.3f}, Reward: {reward}")
+
+    def on_episode_end(terminated, truncated):
+        if terminated:
+            outcome = "🎉 SUCCESS! You reached the goal!"
+        else:
+            outcome = "⏰ Time limit reached. Try again!"
+        log(outcome, "Episode finished. Resetting in 2 seconds... (Press R to reset immediately)", force=True)
+
+    def on_reset(manual):
+        if manual:
+            log("🔄 Manual reset requested", force=True)
+
+    try:
+        loop.run(select_action, on_step, on_episode_end, on_reset, initial_action=1)
+
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted by user")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    finally:
+        log.close()
+        print("🔚 Closing environment...")
+        loop.print_report()
+        if profile:
+            profiler.print_report()
+            profiler.save(profile)
+        env.close()
+        pygame.quit()
+        print("✅ Cleanup complete!")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MountainCar manual control")
+    add_headless_arguments(parser)
+    args = parser.parse_args()
+    if args.headless:
+        run_headless(args.episodes, controller_from_args(args, mountain_car_controller, 1, env_id="MountainCar-v0"),
+                     args.seed, args.verbose, args.record, args.profile)
+    else:
+        run_interactive(args.record, args.profile, args.physics_hz, args.render_fps)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,100 +1,121 @@
-import gymnasium as gym
-import pygame
-import time
+import argparse
 import os
+import sys
+
+import gymnasium as gym
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from rl_training.headless import add_headless_arguments, controller_from_args, report, run_controller
+from rl_training.lazy import require
+from rl_training.manual import engine_energy, lander_controller, lander_rating
+from rl_training.profiling import NULL_PROFILER, Profiler
+from rl_training.realtime import LogSink, ManualControlLoop
+from rl_training.recording import RecordTrajectories
+
+
+def run_headless(num_episodes, controller, seed=None, verbose=False, record=None, profile=None):
+    """Run episodes without a window or frame-rate cap and report their metrics"""
+    env = gym.make("LunarLander-v3")
+    if record:
+        env = RecordTrajectories(env, record, seed=seed)
+    profiler = Profiler("LunarLander headless") if profile else NULL_PROFILER
+    try:
+        episodes = run_controller(
+            env, controller, num_episodes, energy=engine_energy,
+            rating=lambda episode: lander_rating(episode["total_reward"]), seed=seed,
+            profiler=profiler
+        )
+    finally:
+        env.close()
+    report(episodes, verbose)
+    if profile:
+        profiler.print_report()
+        profiler.save(profile)
+    return episodes
+
+
+def run_interactive(record=None, profile=None, physics_hz=None, render_fps=None):
+    """
+    Keyboard control in a window: physics at a fixed rate, rendering and
+    console output decoupled from it (see rl_training.realtime)
+    """
+    # Initialize pygame properly (imported here, so headless runs never load it)
+    pygame = require("pygame", "The interactive window")
+
+    pygame.init()
+
+    # The loop blits rgb_array frames itself, at its own rate
+    env = gym.make("LunarLander-v3", render_mode="rgb_array")
+    if record:
+        # Keep every transition of the session (each reset is seeded, so it can be replayed)
+        env = RecordTrajectories(env, record)
+        print(f"💾 Recording transitions to {record}")
+
+    print("🚀 LunarLander Manual Control Started!")
+    print("Goal: Land the spacecraft safely between the flags!")
+    print("Controls:")
+    print("  ← Left Arrow  = Fire left engine (rotate right)")
+    print("  → Right Arrow = Fire right engine (rotate left)")
+    print("  ↑ Up Arrow    = Fire main engine (thrust up)")
+    print("  ↓ Down Arrow  = Do nothing")
+    print("  ESC or Close Window = Quit")
+    print("  R = Reset episode")
+    print("=" * 50)
+    print("💡 Tips:")
+    print("  - Use main engine to slow descent")
+    print("  - Use side engines to control rotation and horizontal movement")
+    print("  - Land gently between the yellow flags!")
+    print("  - Legs must touch ground first for safe landing")
+    print("=" * 50)
+
+    action = 0  # Start with 'do nothing'
+    obs = None
+    step_count = 0
+    episode_count = 1
+    total_reward = 0
+    # Where the loop's time goes (input / env.step / callbacks / render / idle)
+    profiler = Profiler("LunarLander interactive") if profile else NULL_PROFILER
+    log = LogSink()
+    loop = ManualControlLoop(env, physics_hz, render_fps, title="LunarLander", end_pause=3.0,
+                             log=log, profiler=profiler)
 
-# Initialize pygame properly
-pygame.init()
-
-# Initialize environment with human rendering
-env = gym.make("LunarLander-v3", render_mode="human")
-obs, _ = env.reset()
-
-print("🚀 LunarLander Manual Control Started!")
-print("Goal: Land the spacecraft safely between the flags!")
-print("Controls:")
-print("  ← Left Arrow  = Fire left engine (rotate right)")
-print("  → Right Arrow = Fire right engine (rotate left)")
-print("  ↑ Up Arrow    = Fire main engine (thrust up)")
-print("  ↓ Down Arrow  = Do nothing")
-print("  ESC or Close Window = Quit")
-print("  R = Reset episode")
-print("=" * 50)
-print("💡 Tips:")
-print("  - Use main engine to slow descent")
-print("  - Use side engines to control rotation and horizontal movement")
-print("  - Land gently between the yellow flags!")
-print("  - Legs must touch ground first for safe landing")
-print("=" * 50)
-
-# Map keys to actions for LunarLander
-# LunarLander actions: 0=nothing, 1=fire left, 2=fire main, 3=fire right
-KEY_TO_ACTION = {
-    pygame.K_DOWN: 0,   # Do nothing
-    pygame.K_LEFT: 1,   # Fire left engine
-    pygame.K_UP: 2,     # Fire main engine
-    pygame.K_RIGHT: 3,  # Fire right engine
-}
-
-clock = pygame.time.Clock()
-running = True
-action = 0  # Start with 'do nothing'
-step_count = 0
-episode_count = 1
-total_reward = 0
-
-try:
-    while running:
-        # Process events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    running = False
-                elif event.key == pygame.K_r:
-                    print("🔄 Manual reset requested")
-                    obs, _ = env.reset()
-                    step_count = 0
-                    total_reward = 0
-                    episode_count += 1
-                    print(f"🆕 Episode {episode_count} started")
-
-        # Get currently pressed keys
-        keys = pygame.key.get_pressed()
-        
+    def select_action(keys):
+        nonlocal action
         # Determine action based on keys (allow multiple keys)
+        # LunarLander actions: 0=nothing, 1=fire left, 2=fire main, 3=fire right
         old_action = action
         if keys[pygame.K_UP]:
             action = 2  # Main engine has priority
             if old_action != action:
-                print("🚀 MAIN ENGINE FIRING!")
+                log("🚀 MAIN ENGINE FIRING!")
         elif keys[pygame.K_LEFT]:
             action = 1
             if old_action != action:
-                print("🔥 LEFT ENGINE FIRING!")
+                log("🔥 LEFT ENGINE FIRING!")
         elif keys[pygame.K_RIGHT]:
             action = 3
             if old_action != action:
-                print("🔥 RIGHT ENGINE FIRING!")
+                log("🔥 RIGHT ENGINE FIRING!")
         else:
             action = 0
             if old_action != action and old_action != 0:
-                print("⭕ Engines off")
+                log("⭕ Engines off")
+        return action
 
-        # Step in the environment
-        obs, reward, terminated, truncated, info = env.step(action)
+    def on_step(next_obs, reward, terminated, truncated, action):
+        nonlocal obs, step_count, total_reward
+        obs = next_obs
         step_count += 1
         total_reward += reward
 
         # Extract observation values (LunarLander has 8 observation values)
         x_pos, y_pos, x_vel, y_vel, angle, angular_vel, left_leg, right_leg = obs
-        
+
         # Print status every 20 steps or on important events
         if step_count % 20 == 0 or terminated or truncated or abs(reward) > 10:
-            print(f"Step {step_count:3d} | X: {x_pos:6.2f} | Y: {y_pos:6.2f} | "
-                  f"Vel: ({x_vel:5.2f},{y_vel:5.2f}) | Angle: {angle:5.2f} | "
-                  f"Reward: {reward:6.1f} | Total: {total_reward:6.1f}")
+            log(f"Step {step_count:3d} | X: {x_pos:6.2f} | Y: {y_pos:6.2f} | "
+                f"Vel: ({x_vel:5.2f},{y_vel:5.2f}) | Angle: {angle:5.2f} | "
+                f"Reward: {reward:6.1f} | Total: {total_reward:6.1f}", force=terminated or truncated)
 
         # Give feedback on landing legs
         if left_leg or right_leg:
@@ -104,79 +125,77 @@ try:
                     legs_status.append("LEFT")
                 if right_leg:
                     legs_status.append("RIGHT")
-                print(f"🦵 Landing legs touching: {', '.join(legs_status)}")
-
-        # Check for episode end
-        if terminated or truncated:
-            print("\n" + "="*50)
-            if terminated:
-                if total_reward >= 200:
-                    print("🎉 EXCELLENT LANDING! Perfect score!")
-                elif total_reward >= 100:
-                    print("🎉 SUCCESSFUL LANDING! Well done!")
-                elif total_reward >= 0:
-                    print("👍 SAFE LANDING! Could be smoother, but good job!")
-                elif total_reward >= -100:
-                    print("💥 ROUGH LANDING! You survived but damaged the lander.")
-                else:
-                    print("💥 CRASH! The lander was destroyed.")
-            else:
-                print("⏰ Time limit reached!")
-            
-            print(f"📊 Episode {episode_count} Results:")
-            print(f"   Final Score: {total_reward:.1f}")
-            print(f"   Steps taken: {step_count}")
-            print(f"   Final position: ({x_pos:.2f}, {y_pos:.2f})")
-            print(f"   Final velocity: ({x_vel:.2f}, {y_vel:.2f})")
-            
-            # Scoring breakdown
+                log(f"🦵 Landing legs touching: {', '.join(legs_status)}")
+
+    def on_episode_end(terminated, truncated):
+        x_pos, y_pos, x_vel, y_vel = obs[:4]
+        lines = ["\n" + "=" * 50]
+        if terminated:
             if total_reward >= 200:
-                print("🏆 RATING: EXPERT PILOT")
+                lines.append("🎉 EXCELLENT LANDING! Perfect score!")
             elif total_reward >= 100:
-                print("🥇 RATING: SKILLED PILOT") 
+                lines.append("🎉 SUCCESSFUL LANDING! Well done!")
             elif total_reward >= 0:
-                print("🥈 RATING: COMPETENT PILOT")
+                lines.append("👍 SAFE LANDING! Could be smoother, but good job!")
             elif total_reward >= -100:
-                print("🥉 RATING: NOVICE PILOT")
+                lines.append("💥 ROUGH LANDING! You survived but damaged the lander.")
             else:
-                print("💀 RATING: NEEDS MORE PRACTICE")
-            
-            print("="*50)
-            print("🔄 Resetting in 3 seconds... (Press R to reset immediately)")
-            
-            # Wait for reset or user input
-            start_time = time.time()
-            reset_now = False
-            while time.time() - start_time < 3 and not reset_now:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        running = False
-                        reset_now = True
-                    elif event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_ESCAPE:
-                            running = False
-                            reset_now = True
-                        elif event.key == pygame.K_r:
-                            reset_now = True
-                
-                clock.tick(60)  # Check events frequently during wait
-            
-            if running:
-                obs, _ = env.reset()
-                step_count = 0
-                total_reward = 0
-                episode_count += 1
-                print(f"🆕 Episode {episode_count} started")
-
-        # Control frame rate
-        clock.tick(30)  # 30 FPS for smooth control
-
-except KeyboardInterrupt:
-    print("\n🛑 Interrupted by user (Ctrl+C)")
-except Exception as e:
-    print(f"❌ Runtime error: {e}")
-finally:
-    print("🔚 Closing environment...")
-    env.close()
-    pygame.quit()
-    print("✅ Cleanup complete!")
+                lines.append("💥 CRASH! The lander was destroyed.")
+        else:
+            lines.append("⏰ Time limit reached!")
+
+        # Scoring breakdown
+        rating, _ = lander_rating(total_reward)
+        icon, title = rating.split(" ", 1)
+        lines += [
+            f"📊 Episode {episode_count} Results:",
+            f"   Final Score: {total_reward:.1f}",
+            f"   Steps taken: {step_count}",
+            f"   Final position: ({x_pos:.2f}, {y_pos:.2f})",
+            f"   Final velocity: ({x_vel:.2f}, {y_vel:.2f})",
+            f"{icon} RATING: {title}",
+            "=" * 50,
+            "🔄 Resetting in 3 seconds... (Press R to reset immediately)",
+        ]
+        log(*lines, force=True)
+
+    def on_reset(manual):
+        nonlocal step_count, total_reward, episode_count
+        step_count = 0
+        total_reward = 0
+        episode_count += 1
+        lines = ["🔄 Manual reset requested"] if manual else []
+        log(*lines, f"🆕 Episode {episode_count} started", force=True)
+
+    try:
+        loop.run(select_action, on_step, on_episode_end, on_reset, initial_action=action)
+
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted by user (Ctrl+C)")
+    except Exception as e:
+        print(f"❌ Runtime error: {e}")
+    finally:
+        log.close()
+        print("🔚 Closing environment...")
+        loop.print_report()
+        if profile:
+            profiler.print_report()
+            profiler.save(profile)
+        env.close()
+        pygame.quit()
+        print("✅ Cleanup complete!")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LunarLander manual control")
+    add_headless_arguments(parser)
+    args = parser.parse_args()
+    if args.headless:
+        run_headless(args.episodes, controller_from_args(args, lander_controller, 0),
+                     args.seed, args.verbose, args.record, args.profile)
+    else:
+        run_interactive(args.record, args.profile, args.physics_hz, args.render_fps)
+
+
+if __name__ == "__main__":
+    main()
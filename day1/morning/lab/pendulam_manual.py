@@ -1,108 +1,101 @@
+import argparse
+import os
+import sys
+
 import gymnasium as gym
-import pygame
-import time
-import math
 import numpy as np
 
-# Initialize pygame properly
-pygame.init()
-
-# Initialize environment with human rendering
-env = gym.make("Pendulum-v1", render_mode="human")
-obs, _ = env.reset()
-
-print("🎯 Pendulum Manual Control Started!")
-print("Goal: Keep the pendulum upright with minimal effort!")
-print("Controls:")
-print("  ← Left Arrow  = Apply COUNTER-CLOCKWISE torque")
-print("  → Right Arrow = Apply CLOCKWISE torque")
-print("  ↑ Up Arrow    = Apply STRONG torque (current direction)")
-print("  ↓ Down Arrow  = Apply WEAK torque (current direction)")
-print("  SPACE         = No torque (let it swing)")
-print("  ESC or Close Window = Quit")
-print("  R = Reset episode")
-print("=" * 60)
-print("💡 Tips:")
-print("  - Goal: Keep pendulum pointing UP (12 o'clock)")
-print("  - Minimize energy usage for better scores")
-print("  - Smooth control works better than jerky movements")
-print("  - Negative rewards mean you want to maximize score (closer to 0)")
-print("  - Best possible score per step is around -0.1")
-print("=" * 60)
-
-clock = pygame.time.Clock()
-running = True
-torque = 0.0  # Continuous action
-step_count = 0
-episode_count = 1
-total_reward = 0
-energy_used = 0
-max_torque = 2.0  # Pendulum max torque
-best_score = float('-inf')  # Track best score (least negative)
-
-def get_pendulum_status(cos_theta, sin_theta):
-    """Get pendulum status description"""
-    # Calculate angle from upright position
-    angle = math.atan2(sin_theta, cos_theta)
-    angle_deg = math.degrees(angle)
-    
-    # Normalize angle to [-180, 180]
-    while angle_deg > 180:
-        angle_deg -= 360
-    while angle_deg < -180:
-        angle_deg += 360
-    
-    if abs(angle_deg) < 10:
-        return "🟢 UPRIGHT", "Excellent!", angle_deg
-    elif abs(angle_deg) < 30:
-        return "🟡 NEAR UP", "Close!", angle_deg
-    elif abs(angle_deg) < 60:
-        return "🟠 TILTED", "Needs correction", angle_deg
-    elif abs(angle_deg) < 120:
-        return "🔴 SIDEWAYS", "Far from target", angle_deg
-    else:
-        return "🔵 HANGING", "Upside down", angle_deg
-
-def get_performance_rating(avg_reward):
-    """Rate performance based on average reward"""
-    if avg_reward > -0.5:
-        return "🏆 EXPERT", "Outstanding control!"
-    elif avg_reward > -1.0:
-        return "🥇 ADVANCED", "Excellent performance!"
-    elif avg_reward > -2.0:
-        return "🥈 INTERMEDIATE", "Good control!"
-    elif avg_reward > -5.0:
-        return "🥉 BEGINNER", "Learning well!"
-    else:
-        return "🔰 NOVICE", "Keep practicing!"
-
-try:
-    print(f"🆕 Episode {episode_count} started")
-    
-    while running:
-        # Process events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    running = False
-                elif event.key == pygame.K_r:
-                    print("🔄 Manual reset requested")
-                    obs, _ = env.reset()
-                    step_count = 0
-                    total_reward = 0
-                    energy_used = 0
-                    episode_count += 1
-                    print(f"🆕 Episode {episode_count} started")
-
-        # Get currently pressed keys
-        keys = pygame.key.get_pressed()
-        
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from rl_training.headless import add_headless_arguments, controller_from_args, report, run_controller
+from rl_training.lazy import require
+from rl_training.manual import (
+    PENDULUM_EPISODE_STEPS,
+    get_pendulum_status,
+    pendulum_controller,
+    pendulum_rating,
+    torque_energy,
+)
+from rl_training.profiling import NULL_PROFILER, Profiler
+from rl_training.realtime import LogSink, ManualControlLoop
+from rl_training.recording import RecordTrajectories
+
+
+def run_headless(num_episodes, controller, seed=None, verbose=False, record=None, profile=None):
+    """Run episodes without a window or frame-rate cap and report their metrics"""
+    env = gym.make("Pendulum-v1", max_episode_steps=PENDULUM_EPISODE_STEPS)
+    if record:
+        env = RecordTrajectories(env, record, seed=seed)
+    profiler = Profiler("Pendulum headless") if profile else NULL_PROFILER
+    try:
+        episodes = run_controller(
+            env, controller, num_episodes, energy=torque_energy,
+            rating=lambda episode: pendulum_rating(episode["avg_reward"]), seed=seed,
+            profiler=profiler
+        )
+    finally:
+        env.close()
+    report(episodes, verbose, controller)
+    if profile:
+        profiler.print_report()
+        profiler.save(profile)
+    return episodes
+
+
+def run_interactive(record=None, profile=None, physics_hz=None, render_fps=None):
+    """
+    Keyboard control in a window: physics at a fixed rate, rendering and
+    console output decoupled from it (see rl_training.realtime)
+    """
+    # Initialize pygame properly (imported here, so headless runs never load it)
+    pygame = require("pygame", "The interactive window")
+
+    pygame.init()
+
+    # The loop blits rgb_array frames itself, at its own rate
+    env = gym.make("Pendulum-v1", render_mode="rgb_array", max_episode_steps=PENDULUM_EPISODE_STEPS)
+    if record:
+        # Keep every transition of the session (each reset is seeded, so it can be replayed)
+        env = RecordTrajectories(env, record)
+        print(f"💾 Recording transitions to {record}")
+
+    print("🎯 Pendulum Manual Control Started!")
+    print("Goal: Keep the pendulum upright with minimal effort!")
+    print("Controls:")
+    print("  ← Left Arrow  = Apply COUNTER-CLOCKWISE torque")
+    print("  → Right Arrow = Apply CLOCKWISE torque")
+    print("  ↑ Up Arrow    = Apply STRONG torque (current direction)")
+    print("  ↓ Down Arrow  = Apply WEAK torque (current direction)")
+    print("  SPACE         = No torque (let it swing)")
+    print("  ESC or Close Window = Quit")
+    print("  R = Reset episode")
+    print("=" * 60)
+    print("💡 Tips:")
+    print("  - Goal: Keep pendulum pointing UP (12 o'clock)")
+    print("  - Minimize energy usage for better scores")
+    print("  - Smooth control works better than jerky movements")
+    print("  - Negative rewards mean you want to maximize score (closer to 0)")
+    print("  - Best possible score per step is around -0.1")
+    print("=" * 60)
+
+    max_torque = 2.0  # Pendulum max torque
+    torque = 0.0  # Continuous action
+    step_count = 0
+    episode_count = 1
+    total_reward = 0
+    energy_used = 0
+    best_score = float('-inf')  # Track best score (least negative)
+    # Where the loop's time goes (input / env.step / callbacks / render / idle)
+    profiler = Profiler("Pendulum interactive") if profile else NULL_PROFILER
+    log = LogSink()
+    loop = ManualControlLoop(env, physics_hz, render_fps, title="Pendulum", end_pause=3.0,
+                             log=log, profiler=profiler)
+
+    def select_action(keys):
+        nonlocal torque
         # Determine torque based on keys (continuous action)
         old_torque = torque
         base_torque = 1.0
-        
+
         if keys[pygame.K_LEFT]:
             if keys[pygame.K_UP]:
                 torque = -max_torque  # Strong counter-clockwise
@@ -121,154 +114,166 @@ try:
             torque = 0.0  # No torque
         else:
             torque = 0.0  # Default to no torque
-        
+
         # Print torque changes
         if abs(torque - old_torque) > 0.1:
             if torque > 1.5:
-                print(f"💪 STRONG CLOCKWISE torque: {torque:.1f}")
+                log(f"💪 STRONG CLOCKWISE torque: {torque:.1f}")
             elif torque > 0.1:
-                print(f"🔄 Clockwise torque: {torque:.1f}")
+                log(f"🔄 Clockwise torque: {torque:.1f}")
             elif torque < -1.5:
-                print(f"💪 STRONG COUNTER-CLOCKWISE torque: {torque:.1f}")
+                log(f"💪 STRONG COUNTER-CLOCKWISE torque: {torque:.1f}")
             elif torque < -0.1:
-                print(f"🔄 Counter-clockwise torque: {torque:.1f}")
+                log(f"🔄 Counter-clockwise torque: {torque:.1f}")
             else:
-                print("⭕ NO TORQUE - Free swing")
+                log("⭕ NO TORQUE - Free swing")
 
-        # Step in the environment
-        action = np.array([torque])  # Pendulum expects array
-        obs, reward, terminated, truncated, info = env.step(action)
+        return np.array([torque])  # Pendulum expects array
+
+    def on_step(obs, reward, terminated, truncated, action):
+        nonlocal step_count, total_reward, energy_used, best_score
         step_count += 1
         total_reward += reward
-        energy_used += abs(torque) * 0.1  # Track energy usage
+        energy_used += torque_energy(action)  # Track energy usage
 
         # Extract observation values
         cos_theta, sin_theta, angular_velocity = obs
-        
+
         # Get pendulum status
         status, description, angle_deg = get_pendulum_status(cos_theta, sin_theta)
-        
+
         # Print detailed status every 20 steps or when near upright
         if step_count % 20 == 0 or abs(angle_deg) < 15:
             avg_reward = total_reward / step_count
-            print(f"\n📊 Step {step_count:3d} | Reward: {reward:6.2f} | Avg: {avg_reward:6.2f}")
-            print(f"   Angle: {angle_deg:6.1f}° | Velocity: {angular_velocity:6.2f} | {status}")
-            print(f"   Energy Used: {energy_used:5.1f} | Current Torque: {torque:5.1f}")
-            
+            log(f"\n📊 Step {step_count:3d} | Reward: {reward:6.2f} | Avg: {avg_reward:6.2f}",
+                f"   Angle: {angle_deg:6.1f}° | Velocity: {angular_velocity:6.2f} | {status}",
+                f"   Energy Used: {energy_used:5.1f} | Current Torque: {float(action[0]):5.1f}")
+
             # Give strategic advice
             if abs(angle_deg) > 30:
                 if angle_deg > 0:
-                    print("   💡 Pendulum tilted RIGHT - try COUNTER-CLOCKWISE torque (←)")
+                    log("   💡 Pendulum tilted RIGHT - try COUNTER-CLOCKWISE torque (←)")
                 else:
-                    print("   💡 Pendulum tilted LEFT - try CLOCKWISE torque (→)")
+                    log("   💡 Pendulum tilted LEFT - try CLOCKWISE torque (→)")
             elif abs(angular_velocity) > 2:
                 if angular_velocity > 0:
-                    print("   💡 Spinning CLOCKWISE fast - apply COUNTER-CLOCKWISE to slow (←)")
+                    log("   💡 Spinning CLOCKWISE fast - apply COUNTER-CLOCKWISE to slow (←)")
                 else:
-                    print("   💡 Spinning COUNTER-CLOCKWISE fast - apply CLOCKWISE to slow (→)")
+                    log("   💡 Spinning COUNTER-CLOCKWISE fast - apply CLOCKWISE to slow (→)")
             elif abs(angle_deg) < 10:
-                print("   🎯 Great! Near upright - use gentle corrections")
+                log("   🎯 Great! Near upright - use gentle corrections")
 
         # Celebrate good performance
         if reward > -0.2 and step_count % 50 == 0:
-            print("🎉 Excellent control! Maintaining upright position!")
-        
+            log("🎉 Excellent control! Maintaining upright position!")
+
         # Track best performance
-        if step_count > 0:
-            current_avg = total_reward / step_count
-            if current_avg > best_score:
-                best_score = current_avg
-
-        # Pendulum doesn't naturally terminate, so we'll run episodes of 500 steps
-        if step_count >= 500:
-            print("\n" + "="*70)
-            print(f"🏁 EPISODE {episode_count} COMPLETE! (500 steps)")
-            
-            avg_reward = total_reward / step_count
-            rating, rating_desc = get_performance_rating(avg_reward)
-            
-            print(f"\n📈 EPISODE RESULTS:")
-            print(f"   Total Reward: {total_reward:.1f}")
-            print(f"   Average Reward: {avg_reward:.3f}")
-            print(f"   Energy Used: {energy_used:.1f}")
-            print(f"   Efficiency: {avg_reward/max(energy_used, 1):.4f} (reward/energy)")
-            print(f"   Performance: {rating} - {rating_desc}")
-            
-            # Detailed analysis
-            print(f"\n🔍 PERFORMANCE ANALYSIS:")
-            if avg_reward > -0.5:
-                print("   🎯 Outstanding! You kept the pendulum very stable!")
-            elif avg_reward > -1.0:
-                print("   👍 Great job! Solid pendulum control!")
-            elif avg_reward > -2.0:
-                print("   📈 Good progress! You're getting the hang of it!")
-            else:
-                print("   💪 Keep practicing! Try smoother, smaller corrections!")
-            
-            if energy_used < 50:
-                print("   ⚡ Excellent energy efficiency!")
-            elif energy_used < 100:
-                print("   ⚡ Good energy management!")
-            else:
-                print("   ⚡ Try using less torque for better efficiency!")
-            
-            print(f"   🏆 Session Best Average: {best_score:.3f}")
-            print("="*70)
-            print("🔄 Starting new episode in 3 seconds... (Press R to start immediately)")
-            
-            # Wait for reset or user input
-            start_time = time.time()
-            reset_now = False
-            while time.time() - start_time < 3 and not reset_now:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        running = False
-                        reset_now = True
-                    elif event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_ESCAPE:
-                            running = False
-                            reset_now = True
-                        elif event.key == pygame.K_r:
-                            reset_now = True
-                
-                clock.tick(60)
-            
-            if running:
-                obs, _ = env.reset()
-                step_count = 0
-                total_reward = 0
-                energy_used = 0
-                episode_count += 1
-                print(f"🆕 Episode {episode_count} started - Beat your best: {best_score:.3f}")
-
-        # Control frame rate
-        clock.tick(50)  # 50 FPS for smooth continuous control
-
-except KeyboardInterrupt:
-    print("\n🛑 Interrupted by user (Ctrl+C)")
-except Exception as e:
-    print(f"❌ Runtime error: {e}")
-finally:
-    print("🔚 Closing environment...")
-    print(f"\n🏆 SESSION SUMMARY:")
-    print(f"   Episodes completed: {episode_count}")
-    print(f"   Best average reward: {best_score:.3f}")
-    
-    if best_score > -0.5:
-        print("   🎉 Outstanding session! You mastered pendulum control!")
-    elif best_score > -1.0:
-        print("   👏 Excellent session! Great pendulum skills!")
-    elif best_score > -2.0:
-        print("   👍 Good session! You're improving steadily!")
+        current_avg = total_reward / step_count
+        if current_avg > best_score:
+            best_score = current_avg
+
+    def on_episode_end(terminated, truncated):
+        # Pendulum doesn't naturally terminate: episodes are cut at PENDULUM_EPISODE_STEPS
+        avg_reward = total_reward / step_count
+        rating, rating_desc = pendulum_rating(avg_reward)
+        lines = [
+            "\n" + "=" * 70,
+            f"🏁 EPISODE {episode_count} COMPLETE! ({step_count} steps)",
+            f"\n📈 EPISODE RESULTS:",
+            f"   Total Reward: {total_reward:.1f}",
+            f"   Average Reward: {avg_reward:.3f}",
+            f"   Energy Used: {energy_used:.1f}",
+            f"   Efficiency: {avg_reward/max(energy_used, 1):.4f} (reward/energy)",
+            f"   Performance: {rating} - {rating_desc}",
+            f"\n🔍 PERFORMANCE ANALYSIS:",
+        ]
+
+        # Detailed analysis
+        if avg_reward > -0.5:
+            lines.append("   🎯 Outstanding! You kept the pendulum very stable!")
+        elif avg_reward > -1.0:
+            lines.append("   👍 Great job! Solid pendulum control!")
+        elif avg_reward > -2.0:
+            lines.append("   📈 Good progress! You're getting the hang of it!")
+        else:
+            lines.append("   💪 Keep practicing! Try smoother, smaller corrections!")
+
+        if energy_used < 50:
+            lines.append("   ⚡ Excellent energy efficiency!")
+        elif energy_used < 100:
+            lines.append("   ⚡ Good energy management!")
+        else:
+            lines.append("   ⚡ Try using less torque for better efficiency!")
+
+        lines += [
+            f"   🏆 Session Best Average: {best_score:.3f}",
+            "=" * 70,
+            "🔄 Starting new episode in 3 seconds... (Press R to start immediately)",
+        ]
+        log(*lines, force=True)
+
+    def on_reset(manual):
+        nonlocal step_count, total_reward, energy_used, episode_count
+        step_count = 0
+        total_reward = 0
+        energy_used = 0
+        episode_count += 1
+        if manual:
+            log("🔄 Manual reset requested", f"🆕 Episode {episode_count} started", force=True)
+        else:
+            log(f"🆕 Episode {episode_count} started - Beat your best: {best_score:.3f}", force=True)
+
+    try:
+        print(f"🆕 Episode {episode_count} started")
+        loop.run(select_action, on_step, on_episode_end, on_reset, initial_action=np.array([torque]))
+
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted by user (Ctrl+C)")
+    except Exception as e:
+        print(f"❌ Runtime error: {e}")
+    finally:
+        log.close()
+        print("🔚 Closing environment...")
+        print(f"\n🏆 SESSION SUMMARY:")
+        print(f"   Episodes completed: {episode_count}")
+        print(f"   Best average reward: {best_score:.3f}")
+
+        if best_score > -0.5:
+            print("   🎉 Outstanding session! You mastered pendulum control!")
+        elif best_score > -1.0:
+            print("   👏 Excellent session! Great pendulum skills!")
+        elif best_score > -2.0:
+            print("   👍 Good session! You're improving steadily!")
+        else:
+            print("   💪 Keep practicing! Pendulum control takes time to master!")
+
+        print("\n💡 REMEMBER:")
+        print("   - Smooth, small corrections work better than big movements")
+        print("   - Try to anticipate the pendulum's motion")
+        print("   - Less energy usage = better scores")
+        print("   - Practice makes perfect!")
+
+        loop.print_report()
+        if profile:
+            profiler.print_report()
+            profiler.save(profile)
+
+        env.close()
+        pygame.quit()
+        print("✅ Cleanup complete!")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pendulum manual control")
+    add_headless_arguments(parser)
+    args = parser.parse_args()
+    if args.headless:
+        controller = controller_from_args(args, pendulum_controller, np.zeros(1, dtype=np.float32),
+                                          env_id="Pendulum-v1")
+        run_headless(args.episodes, controller, args.seed, args.verbose, args.record, args.profile)
     else:
-        print("   💪 Keep practicing! Pendulum control takes time to master!")
-    
-    print("\n💡 REMEMBER:")
-    print("   - Smooth, small corrections work better than big movements")
-    print("   - Try to anticipate the pendulum's motion")
-    print("   - Less energy usage = better scores")
-    print("   - Practice makes perfect!")
-    
-    env.close()
-    pygame.quit()
-    print("✅ Cleanup complete!")
+        run_interactive(args.record, args.profile, args.physics_hz, args.render_fps)
+
+
+if __name__ == "__main__":
+    main()
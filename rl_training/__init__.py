@@ -0,0 +1,75 @@
+"""
+Reusable building blocks for the workshop notebooks and lab scripts.
+
+Every name below is imported from its submodule on first access, so
+``import rl_training`` (and ``import rl_training.<module>``, which runs this
+file first) costs nothing until something is used::
+
+    from rl_training import ValueIteration, extract_transition_model
+    from rl_training.dp import ValueIteration  # same object
+
+Submodules only import NumPy and gymnasium at the top level; see
+``rl_training.lazy`` for the optional dependencies and the startup budget.
+"""
+
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    # Tabular MDP tools
+    "CSRMatrix": "models",
+    "SparseTransitionModel": "models",
+    "extract_transition_model": "models",
+    "ModelCache": "cache",
+    "cached_solution": "cache",
+    "cached_transition_model": "cache",
+    # Dynamic programming
+    "BellmanEngine": "dp",
+    "PolicyEvaluator": "dp",
+    "PolicyImprover": "dp",
+    "PolicyIteration": "dp",
+    "ValueIteration": "dp",
+    "BatchedBellmanEngine": "batched_dp",
+    "BatchedPolicyIteration": "batched_dp",
+    "BatchedValueIteration": "batched_dp",
+    # Tables and policies
+    "QTable": "tabular",
+    "StateIndexer": "tabular",
+    "TabularPolicy": "tabular",
+    "VTable": "tabular",
+    # Monte Carlo and TD learners
+    "constant_alpha_monte_carlo_control": "monte_carlo",
+    "every_visit_monte_carlo_control": "monte_carlo",
+    "extract_policy": "monte_carlo",
+    "monte_carlo_evaluation": "monte_carlo",
+    "test_policy": "monte_carlo",
+    "expected_sarsa": "td",
+    "q_learning": "td",
+    "sarsa": "td",
+    "td_control": "td",
+    # Dynamics models and model-predictive control
+    "MountainCarDynamics": "dynamics",
+    "PendulumDynamics": "dynamics",
+    "MPCController": "mpc",
+    "mpc_controller": "mpc",
+    # Experience replay
+    "ReplayBuffer": "replay",
+    "SumTree": "replay",
+    # Manual-control helpers
+    "get_pendulum_status": "manual",
+    "get_performance_rating": "manual",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{_EXPORTS[name]}"), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,508 @@
+"""
+Value and policy iteration for many tabular MDPs at once.
+
+Sensitivity studies solve the same algorithm over many FrozenLake layouts,
+slipperiness settings and discount factors. ``BatchedBellmanEngine`` stacks
+B models into one set of arrays so that a Bellman sweep over all of them is
+a single NumPy contraction:
+
+- dense models of one shape are stacked into a ``[B, S, A, S]`` tensor and
+  swept with one batched matrix-vector product;
+- anything else (sparse models, different map sizes) is laid out as one
+  block-diagonal CSR model over the ``sum(S_b)`` states of all problems, so
+  a sweep is one gather and one ``bincount`` over every transition.
+
+Values live in one flat array (problem b owns ``V[offsets[b]:offsets[b + 1]]``)
+and every state carries its problem's γ. Each problem has its own
+convergence test; once a problem converges it is compacted out of the
+arrays, so finished problems stop costing work and the remaining sweeps
+stream only the transitions that still matter.
+
+``BatchedValueIteration`` and ``BatchedPolicyIteration`` return one result
+per problem in the same form as ``ValueIteration.run_value_iteration``
+(V, policy, Q) and ``PolicyIteration.run_policy_iteration`` (policy, V, Q)::
+
+    solver = BatchedValueIteration.from_grid([(P1, R1), (P2, R2)], gammas=[0.9, 0.95, 0.99])
+    results = solver.run_value_iteration(tolerance=1e-8, verbose=False)
+    V, policy, Q = results[solver.grid.index((1, 0.99))]
+"""
+
+import itertools
+import time
+
+import numpy as np
+
+from rl_training.dp import FINAL_TIE_TOLERANCE, _concat_ranges, _lowest_best_policy
+from rl_training.models import SparseTransitionModel
+
+
+def _flat_transitions(P):
+    """(rows, next_states, probs) of a dense or sparse model, sorted by row s * n_actions + a"""
+    if isinstance(P, SparseTransitionModel):
+        return P.rows, P.next_states, P.probs
+    flat = np.asarray(P, dtype=float).reshape(-1, P.shape[-1])
+    rows, next_states = np.nonzero(flat)
+    return rows, next_states, flat[rows, next_states]
+
+
+class BatchedBellmanEngine:
+    """Bellman backups for a batch of tabular MDPs sharing one action space"""
+
+    def __init__(self, models, gammas=0.9):
+        """
+        Args:
+            models: Sequence of (P, R) pairs, P a dense [S, A, S] tensor or a
+                SparseTransitionModel (R may then be None) - as accepted by
+                ``BellmanEngine``
+            gammas: Discount factor, shared or one per model
+        """
+        models = list(models)
+        if not models:
+            raise ValueError("BatchedBellmanEngine needs at least one model")
+        self.gammas = np.array(np.broadcast_to(np.asarray(gammas, dtype=float), (len(models),)))
+
+        transitions, rewards = [], []
+        for P, R in models:
+            sparse = isinstance(P, SparseTransitionModel)
+            if sparse:
+                R = P.expected_rewards() if R is None else np.asarray(R, dtype=float)
+                probability_sums = P.probability_sums()
+            else:
+                P = np.asarray(P, dtype=float)
+                R = np.asarray(R, dtype=float)
+                probability_sums = P.sum(axis=2)
+            transitions.append(P)
+            rewards.append(R * probability_sums)
+
+        n_actions = {R.shape[1] for R in rewards}
+        if len(n_actions) != 1:
+            raise ValueError(f"All models need the same number of actions, got {sorted(n_actions)}")
+        self.n_actions = n_actions.pop()
+        self.n_problems = len(models)
+        self.n_states = np.array([R.shape[0] for R in rewards], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.n_states)])
+        self.expected_reward = np.concatenate(rewards)
+        self.state_gamma = np.repeat(self.gammas, self.n_states)
+
+        self.dense = all(not isinstance(P, SparseTransitionModel) for P in transitions) \
+            and len({P.shape for P in transitions}) == 1
+        if self.dense:
+            self.P = np.stack(transitions)
+        else:
+            flat = [_flat_transitions(P) for P in transitions]
+            self.nnz = np.array([len(rows) for rows, _, _ in flat], dtype=np.int64)
+            self.transition_offsets = np.concatenate([[0], np.cumsum(self.nnz)])
+            state_shift = np.repeat(self.offsets[:-1], self.nnz)
+            self.rows = np.concatenate([rows for rows, _, _ in flat]) + state_shift * self.n_actions
+            self.next_states = np.concatenate([next_states for _, next_states, _ in flat]) + state_shift
+            self.probs = np.concatenate([probs for _, _, probs in flat])
+            self.row_states = self.rows // self.n_actions
+
+    @property
+    def total_states(self):
+        return int(self.offsets[-1])
+
+    def subset(self, problems):
+        """
+        Engine over some of the problems, without rebuilding anything
+
+        Args:
+            problems: Indices (or boolean mask) of the problems to keep, in order
+
+        Returns:
+            engine: BatchedBellmanEngine whose problem i is ``problems[i]``
+        """
+        problems = np.arange(self.n_problems)[problems]
+        engine = object.__new__(type(self))
+        engine.n_actions = self.n_actions
+        engine.n_problems = len(problems)
+        engine.gammas = self.gammas[problems]
+        engine.n_states = self.n_states[problems]
+        engine.offsets = np.concatenate([[0], np.cumsum(engine.n_states)])
+        states = self.problem_states(problems)
+        engine.expected_reward = self.expected_reward[states]
+        engine.state_gamma = self.state_gamma[states]
+        engine.dense = self.dense
+        if self.dense:
+            engine.P = self.P[problems]
+        else:
+            engine.nnz = self.nnz[problems]
+            engine.transition_offsets = np.concatenate([[0], np.cumsum(engine.nnz)])
+            index = _concat_ranges(self.transition_offsets[problems], engine.nnz)
+            state_shift = np.repeat(self.offsets[problems] - engine.offsets[:-1], engine.nnz)
+            engine.rows = self.rows[index] - state_shift * self.n_actions
+            engine.next_states = self.next_states[index] - state_shift
+            engine.probs = self.probs[index]
+            engine.row_states = engine.rows // self.n_actions
+        return engine
+
+    def problem_states(self, problems):
+        """Flat state indices of the given problems, in order"""
+        problems = np.arange(self.n_problems)[problems]
+        return _concat_ranges(self.offsets[problems], self.n_states[problems])
+
+    def split(self, x):
+        """Per-problem pieces of a flat per-state array"""
+        return np.split(x, self.offsets[1:-1])
+
+    def max_changes(self, V_new, V):
+        """Largest |V_new - V| of every problem [n_problems]"""
+        return np.maximum.reduceat(np.abs(V_new - V), self.offsets[:-1])
+
+    def _next_values(self, V):
+        """Σ_{s'} P(s'|s,a) V(s') for every (s, a) pair of every problem [total_states, n_actions]"""
+        if self.dense:
+            B, S = self.P.shape[:2]
+            next_values = np.matmul(self.P.reshape(B, S * self.n_actions, S), V.reshape(B, S, 1))
+            return next_values.reshape(B * S, self.n_actions)
+        sums = np.bincount(self.rows, weights=self.probs * V[self.next_states],
+                           minlength=self.total_states * self.n_actions)
+        return sums.reshape(-1, self.n_actions)
+
+    def q_values(self, V):
+        """Q(s,a) = Σ_{s'} P(s'|s,a)[R(s,a) + γ_b V(s')] of every problem [total_states, n_actions]"""
+        return self.expected_reward + self.state_gamma[:, None] * self._next_values(V)
+
+    def optimality_sweep(self, V):
+        """One synchronous sweep of the Bellman optimality operator over every problem"""
+        return self.q_values(V).max(axis=1)
+
+    def policy_model(self, policy):
+        """
+        Collapse every problem under its policy into a Markov reward process
+
+        Args:
+            policy: Stacked policy matrices [total_states, n_actions]
+
+        Returns:
+            (P_pi, r_pi): Stacked [B, S, S] transition matrices (dense) or the
+            per-transition weights (block-diagonal CSR), and r_pi [total_states]
+        """
+        policy = np.asarray(policy, dtype=float)
+        r_pi = np.einsum("sa,sa->s", policy, self.expected_reward)
+        if self.dense:
+            B, S = self.P.shape[:2]
+            P_pi = np.einsum("bsa,bsat->bst", policy.reshape(B, S, self.n_actions), self.P)
+        else:
+            P_pi = self.probs * policy.ravel()[self.rows]
+        return P_pi, r_pi
+
+    def policy_sweep(self, V, policy_model):
+        """One synchronous sweep of the Bellman expectation operator over every problem"""
+        P_pi, r_pi = policy_model
+        if self.dense:
+            B, S = P_pi.shape[:2]
+            next_values = np.matmul(P_pi, V.reshape(B, S, 1)).reshape(-1)
+        else:
+            next_values = np.bincount(self.row_states, weights=P_pi * V[self.next_states],
+                                      minlength=self.total_states)
+        return r_pi + self.state_gamma * next_values
+
+    def solve_policy(self, policy_model):
+        """
+        Evaluate every problem's policy exactly, (I - γ_b P^π)V = r^π
+
+        Dense batches are one stacked ``np.linalg.solve``; block-diagonal
+        ones use scipy's sparse solver on the whole block matrix when scipy is
+        installed and a dense solve per problem otherwise.
+        """
+        P_pi, r_pi = policy_model
+        if self.dense:
+            B, S = P_pi.shape[:2]
+            A = np.eye(S) - self.gammas[:, None, None] * P_pi
+            return np.linalg.solve(A, r_pi.reshape(B, S, 1)).reshape(-1)
+        weights = self.state_gamma[self.row_states] * P_pi
+        try:
+            from scipy import sparse
+            from scipy.sparse.linalg import spsolve
+        except ImportError:
+            V = np.empty(self.total_states)
+            for b in range(self.n_problems):
+                lo, hi = self.offsets[b], self.offsets[b + 1]
+                transitions = slice(self.transition_offsets[b], self.transition_offsets[b + 1])
+                A = np.eye(hi - lo)
+                np.subtract.at(A, (self.row_states[transitions] - lo, self.next_states[transitions] - lo),
+                               weights[transitions])
+                V[lo:hi] = np.linalg.solve(A, r_pi[lo:hi])
+            return V
+        n = self.total_states
+        A = sparse.identity(n, format="csr") - sparse.csr_matrix(
+            (weights, (self.row_states, self.next_states)), shape=(n, n))
+        return spsolve(A.tocsc(), r_pi)
+
+    def greedy_policy(self, Q, current_policy=None, tie_tolerance=1e-12):
+        """
+        Deterministic greedy policies w.r.t. Q, keeping the current action on
+        ties as ``PolicyImprover.improve_policy`` does
+
+        Returns:
+            policy: One-hot policy matrices [total_states, n_actions]
+        """
+        actions = np.argmax(Q, axis=1)
+        if current_policy is not None:
+            states = np.arange(len(Q))
+            old_actions = np.argmax(current_policy, axis=1)
+            keep = Q[states, old_actions] >= Q.max(axis=1) - tie_tolerance
+            actions[keep] = old_actions[keep]
+        policy = np.zeros_like(Q)
+        policy[np.arange(len(Q)), actions] = 1.0
+        return policy
+
+    def sweep_to_convergence(self, V, make_sweep, tolerance, max_iterations):
+        """
+        Repeat a sweep until every problem's largest change is below ``tolerance``
+
+        A problem stops at its own first converged sweep (keeping the values
+        from before it, like the single-MDP loops) and is compacted out of
+        the working arrays.
+
+        Args:
+            V: Initial values [total_states]
+            make_sweep: ``make_sweep(engine, states) -> sweep(V)`` building the
+                sweep for a subset engine whose states are ``states`` of this one
+            tolerance: Convergence tolerance
+            max_iterations: Sweep cap per problem
+
+        Returns:
+            (V, sweeps, converged, max_changes, backups): final values, sweeps
+            per problem, convergence mask, last largest change per problem and
+            the total number of state backups performed
+        """
+        V_out = np.array(V, dtype=float)
+        sweeps = np.zeros(self.n_problems, dtype=np.int64)
+        converged = np.zeros(self.n_problems, dtype=bool)
+        changes = np.full(self.n_problems, np.inf)
+        backups = 0
+
+        active = np.arange(self.n_problems)
+        states = np.arange(self.total_states)
+        engine = self
+        V = V_out.copy()
+        sweep = make_sweep(engine, states)
+        for _ in range(max_iterations):
+            V_new = sweep(V)
+            backups += engine.total_states
+            sweeps[active] += 1
+            changes[active] = engine.max_changes(V_new, V)
+            done = changes[active] < tolerance
+            if done.any():
+                converged[active[done]] = True
+                finished = engine.problem_states(done)
+                V_out[states[finished]] = V[finished]
+                if done.all():
+                    return V_out, sweeps, converged, changes, backups
+                keep = ~done
+                kept = engine.problem_states(keep)
+                active, states = active[keep], states[kept]
+                engine = engine.subset(keep)
+                V_new = V_new[kept]
+                sweep = make_sweep(engine, states)
+            V = V_new
+        V_out[states] = V
+        return V_out, sweeps, converged, changes, backups
+
+
+class BatchedValueIteration:
+    """Synchronous value iteration over a batch of MDPs"""
+
+    def __init__(self, models, gammas=0.9):
+        """
+        Args:
+            models: Sequence of (P, R) pairs (see ``BatchedBellmanEngine``)
+            gammas: Discount factor, shared or one per model
+        """
+        self.engine = BatchedBellmanEngine(models, gammas)
+        self.n_problems = self.engine.n_problems
+        # (model index, gamma) of every problem, set by from_grid
+        self.grid = None
+
+        # Tracking variables
+        self.sweeps = None
+        self.converged = None
+        self.max_changes = None
+        self.backups = 0
+        self.solve_time = 0.0
+
+    @classmethod
+    def from_grid(cls, models, gammas):
+        """Every model × every gamma; problem i is ``grid[i] = (model index, gamma)``"""
+        models = list(models)
+        grid = list(itertools.product(range(len(models)), gammas))
+        solver = cls([models[m] for m, _ in grid], [gamma for _, gamma in grid])
+        solver.grid = grid
+        return solver
+
+    def run_value_iteration(self, max_iterations=1000, tolerance=1e-6, verbose=True):
+        """
+        Run value iteration on every problem
+
+        Args:
+            max_iterations: Maximum number of sweeps per problem
+            tolerance: Convergence tolerance on each problem's largest change
+            verbose: Whether to print a summary
+
+        Returns:
+            results: One ``(V, policy, Q)`` per problem, as
+            ``ValueIteration.run_value_iteration`` returns them
+        """
+        engine = self.engine
+        start = time.perf_counter()
+        V, self.sweeps, self.converged, self.max_changes, self.backups = engine.sweep_to_convergence(
+            np.zeros(engine.total_states), lambda subset, states: subset.optimality_sweep,
+            tolerance, max_iterations
+        )
+        Q = engine.q_values(V)
+        policy = engine.greedy_policy(Q)
+        self.solve_time = time.perf_counter() - start
+
+        if verbose:
+            _print_summary("VALUE ITERATION", self, "sweeps")
+        return list(zip(engine.split(V), engine.split(policy), engine.split(Q)))
+
+
+class BatchedPolicyIteration:
+    """Policy iteration (iterative evaluation) over a batch of MDPs"""
+
+    def __init__(self, models, gammas=0.9):
+        """
+        Args:
+            models: Sequence of (P, R) pairs (see ``BatchedBellmanEngine``)
+            gammas: Discount factor, shared or one per model
+        """
+        self.engine = BatchedBellmanEngine(models, gammas)
+        self.n_problems = self.engine.n_problems
+        self.grid = None
+
+        # Tracking variables
+        self.iterations = None
+        self.eval_sweeps = None
+        self.converged = None
+        self.backups = 0
+        self.solve_time = 0.0
+
+    from_grid = classmethod(BatchedValueIteration.from_grid.__func__)
+
+    def run_policy_iteration(self, max_iterations=100, eval_tolerance=1e-6, eval_max_iterations=1000,
+                             verbose=True):
+        """
+        Run policy iteration on every problem, from the uniform random policy
+
+        Each evaluation sweeps until every problem's evaluation converges
+        (problems drop out as they do); a problem is finished once its greedy
+        policy is stable and its evaluation converged - the stopping rule of
+        ``PolicyIteration.run_policy_iteration``. Like it, every problem then
+        finishes with exact evaluations and the lowest-index tie rule, so
+        both return the same policies.
+
+        Args:
+            max_iterations: Maximum number of policy iterations per problem
+            eval_tolerance: Tolerance of every policy evaluation
+            eval_max_iterations: Sweep cap of every policy evaluation
+            verbose: Whether to print a summary
+
+        Returns:
+            results: One ``(policy, V, Q)`` per problem, as
+            ``PolicyIteration.run_policy_iteration`` returns them
+        """
+        engine = self.engine
+        start = time.perf_counter()
+        results = [None] * self.n_problems
+        self.iterations = np.zeros(self.n_problems, dtype=np.int64)
+        self.eval_sweeps = np.zeros(self.n_problems, dtype=np.int64)
+        self.converged = np.zeros(self.n_problems, dtype=bool)
+        self.backups = 0
+
+        policy = np.full((engine.total_states, engine.n_actions), 1.0 / engine.n_actions)
+        active = np.arange(self.n_problems)
+
+        def evaluate(engine, policy):
+            def make_sweep(subset, states):
+                policy_model = subset.policy_model(policy[states])
+                return lambda V: subset.policy_sweep(V, policy_model)
+
+            V, sweeps, eval_converged, _, backups = engine.sweep_to_convergence(
+                np.zeros(engine.total_states), make_sweep, eval_tolerance, eval_max_iterations)
+            self.eval_sweeps[active] += sweeps
+            self.backups += backups
+            return V, eval_converged
+
+        for _ in range(max_iterations):
+            V, eval_converged = evaluate(engine, policy)
+            Q = engine.q_values(V)
+            new_policy = engine.greedy_policy(Q, current_policy=policy)
+            self.iterations[active] += 1
+
+            changed = np.any(new_policy != policy, axis=1)
+            changes = np.add.reduceat(changed, engine.offsets[:-1])
+            done = (changes == 0) & eval_converged
+            for i in np.flatnonzero(done):
+                states = slice(engine.offsets[i], engine.offsets[i + 1])
+                results[active[i]] = (new_policy[states], V[states], Q[states])
+            self.converged[active[done]] = True
+            if done.all():
+                break
+            keep = ~done
+            kept = engine.problem_states(keep)
+            active, engine, policy = active[keep], engine.subset(keep), new_policy[kept]
+        else:
+            # Out of iterations: finish from the last policies, like the single-MDP class
+            for i in range(engine.n_problems):
+                states = slice(engine.offsets[i], engine.offsets[i + 1])
+                results[active[i]] = (policy[states], None, None)
+        results = self._final_policies(results)
+        self.solve_time = time.perf_counter() - start
+
+        if verbose:
+            _print_summary("POLICY ITERATION", self, "iterations")
+        return results
+
+    def _final_policies(self, results, max_iterations=100):
+        """
+        Exact policy iteration with the lowest-index tie rule from every
+        problem's policy, as ``PolicyIteration._final_policy`` finishes
+
+        Returns:
+            results: One ``(policy, V, Q)`` per problem
+        """
+        engine = self.engine
+        active = np.arange(self.n_problems)
+        policy = np.concatenate([policy for policy, _, _ in results])
+        for _ in range(max_iterations):
+            V = engine.solve_policy(engine.policy_model(policy))
+            Q = engine.q_values(V)
+            new_policy = _lowest_best_policy(Q, FINAL_TIE_TOLERANCE)
+            changed = np.any(new_policy != policy, axis=1)
+            done = np.add.reduceat(changed, engine.offsets[:-1]) == 0
+            for i in np.flatnonzero(done):
+                states = slice(engine.offsets[i], engine.offsets[i + 1])
+                results[active[i]] = (policy[states], V[states], Q[states])
+            if done.all():
+                break
+            keep = ~done
+            active, engine, policy = active[keep], engine.subset(keep), new_policy[engine.problem_states(keep)]
+        else:
+            for i in range(engine.n_problems):
+                states = slice(engine.offsets[i], engine.offsets[i + 1])
+                results[active[i]] = (policy[states], V[states], Q[states])
+        return results
+
+
+def _print_summary(title, solver, counter):
+    counts = getattr(solver, counter)
+    print(f"✅ BATCHED {title} COMPLETED")
+    print(f"=" * 40)
+    print(f"  • Problems: {solver.n_problems} ({solver.engine.total_states} states, "
+          f"{'dense stacked' if solver.engine.dense else 'block-diagonal sparse'} model)")
+    print(f"  • Converged: {int(solver.converged.sum())}/{solver.n_problems}")
+    print(f"  • {counter.capitalize()} per problem: min {counts.min()}, max {counts.max()}, "
+          f"mean {counts.mean():.1f}")
+    if counter == "sweeps":
+        # Every sweep of an uncompacted batch backs up all of its states
+        print(f"  • State backups: {solver.backups} "
+              f"(without dropping converged problems: {counts.max() * solver.engine.total_states})")
+    else:
+        eval_sweeps = solver.eval_sweeps
+        print(f"  • Evaluation sweeps per problem: min {eval_sweeps.min()}, max {eval_sweeps.max()}, "
+              f"mean {eval_sweeps.mean():.1f}")
+        print(f"  • State backups: {solver.backups}")
+    print(f"  • Time: {solver.solve_time:.3f}s")
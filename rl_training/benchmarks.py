@@ -0,0 +1,759 @@
+"""
+Reproducible benchmarks for the DP, Monte Carlo and TD algorithms.
+
+    python -m rl_training.benchmarks                  # run and compare with the baseline
+    python -m rl_training.benchmarks --save-baseline  # run and store the results as the baseline
+    python -m rl_training.benchmarks --quick --only 'vi/*'
+
+Every case runs with fixed seeds and reports timings (best of ``repeat``
+runs), throughput and the peak traced memory of one extra run under
+``tracemalloc``. DP cases also check their answers: V* has to match the
+exact solution (and, on the notebook's 4x4 map, the values the notebook
+converges to) within ``V_TOLERANCE``. Results are compared metric by metric
+with a stored baseline; slower-than-baseline metrics beyond ``--threshold``
+are reported as regressions. ``--quick`` runs keep their own baseline file,
+since they run the same cases on smaller workloads.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import gymnasium as gym
+import numpy as np
+from gymnasium.envs.toy_text.frozen_lake import generate_random_map
+
+from rl_training.batched_dp import BatchedPolicyIteration, BatchedValueIteration
+from rl_training.cache import ModelCache, cached_solution
+from rl_training.dp import BellmanEngine, PolicyIteration, ValueIteration
+from rl_training.dynamics import DYNAMICS, REWARD_TOLERANCE, STATE_TOLERANCE, verify_dynamics
+from rl_training.headless import run_controller, summarize_episodes
+from rl_training.lazy import HEAVY_MODULES
+from rl_training.manual import PENDULUM_EPISODE_STEPS, push_energy, torque_energy
+from rl_training.models import extract_transition_model
+from rl_training.mpc import MPC_METHODS, mpc_controller, rollout_returns
+from rl_training.monte_carlo import (
+    constant_alpha_monte_carlo_control,
+    every_visit_monte_carlo_control,
+    monte_carlo_evaluation,
+    simple_policy,
+)
+from rl_training.profiling import Profiler
+from rl_training.replay import ReplayBuffer
+from rl_training.td import TD_METHODS, td_control
+
+V_TOLERANCE = 1e-8
+# Solver tolerance for the correctness checks (the sweep stopping rule leaves
+# an error of up to γ/(1-γ) times the tolerance)
+CHECK_TOLERANCE = 1e-12
+DEFAULT_BASELINE = "benchmark_baseline.json"
+# --quick runs shrink the workloads of the same cases, so they keep their own baseline
+DEFAULT_QUICK_BASELINE = "benchmark_baseline_quick.json"
+
+# V* of the notebook's slippery 4x4 FrozenLake with γ = 0.9
+FROZENLAKE_4X4_V_STAR = np.array([
+    0.06889090488900353, 0.06141457150935625, 0.07440976196616103, 0.055807321474620794,
+    0.09185453985200467, 0.0, 0.11220820641168613, 0.0,
+    0.14543635476567401, 0.2474969546012346, 0.29961759273945965, 0.0,
+    0.0, 0.3799359011656483, 0.6390201481186113, 0.0,
+])
+
+# name: (map_name or generated map size, sparse model, gamma)
+DP_PROBLEMS = {
+    "4x4": ("4x4", False, 0.9),
+    "8x8": ("8x8", False, 0.9),
+    "random32": (32, True, 0.95),
+    "random64": (64, True, 0.95),
+}
+QUICK_DP_PROBLEMS = ("4x4", "8x8", "random32")
+
+# Batched DP: generated map size, sparse model, number of maps (seeds 0..n-1), gammas
+BATCH_PROBLEMS = {
+    "dense8": (8, False, 8, (0.9, 0.95, 0.99)),
+    "sparse16": (16, True, 8, (0.9, 0.95, 0.99)),
+}
+QUICK_BATCH_PROBLEMS = ("dense8",)
+
+# Metrics where a larger value is better; for every other metric smaller is better
+HIGHER_IS_BETTER = ("_per_second",)
+# Metrics that describe the workload rather than its speed (never regressions)
+WORKLOAD_METRICS = ("sweeps", "iterations", "backups", "episodes", "steps", "states", "nnz", "model_mb",
+                    "problems")
+
+# Startup budget: import time of a module in a fresh interpreter on top of a bare
+# ``import numpy`` (gymnasium alone takes ~0.2 s), with none of HEAVY_MODULES loaded
+STARTUP_BUDGET_SECONDS = 0.35
+STARTUP_MODULES = ("rl_training", "rl_training.dp", "rl_training.manual", "rl_training.headless",
+                   "rl_training.realtime", "rl_training.cache", "rl_training.monte_carlo", "rl_training.td",
+                   "rl_training.mpc", "rl_training.replay")
+_IMPORT_PROBE = ("import sys, time; start = time.perf_counter(); import {module}; "
+                 "print(time.perf_counter() - start); print(*[name for name in {heavy!r} if name in sys.modules])")
+
+
+def frozenlake(spec, seed=0):
+    """Slippery FrozenLake for a map name ('4x4', '8x8') or a generated map size"""
+    if isinstance(spec, str):
+        return gym.make("FrozenLake-v1", map_name=spec, is_slippery=True)
+    return gym.make("FrozenLake-v1", desc=generate_random_map(size=spec, seed=seed), is_slippery=True)
+
+
+def _best_time(fn, repeat):
+    """Best wall-clock time of ``repeat`` calls and the last call's result"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _peak_mb(fn):
+    """Peak memory traced while running ``fn`` once, in MB"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def _model_mb(P):
+    return (P.nbytes if hasattr(P, "nbytes") else np.asarray(P).nbytes) / 2**20
+
+
+class DPProblem:
+    """FrozenLake model plus its exact V*, built once and shared by the DP cases"""
+
+    def __init__(self, name):
+        spec, self.sparse, self.gamma = DP_PROBLEMS[name]
+        self.name = name
+        env = frozenlake(spec)
+        start = time.perf_counter()
+        self.P, self.R = extract_transition_model(env, sparse=self.sparse, verbose=False)
+        self.extract_seconds = time.perf_counter() - start
+        env.close()
+        self.n_states = self.R.shape[0]
+        self.engine = BellmanEngine(self.P, self.R, self.gamma)
+
+        # Exact V*: policy iteration with linear-solve evaluation
+        policy, _, _ = PolicyIteration(self.P, self.R, self.gamma).run_policy_iteration(
+            max_iterations=1000, verbose=False, eval_method="exact"
+        )
+        # Every evaluation schedule of PolicyIteration has to return this policy
+        self.pi_actions = np.argmax(policy, axis=1)
+        self.v_star = self.policy_value(policy)
+        if name == "4x4":
+            self.reference = FROZENLAKE_4X4_V_STAR
+        else:
+            self.reference = self.v_star
+
+    def policy_value(self, policy):
+        """Exact value of a policy"""
+        return self.engine.solve_policy(self.engine.policy_model(policy))
+
+    def check(self, V, policy):
+        """V and the value of the policy against V*"""
+        value_error = float(np.max(np.abs(V - self.reference)))
+        policy_error = float(np.max(np.abs(self.policy_value(policy) - self.reference)))
+        return {
+            "max_value_error": value_error,
+            "max_policy_value_error": policy_error,
+            "passed": value_error <= V_TOLERANCE and policy_error <= V_TOLERANCE,
+        }
+
+
+def value_iteration_case(problem, method="sync", tolerance=1e-8, repeat=3):
+    """Sweeps/sec, Bellman backups and time to convergence of ValueIteration"""
+    def solve(tol=tolerance):
+        solver = ValueIteration(problem.P, problem.R, problem.gamma)
+        V, policy, _ = solver.run_value_iteration(max_iterations=100000, tolerance=tol,
+                                                  verbose=False, method=method)
+        return solver, V, policy
+
+    seconds, (solver, _, _) = _best_time(solve, repeat)
+    sweeps = len(solver.iteration_stats)
+    backups = solver.iteration_stats[-1]["backups"]
+    _, V, policy = solve(CHECK_TOLERANCE)
+    return {
+        "metrics": {
+            "seconds": seconds,
+            "sweeps": sweeps,
+            "sweeps_per_second": sweeps / seconds,
+            "backups": backups,
+            "backups_per_second": backups / seconds,
+            "states": problem.n_states,
+            "peak_mb": _peak_mb(solve),
+        },
+        "checks": problem.check(V, policy),
+    }
+
+
+def policy_iteration_case(problem, eval_method="exact", tolerance=1e-8, repeat=3, **kwargs):
+    """
+    Time to convergence of PolicyIteration (kwargs: warm_start / eval_sweeps),
+    and whether it returns the same policy as exact policy iteration
+    """
+    def solve(tol=tolerance):
+        solver = PolicyIteration(problem.P, problem.R, problem.gamma)
+        policy, V, _ = solver.run_policy_iteration(max_iterations=1000, eval_tolerance=tol,
+                                                   verbose=False, eval_method=eval_method, **kwargs)
+        return solver, V, policy
+
+    seconds, (solver, _, timed_policy) = _best_time(solve, repeat)
+    iterations = len(solver.iteration_stats)
+    mismatches = int(np.count_nonzero(np.argmax(timed_policy, axis=1) != problem.pi_actions))
+    _, V, policy = solve(CHECK_TOLERANCE)
+    checks = problem.check(V, policy)
+    checks["policy_mismatches"] = mismatches
+    checks["passed"] = checks["passed"] and mismatches == 0
+    return {
+        "metrics": {
+            "seconds": seconds,
+            "iterations": iterations,
+            "sweeps": sum(stats["eval_sweeps"] for stats in solver.iteration_stats),
+            "states": problem.n_states,
+            "peak_mb": _peak_mb(solve),
+        },
+        "checks": checks,
+    }
+
+
+def model_case(problem):
+    """Cost and size of extracting the transition model"""
+    return {
+        "metrics": {
+            "seconds": problem.extract_seconds,
+            "states": problem.n_states,
+            "model_mb": _model_mb(problem.P),
+        },
+        "checks": {},
+    }
+
+
+def cache_case(problem, repeat=3):
+    """Cold (solve and store) and warm (load) time of cached_solution in a fresh cache"""
+    env = frozenlake(DP_PROBLEMS[problem.name][0])
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ModelCache(directory)
+
+        def solve():
+            return cached_solution(env, problem.gamma, CHECK_TOLERANCE, max_iterations=100000, cache=cache)
+
+        cold_seconds, _ = _best_time(solve, 1)
+        seconds, (V, policy, _) = _best_time(solve, repeat)
+        entry_mb = cache.nbytes / 2**20
+    env.close()
+    return {
+        "metrics": {
+            "seconds": seconds,
+            "cold_seconds": cold_seconds,
+            "states": problem.n_states,
+            "model_mb": entry_mb,
+        },
+        "checks": problem.check(V, policy),
+    }
+
+
+def batch_case(name, solver="value_iteration", tolerance=1e-8, repeat=3):
+    """
+    Time of one batched solve of every map × gamma against a loop of
+    single-MDP solves (PolicyIteration with iterative evaluation, as batched)
+    """
+    size, sparse, n_maps, gammas = BATCH_PROBLEMS[name]
+    models = []
+    for seed in range(n_maps):
+        env = frozenlake(size, seed)
+        models.append(extract_transition_model(env, sparse=sparse, verbose=False))
+        env.close()
+
+    def solve_batch():
+        if solver == "value_iteration":
+            batch = BatchedValueIteration.from_grid(models, gammas)
+            results = batch.run_value_iteration(max_iterations=100000, tolerance=tolerance, verbose=False)
+            return batch, [V for V, _, _ in results]
+        batch = BatchedPolicyIteration.from_grid(models, gammas)
+        results = batch.run_policy_iteration(max_iterations=1000, eval_tolerance=tolerance, verbose=False)
+        return batch, [V for _, V, _ in results]
+
+    def solve_loop():
+        values = []
+        for P, R in models:
+            for gamma in gammas:
+                if solver == "value_iteration":
+                    V, _, _ = ValueIteration(P, R, gamma).run_value_iteration(
+                        max_iterations=100000, tolerance=tolerance, verbose=False)
+                else:
+                    _, V, _ = PolicyIteration(P, R, gamma).run_policy_iteration(
+                        max_iterations=1000, eval_tolerance=tolerance, verbose=False, eval_method="sync")
+                values.append(V)
+        return values
+
+    seconds, (batch, batch_values) = _best_time(solve_batch, repeat)
+    loop_seconds, loop_values = _best_time(solve_loop, repeat)
+    # Same stopping rule per problem, so the batch has to reproduce the loop up to rounding
+    value_error = max(float(np.max(np.abs(V - V_single))) for V, V_single in zip(batch_values, loop_values))
+    return {
+        "metrics": {
+            "seconds": seconds,
+            "loop_seconds": loop_seconds,
+            "problems": batch.n_problems,
+            "backups": batch.backups,
+            "states": batch.engine.total_states,
+            "peak_mb": _peak_mb(solve_batch),
+        },
+        "checks": {"max_value_error": value_error, "passed": value_error <= V_TOLERANCE},
+    }
+
+
+def _import_seconds(module, repeat):
+    """Best import time of ``module`` in a fresh interpreter and the heavy modules it loaded"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, (root, os.environ.get("PYTHONPATH"))))}
+    best, loaded = float("inf"), []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True, env=env,
+        ).stdout.splitlines()
+        best = min(best, float(output[0]))
+        loaded = output[1].split()
+    return best, loaded
+
+
+def startup_case(module, repeat=3):
+    """Cold import time of a package module against the startup budget"""
+    numpy_seconds, _ = _import_seconds("numpy", repeat)
+    seconds, loaded = _import_seconds(module, repeat)
+    overhead = max(seconds - numpy_seconds, 0.0)
+    return {
+        "metrics": {
+            "seconds": seconds,
+            "overhead_seconds": overhead,
+        },
+        "checks": {
+            "budget_seconds": STARTUP_BUDGET_SECONDS,
+            "heavy_modules": loaded,
+            "passed": overhead <= STARTUP_BUDGET_SECONDS and not loaded,
+        },
+    }
+
+
+def _seeded(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    env = gym.make("Blackjack-v1", sab=True)
+    env.reset(seed=seed)
+    env.action_space.seed(seed)
+    return env
+
+
+def monte_carlo_case(run, num_episodes, seed=0):
+    """Episodes/sec of a Monte Carlo learner on Blackjack"""
+    def train():
+        env = _seeded(seed)
+        try:
+            return run(env, num_episodes)
+        finally:
+            env.close()
+
+    seconds, _ = _best_time(train, 1)
+    return {
+        "metrics": {
+            "seconds": seconds,
+            "episodes": num_episodes,
+            "episodes_per_second": num_episodes / seconds,
+            "peak_mb": _peak_mb(train),
+        },
+        "checks": {},
+    }
+
+
+def td_case(env_id, method, num_episodes, seed=0, num_envs=32):
+    """Steps/sec and episodes/sec of online TD control on a vector env"""
+    def train():
+        profiler = Profiler(env_id)
+        td_control(env_id, num_episodes, method, epsilon=0.1, num_envs=num_envs, seed=seed,
+                   verbose=False, profiler=profiler)
+        return profiler.steps
+
+    seconds, steps = _best_time(train, 1)
+    return {
+        "metrics": {
+            "seconds": seconds,
+            "episodes": num_episodes,
+            "steps": steps,
+            "episodes_per_second": num_episodes / seconds,
+            "steps_per_second": steps / seconds,
+            "peak_mb": _peak_mb(train),
+        },
+        "checks": {},
+    }
+
+
+def dynamics_case(env_id, num_steps, num_sequences=4000, horizon=30, repeat=3):
+    """
+    Step-for-step agreement of a NumPy dynamics model with gymnasium, and its
+    batched planning throughput (``num_sequences`` random plans of ``horizon`` steps)
+    """
+    dynamics = DYNAMICS[env_id]()
+    rng = np.random.default_rng(0)
+    if dynamics.discrete:
+        actions = rng.integers(dynamics.n_actions, size=(num_sequences, horizon))
+    else:
+        actions = rng.uniform(dynamics.action_low, dynamics.action_high, size=(num_sequences, horizon))
+    state = np.array([-0.5, 0.0]) if dynamics.discrete else np.array([np.pi, 0.0])
+    seconds, _ = _best_time(lambda: rollout_returns(dynamics, state, actions), repeat)
+
+    errors = verify_dynamics(env_id, num_steps)
+    return {
+        "metrics": {
+            "seconds": seconds,
+            "steps": num_sequences * horizon,
+            "transitions_per_second": num_sequences * horizon / seconds,
+        },
+        "checks": {
+            **errors,
+            "passed": (errors["max_state_error"] <= STATE_TOLERANCE
+                       and errors["max_reward_error"] <= REWARD_TOLERANCE
+                       and errors["terminated_mismatches"] == 0),
+        },
+    }
+
+
+def mpc_case(env_id, method, num_episodes, seed=0):
+    """Planning time per control tick of the MPC autopilot, and the episode metrics the lab scripts print"""
+    kwargs = {"max_episode_steps": PENDULUM_EPISODE_STEPS} if env_id == "Pendulum-v1" else {}
+    env = gym.make(env_id, **kwargs)
+    controller = mpc_controller(env_id, method, seed=seed)
+    energy = push_energy if DYNAMICS[env_id].discrete else torque_energy
+    try:
+        episodes = run_controller(env, controller, num_episodes, energy=energy, seed=seed)
+    finally:
+        env.close()
+    ticks = controller.summary()
+    episode_summary = summarize_episodes(episodes)
+    return {
+        "metrics": {
+            "tick_ms": ticks["mean_us"] / 1e3,
+            "tick_p99_ms": ticks["p99_us"] / 1e3,
+            "rollouts_per_second": ticks["calls"] * ticks["rollouts_per_tick"] / ticks["total_seconds"],
+            "episodes": num_episodes,
+            "steps": ticks["calls"],
+        },
+        "checks": {
+            "budget_ms": ticks["budget_ms"],
+            "over_budget_rate": ticks["over_budget"] / ticks["calls"],
+            "mean_total_reward": episode_summary["mean_total_reward"],
+            "mean_avg_reward": episode_summary["mean_avg_reward"],
+            "mean_energy": episode_summary["mean_energy"],
+            "terminated_rate": episode_summary["terminated_rate"],
+            "passed": ticks["mean_us"] / 1e3 <= ticks["budget_ms"],
+        },
+    }
+
+
+def replay_case(prioritized, num_transitions, capacity=100000, batch_size=256, num_batches=200, repeat=3):
+    """
+    Throughput of filling a LunarLander-shaped replay buffer one transition at
+    a time and of drawing minibatches from it (with priority updates in
+    prioritized mode), and a save / memory-mapped load round trip
+    """
+    rng = np.random.default_rng(0)
+    obs = rng.standard_normal((num_transitions + 1, 8)).astype(np.float32)
+    actions = rng.integers(4, size=num_transitions)
+    rewards = rng.standard_normal(num_transitions).astype(np.float32)
+    dones = rng.random(num_transitions) < 0.01
+
+    def fill():
+        buffer = ReplayBuffer(capacity, obs_shape=(8,), prioritized=prioritized, seed=0)
+        for i in range(num_transitions):
+            buffer.add(obs[i], actions[i], rewards[i], obs[i + 1], dones[i])
+        return buffer
+
+    def draw():
+        for _ in range(num_batches):
+            batch = buffer.sample(batch_size)
+            if prioritized:
+                buffer.update_priorities(batch["indices"], rng.standard_normal(batch_size))
+
+    add_seconds, buffer = _best_time(fill, repeat)
+    sample_seconds, _ = _best_time(draw, repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        buffer.save(directory)
+        loaded = ReplayBuffer.load(directory)
+        same = (len(loaded) == len(buffer)
+                and all(np.array_equal(loaded[name], buffer[name]) for name in buffer.arrays))
+        if prioritized:
+            same = same and np.allclose(loaded.tree.total, buffer.tree.total)
+        del loaded  # Release the memory maps before the directory goes away
+
+        # Add to the files in place and save back over them
+        appended = ReplayBuffer.load(directory, mmap_mode="r+")
+        appended.add(obs[0], actions[0], rewards[0], obs[1], dones[0])
+        buffer.add(obs[0], actions[0], rewards[0], obs[1], dones[0])
+        appended.save(directory)
+        del appended
+        reloaded = ReplayBuffer.load(directory)
+        in_place = (len(reloaded) == len(buffer) and reloaded.position == buffer.position
+                    and all(np.array_equal(reloaded[name], buffer[name]) for name in buffer.arrays))
+        if prioritized:
+            in_place = in_place and np.allclose(reloaded.tree.total, buffer.tree.total)
+        del reloaded
+
+    return {
+        "metrics": {
+            "add_seconds": add_seconds,
+            "sample_seconds": sample_seconds,
+            "adds_per_second": num_transitions / add_seconds,
+            "samples_per_second": num_batches * batch_size / sample_seconds,
+            "steps": num_transitions,
+            "model_mb": buffer.nbytes / 2**20,
+        },
+        "checks": {
+            "round_trip_equal": bool(same),
+            "in_place_round_trip_equal": bool(in_place),
+            "passed": bool(same and in_place),
+        },
+    }
+
+
+def build_cases(quick=False):
+    """
+    All benchmark cases, in run order
+
+    Returns:
+        cases: list of (name, zero-argument function returning
+        {'metrics': ..., 'checks': ...})
+    """
+    cases = []
+    problems = {}
+
+    def problem(name):
+        if name not in problems:
+            problems[name] = DPProblem(name)
+        return problems[name]
+
+    names = QUICK_DP_PROBLEMS if quick else tuple(DP_PROBLEMS)
+    for name in names:
+        cases.append((f"model/{name}", lambda name=name: model_case(problem(name))))
+        cases.append((f"vi/{name}/sync", lambda name=name: value_iteration_case(problem(name))))
+        if not DP_PROBLEMS[name][1]:
+            # In-place sweeps loop over states in Python; only worth timing on small maps
+            cases.append((f"vi/{name}/gauss_seidel",
+                          lambda name=name: value_iteration_case(problem(name), method="gauss_seidel", repeat=1)))
+        cases.append((f"vi/{name}/prioritized",
+                      lambda name=name: value_iteration_case(problem(name), method="prioritized")))
+        cases.append((f"pi/{name}/exact", lambda name=name: policy_iteration_case(problem(name))))
+        cases.append((f"pi/{name}/sync", lambda name=name: policy_iteration_case(problem(name), "sync")))
+        cases.append((f"pi/{name}/modified",
+                      lambda name=name: policy_iteration_case(problem(name), "sync", eval_sweeps=20)))
+        cases.append((f"cache/{name}", lambda name=name: cache_case(problem(name))))
+
+    for name in QUICK_BATCH_PROBLEMS if quick else tuple(BATCH_PROBLEMS):
+        cases.append((f"batch/{name}/vi", lambda name=name: batch_case(name)))
+        cases.append((f"batch/{name}/pi", lambda name=name: batch_case(name, "policy_iteration")))
+
+    scale = 10 if quick else 1
+    serial, batched = 20000 // scale, 200000 // scale
+    cases += [
+        ("mc/evaluation/serial", lambda: monte_carlo_case(
+            lambda env, n: monte_carlo_evaluation(env, simple_policy, n, verbose=False), serial)),
+        ("mc/evaluation/batched", lambda: monte_carlo_case(
+            lambda env, n: monte_carlo_evaluation(env, simple_policy, n, batch_size=10000, verbose=False),
+            batched)),
+        ("mc/constant_alpha/serial", lambda: monte_carlo_case(
+            lambda env, n: constant_alpha_monte_carlo_control(env, n, verbose=False), serial)),
+        ("mc/constant_alpha/batched", lambda: monte_carlo_case(
+            lambda env, n: constant_alpha_monte_carlo_control(env, n, batch_size=1000, verbose=False), batched)),
+        ("mc/every_visit/serial", lambda: monte_carlo_case(
+            lambda env, n: every_visit_monte_carlo_control(env, n, verbose=False), serial)),
+        ("mc/every_visit/batched", lambda: monte_carlo_case(
+            lambda env, n: every_visit_monte_carlo_control(env, n, batch_size=1000, verbose=False), batched)),
+    ]
+    for method in TD_METHODS:
+        cases.append((f"td/{method}/frozenlake",
+                      lambda method=method: td_case("FrozenLake-v1", method, 5000 // scale)))
+        cases.append((f"td/{method}/blackjack",
+                      lambda method=method: td_case("Blackjack-v1", method, 20000 // scale)))
+    for env_id in DYNAMICS:
+        cases.append((f"dynamics/{env_id}", lambda env_id=env_id: dynamics_case(env_id, 20000 // scale)))
+        for method in MPC_METHODS:
+            cases.append((f"mpc/{env_id}/{method}",
+                          lambda env_id=env_id, method=method: mpc_case(env_id, method, 1 if quick else 3)))
+    for mode in ("uniform", "prioritized"):
+        cases.append((f"replay/{mode}",
+                      lambda mode=mode: replay_case(mode == "prioritized", 100000 // scale)))
+    for module in STARTUP_MODULES:
+        cases.append((f"startup/{module}", lambda module=module: startup_case(module, 1 if quick else 3)))
+    return cases
+
+
+def environment_info():
+    """Versions and machine the results were measured on"""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "gymnasium": gym.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.system(),
+    }
+
+
+def run_benchmarks(quick=False, only=None, verbose=True):
+    """
+    Run the suite
+
+    Args:
+        quick: Smaller maps and fewer episodes
+        only: fnmatch patterns; run just the matching cases
+        verbose: Print every case as it finishes
+
+    Returns:
+        results: dict with 'environment', 'quick' and 'cases' ({name:
+        {'metrics', 'checks'}})
+    """
+    results = {"environment": environment_info(), "quick": quick, "cases": {}}
+    for name, run in build_cases(quick):
+        if only and not any(fnmatch.fnmatch(name, pattern) for pattern in only):
+            continue
+        result = run()
+        results["cases"][name] = result
+        if verbose:
+            print_case(name, result)
+    return results
+
+
+def _is_higher_better(metric):
+    return metric.endswith(HIGHER_IS_BETTER)
+
+
+def compare(results, baseline, threshold=0.25):
+    """
+    Compare results with a baseline metric by metric
+
+    A case whose workload metrics (``WORKLOAD_METRICS``) differ from the
+    baseline's did a different amount of work, so only its throughput
+    metrics (``HIGHER_IS_BETTER``) are compared.
+
+    Args:
+        results: ``run_benchmarks`` output
+        baseline: Earlier ``run_benchmarks`` output
+        threshold: Relative slowdown reported as a regression
+
+    Returns:
+        comparison: list of dicts with case, metric, baseline, current,
+        ratio (current / baseline) and regression
+    """
+    comparison = []
+    for name, result in results["cases"].items():
+        reference = baseline["cases"].get(name)
+        if reference is None:
+            continue
+        same_workload = all(reference["metrics"].get(metric, value) == value
+                            for metric, value in result["metrics"].items() if metric in WORKLOAD_METRICS)
+        for metric, value in result["metrics"].items():
+            old = reference["metrics"].get(metric)
+            if old is None or metric in WORKLOAD_METRICS or not old:
+                continue
+            if not same_workload and not _is_higher_better(metric):
+                continue
+            ratio = value / old
+            worse = ratio < 1 / (1 + threshold) if _is_higher_better(metric) else ratio > 1 + threshold
+            comparison.append({
+                "case": name,
+                "metric": metric,
+                "baseline": old,
+                "current": value,
+                "ratio": ratio,
+                "regression": worse,
+            })
+    return comparison
+
+
+def print_case(name, result):
+    metrics = result["metrics"]
+    parts = [f"{metric}={value:.4g}" for metric, value in metrics.items()]
+    checks = result["checks"]
+    status = "" if not checks else ("  ✅" if checks["passed"] else "  ❌ CHECK FAILED")
+    print(f"{name:<28} {' '.join(parts)}{status}")
+    if checks and not checks["passed"]:
+        print(f"{'':<28} {checks}")
+
+
+def print_comparison(comparison):
+    regressions = [row for row in comparison if row["regression"]]
+    print(f"\n📊 Compared {len(comparison)} metrics with the baseline: {len(regressions)} regressions")
+    for row in regressions:
+        print(f"   ⚠️  {row['case']} {row['metric']}: {row['baseline']:.4g} → {row['current']:.4g} "
+              f"({row['ratio']:.2f}x)")
+
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, default=float)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DP, Monte Carlo and TD algorithms")
+    parser.add_argument("--quick", action="store_true", help="smaller maps and fewer episodes")
+    parser.add_argument("--only", nargs="+", metavar="PATTERN", help="run only matching cases, e.g. 'vi/*'")
+    parser.add_argument("--baseline", help=f"baseline results file (default {DEFAULT_BASELINE}, "
+                                            f"{DEFAULT_QUICK_BASELINE} with --quick)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--output", help="also write these results to a file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative slowdown reported as a regression (default 0.25)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with status 1 on regressions, not only on failed checks")
+    args = parser.parse_args(argv)
+
+    if args.baseline is None:
+        args.baseline = DEFAULT_QUICK_BASELINE if args.quick else DEFAULT_BASELINE
+
+    results = run_benchmarks(args.quick, args.only)
+    if args.output:
+        save_results(results, args.output)
+
+    failed = [name for name, result in results["cases"].items()
+              if result["checks"] and not result["checks"]["passed"]]
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        baseline = load_results(args.baseline)
+        if baseline.get("quick") != results["quick"]:
+            kinds = {True: "a --quick run", False: "a full run"}
+            print(f"\n⚠️  {args.baseline} is {kinds[bool(baseline.get('quick'))]} and this is "
+                  f"{kinds[results['quick']]}; their workloads differ, so they are not compared")
+        else:
+            if baseline.get("environment") != results["environment"]:
+                print("\n⚠️  The baseline was measured in a different environment; timings may not compare")
+            comparison = compare(results, baseline, args.threshold)
+            print_comparison(comparison)
+            regressions = [row for row in comparison if row["regression"]]
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+
+    if failed:
+        print(f"\n❌ Correctness checks failed: {', '.join(failed)}")
+    if failed or (regressions and args.fail_on_regression):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""
+Batched Blackjack simulation for the Monte Carlo notebook.
+
+``VectorBlackjack`` is a pure-NumPy re-implementation of gymnasium's
+``Blackjack-v1`` that plays N hands in lockstep: the same infinite deck, the
+same observation ``(player_sum, dealer_card, usable_ace)``, the same dealer
+rule (draw below 17) and the same ``sab`` / ``natural`` reward variants. Only
+the random stream differs from the gym env.
+
+``rollout_episodes`` drives it with a policy and returns every transition as
+flat arrays, which the MC functions in the notebook turn into returns and
+Q/V updates without touching Python-level episode lists.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from rl_training.tabular import StateIndexer
+
+# 1 = Ace, 2-10 = Number cards, Jack/Queen/King = 10 (same deck as Blackjack-v1)
+DECK = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10])
+
+# Observation space is Tuple(Discrete(32), Discrete(11), Discrete(2))
+OBSERVATION_SHAPE = (32, 11, 2)
+N_STATES = 32 * 11 * 2
+N_ACTIONS = 2
+# Same row-major layout as StateIndexer.from_space(env.observation_space)
+INDEXER = StateIndexer(OBSERVATION_SHAPE)
+
+BlackjackRollouts = namedtuple(
+    "BlackjackRollouts", ["episode_ids", "steps", "states", "actions", "rewards", "num_episodes"]
+)
+BlackjackRollouts.__doc__ = """
+Flat transition arrays, sorted by episode and then by time step
+
+Fields:
+    episode_ids: Episode each transition belongs to [n_transitions]
+    steps: Time step t inside the episode [n_transitions]
+    states: Encoded state index (see ``encode_state``) [n_transitions]
+    actions: Action taken (0 = stick, 1 = hit) [n_transitions]
+    rewards: Reward received for the transition [n_transitions]
+    num_episodes: Number of episodes in the batch
+"""
+
+
+def encode_state(player_sum, dealer_card, usable_ace):
+    """Map (player_sum, dealer_card, usable_ace) - scalars or arrays - to a flat index"""
+    return INDEXER.encode_batch(player_sum, dealer_card, usable_ace)
+
+
+def decode_state(index):
+    """Inverse of ``encode_state``; scalars come back as the env's observation tuple"""
+    player_sum, rest = np.divmod(index, 22)
+    dealer_card, usable_ace = np.divmod(rest, 2)
+    if np.ndim(index) == 0:
+        return int(player_sum), int(dealer_card), int(usable_ace)
+    return player_sum, dealer_card, usable_ace
+
+
+def tabulate_policy(policy):
+    """
+    Turn a per-state policy function into a lookup table over all states
+
+    Args:
+        policy: Deterministic function state -> action, e.g. ``simple_policy``
+
+    Returns:
+        table: Action for every encoded state [N_STATES]
+    """
+    return np.array([policy(decode_state(index)) for index in range(N_STATES)], dtype=np.int64)
+
+
+def epsilon_greedy_actions(Q, states, epsilon, rng):
+    """
+    Vectorized ε-greedy action selection from a Q table
+
+    Ties go to the highest action index, like ``epsilon_greedy_policy``
+    in the notebook (which hits when both Q-values are equal).
+
+    Args:
+        Q: Q table [N_STATES, n_actions]
+        states: Encoded states [batch]
+        epsilon: Exploration rate
+        rng: numpy Generator
+
+    Returns:
+        actions: [batch]
+    """
+    q = Q[states]
+    n_actions = q.shape[1]
+    greedy = n_actions - 1 - np.argmax(q[:, ::-1], axis=1)
+    explore = rng.random(len(states)) < epsilon
+    return np.where(explore, rng.integers(0, n_actions, size=len(states)), greedy)
+
+
+def _hand_total(raw_sum, has_ace):
+    """Blackjack total of a hand: count one ace as 11 when that does not bust"""
+    return raw_sum + 10 * (has_ace & (raw_sum + 10 <= 21))
+
+
+class VectorBlackjack:
+    """N independent Blackjack-v1 hands simulated in lockstep with NumPy"""
+
+    def __init__(self, num_envs, sab=True, natural=False, seed=None):
+        """
+        Args:
+            num_envs: Number of hands played at once
+            sab: Sutton & Barto rules (a natural always wins unless the dealer
+                also has one), same flag as ``gym.make('Blackjack-v1', sab=...)``
+            natural: Pay 1.5 for a winning natural (ignored when sab=True)
+            seed: Seed or numpy Generator
+        """
+        self.num_envs = num_envs
+        self.sab = sab
+        self.natural = natural
+        self.rng = np.random.default_rng(seed)
+
+    def _draw(self, size):
+        return DECK[self.rng.integers(0, len(DECK), size=size)]
+
+    def _obs(self):
+        player_total = _hand_total(self.player_raw, self.player_ace)
+        usable = (self.player_ace & (self.player_raw + 10 <= 21)).astype(np.int64)
+        return encode_state(player_total, self.dealer_card, usable)
+
+    def reset(self):
+        """
+        Deal a fresh hand in every env
+
+        Returns:
+            states: Encoded observations [num_envs]
+        """
+        dealer = self._draw((2, self.num_envs))
+        player = self._draw((2, self.num_envs))
+
+        self.dealer_card = dealer[0]
+        self.dealer_raw = dealer.sum(axis=0)
+        self.dealer_ace = (dealer == 1).any(axis=0)
+        self.dealer_natural = (dealer.min(axis=0) == 1) & (dealer.max(axis=0) == 10)
+
+        self.player_raw = player.sum(axis=0)
+        self.player_ace = (player == 1).any(axis=0)
+        # A natural is an ace + ten-card as the first two cards and nothing else
+        self.player_natural = (player.min(axis=0) == 1) & (player.max(axis=0) == 10)
+        return self._obs()
+
+    def keep(self, mask):
+        """Drop the envs where ``mask`` is False (e.g. finished episodes)"""
+        for name in ("dealer_card", "dealer_raw", "dealer_ace", "dealer_natural",
+                     "player_raw", "player_ace", "player_natural"):
+            setattr(self, name, getattr(self, name)[mask])
+        self.num_envs = int(np.count_nonzero(mask))
+
+    def step(self, actions):
+        """
+        Apply one action per env
+
+        Args:
+            actions: 0 = stick, 1 = hit [num_envs]
+
+        Returns:
+            states: Encoded next observations [num_envs]
+            rewards: [num_envs]
+            terminated: [num_envs]
+        """
+        actions = np.asarray(actions)
+        hit = actions == 1
+        stick = ~hit
+        rewards = np.zeros(self.num_envs)
+
+        # Hit: add a card, bust ends the episode with -1
+        cards = self._draw(np.count_nonzero(hit))
+        self.player_raw[hit] += cards
+        self.player_ace[hit] |= cards == 1
+        self.player_natural[hit] = False
+        bust = hit & (_hand_total(self.player_raw, self.player_ace) > 21)
+        rewards[bust] = -1.0
+
+        # Stick: dealer draws below 17, then the hands are compared
+        if stick.any():
+            raw = self.dealer_raw[stick]
+            ace = self.dealer_ace[stick]
+            drawing = _hand_total(raw, ace) < 17
+            while drawing.any():
+                cards = self._draw(np.count_nonzero(drawing))
+                raw[drawing] += cards
+                ace[drawing] |= cards == 1
+                drawing = _hand_total(raw, ace) < 17
+            self.dealer_raw[stick] = raw
+            self.dealer_ace[stick] = ace
+
+            dealer_total = _hand_total(raw, ace)
+            player_total = _hand_total(self.player_raw[stick], self.player_ace[stick])
+            dealer_score = np.where(dealer_total > 21, 0, dealer_total)
+            player_score = np.where(player_total > 21, 0, player_total)
+            reward = np.sign(player_score - dealer_score).astype(float)
+
+            player_natural = self.player_natural[stick]
+            if self.sab:
+                reward[player_natural & ~self.dealer_natural[stick]] = 1.0
+            elif self.natural:
+                reward[player_natural & (reward == 1.0)] = 1.5
+            rewards[stick] = reward
+
+        terminated = stick | bust
+        return self._obs(), rewards, terminated
+
+
+def rollout_episodes(policy, num_episodes, batch_size=100_000, sab=True, natural=False, seed=None):
+    """
+    Play ``num_episodes`` Blackjack episodes, ``batch_size`` at a time in lockstep
+
+    Args:
+        policy: Action table over encoded states [N_STATES], or a function
+            mapping a batch of encoded states to a batch of actions
+        num_episodes: Total number of episodes
+        batch_size: Episodes simulated together
+        sab: See ``VectorBlackjack``
+        natural: See ``VectorBlackjack``
+        seed: Seed or numpy Generator
+
+    Returns:
+        rollouts: BlackjackRollouts with one row per transition
+    """
+    rng = np.random.default_rng(seed)
+    select = policy if callable(policy) else np.asarray(policy).__getitem__
+    chunks = []
+
+    for first in range(0, num_episodes, batch_size):
+        env = VectorBlackjack(min(batch_size, num_episodes - first), sab, natural, rng)
+        states = env.reset()
+        ids = np.arange(first, first + env.num_envs)
+        t = 0
+        while len(ids):
+            actions = np.asarray(select(states), dtype=np.int64)
+            next_states, rewards, terminated = env.step(actions)
+            chunks.append((ids, np.full(len(ids), t), states, actions, rewards))
+
+            alive = ~terminated
+            env.keep(alive)
+            ids, states = ids[alive], next_states[alive]
+            t += 1
+
+    episode_ids, steps, states, actions, rewards = (np.concatenate(c) for c in zip(*chunks))
+    order = np.lexsort((steps, episode_ids))
+    return BlackjackRollouts(episode_ids[order], steps[order], states[order],
+                             actions[order], rewards[order], num_episodes)
+
+
+def discounted_returns(rollouts, gamma=1.0):
+    """
+    Return G_t = Σ_k γ^k r_{t+k} for every transition, computed backwards per episode
+
+    Args:
+        rollouts: BlackjackRollouts
+        gamma: Discount factor
+
+    Returns:
+        G: [n_transitions]
+    """
+    G = rollouts.rewards.astype(float)
+    has_next = np.zeros(len(G), dtype=bool)
+    has_next[:-1] = rollouts.episode_ids[1:] == rollouts.episode_ids[:-1]
+    for t in range(int(rollouts.steps.max(initial=0)) - 1, -1, -1):
+        rows = np.flatnonzero((rollouts.steps == t) & has_next)
+        G[rows] += gamma * G[rows + 1]
+    return G
+
+
+def first_visit_mask(episode_ids, keys):
+    """
+    Mark the first occurrence of each key (state or state-action index) per episode
+
+    Args:
+        episode_ids: Sorted episode ids [n_transitions]
+        keys: Non-negative integer keys [n_transitions]
+
+    Returns:
+        mask: [n_transitions]
+    """
+    composite = episode_ids.astype(np.int64) * (int(keys.max(initial=0)) + 1) + keys
+    _, first = np.unique(composite, return_index=True)
+    mask = np.zeros(len(keys), dtype=bool)
+    mask[first] = True
+    return mask
+
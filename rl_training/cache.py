@@ -0,0 +1,360 @@
+"""
+Persistent on-disk cache of transition models and DP solutions.
+
+Tabular envs like FrozenLake are fully determined by their spec: the same
+``desc``, ``is_slippery`` and gymnasium version always give the same
+``env.unwrapped.P``, so the extracted model and its optimal solution for a
+given ``gamma`` and tolerance never change. ``ModelCache`` stores them as
+uncompressed ``.npz`` files named by a content hash of everything they
+depend on::
+
+    sha256(format, gymnasium version, kind, env spec id and kwargs,
+           map layout, solver parameters)
+
+Entries are evicted least-recently-used first once the directory grows past
+``max_bytes`` (a hit refreshes the file's mtime). A ``VERSION.json`` marker
+records the gymnasium version the entries were built with; opening the
+cache under another version empties it. An entry that cannot be read
+(truncated or corrupt) is deleted and counts as a miss, and opening the
+cache removes temporary files that crashed writers left behind.
+
+    P, R = cached_transition_model(env, sparse=True)
+    V, policy, Q = cached_solution(env, gamma=0.99, tolerance=1e-10)
+
+The cache lives in ``$RL_TRAINING_CACHE_DIR`` (default
+``~/.cache/rl_training``)::
+
+    python -m rl_training.cache           # list the entries
+    python -m rl_training.cache --clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import zipfile
+
+import gymnasium as gym
+import numpy as np
+
+from rl_training.dp import PolicyIteration, ValueIteration
+from rl_training.models import SparseTransitionModel, extract_transition_model
+
+CACHE_FORMAT = 1
+DEFAULT_MAX_BYTES = 512 * 2**20
+SOLVERS = ("value_iteration", "policy_iteration")
+# Temporary files older than this were left by a writer that crashed before its rename
+STALE_TMP_SECONDS = 3600
+
+# What reading a missing, truncated or foreign .npz can raise
+_UNREADABLE = (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile)
+
+_SPARSE_ARRAYS = ("indptr", "next_states", "probs", "rewards", "dones")
+
+
+def default_cache_dir():
+    return os.environ.get("RL_TRAINING_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "rl_training")
+
+
+def _to_json(value):
+    """``json.dumps`` fallback for NumPy values and map layouts in env kwargs"""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return _to_json(value.tolist())
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+def env_fingerprint(env):
+    """
+    JSON-able description of everything ``env.unwrapped.P`` depends on
+
+    The spec id and kwargs (minus ``render_mode``) plus the map layout, when
+    the env has one (FrozenLake's ``desc``, which also covers ``map_name``
+    and generated maps).
+    """
+    spec = env.spec
+    unwrapped = env.unwrapped
+    fingerprint = {
+        "env": spec.id if spec is not None else type(unwrapped).__qualname__,
+        "kwargs": {key: _to_json(value) for key, value in (spec.kwargs if spec is not None else {}).items()
+                   if key != "render_mode"},
+        "n_states": int(env.observation_space.n),
+        "n_actions": int(env.action_space.n),
+    }
+    desc = getattr(unwrapped, "desc", None)
+    if desc is not None:
+        fingerprint["desc"] = [row.tobytes().decode() for row in np.asarray(desc, dtype="S1")]
+    return fingerprint
+
+
+def cache_key(kind, env, **params):
+    """Content hash of an entry: cache format, gymnasium version, env and ``params``"""
+    content = {
+        "format": CACHE_FORMAT,
+        "gymnasium": gym.__version__,
+        "kind": kind,
+        "env": env_fingerprint(env),
+        "params": params,
+    }
+    blob = json.dumps(content, sort_keys=True, default=_to_json)
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+
+class ModelCache:
+    """Directory of content-addressed ``.npz`` entries with LRU size-based eviction"""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            directory: Cache directory (``default_cache_dir()`` when None)
+            max_bytes: Total size above which the least recently used
+                entries are deleted
+        """
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._check_version()
+        self.remove_stale_temporaries()
+
+    def _check_version(self):
+        """Empty the cache if it was built by another gymnasium version or cache format"""
+        marker = os.path.join(self.directory, "VERSION.json")
+        current = {"format": CACHE_FORMAT, "gymnasium": gym.__version__}
+        try:
+            with open(marker) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = None
+        if stored != current:
+            if stored is not None:
+                self.clear()
+            with open(marker, "w") as f:
+                json.dump(current, f)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Removed by another process
+
+    @staticmethod
+    def read(path):
+        """(arrays, metadata) of the entry file at ``path``; raises on an unreadable file"""
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        metadata = json.loads(str(arrays.pop("__metadata__")))
+        return arrays, metadata
+
+    def remove_stale_temporaries(self, max_age=STALE_TMP_SECONDS):
+        """Delete ``.tmp`` files of writers that crashed before renaming them into place"""
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stale = now - os.stat(path).st_mtime > max_age
+            except FileNotFoundError:
+                continue  # Renamed into place meanwhile
+            if stale:
+                self._remove(path)
+
+    def entries(self):
+        """(path, size in bytes, last use) of every entry, least recently used first"""
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # Evicted by another process
+            found.append((path, stat.st_size, stat.st_mtime))
+        return sorted(found, key=lambda entry: entry[2])
+
+    @property
+    def nbytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def __len__(self):
+        return len(self.entries())
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """
+        Load an entry
+
+        Returns:
+            (arrays, metadata) or None on a miss: dict of NumPy arrays and
+            the JSON metadata stored with them
+        """
+        path = self._path(key)
+        try:
+            arrays, metadata = self.read(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except _UNREADABLE:
+            # Truncated or corrupt (e.g. copied in half): dropped and treated as a miss
+            self._remove(path)
+            self.misses += 1
+            return None
+        os.utime(path)  # Mark as recently used
+        self.hits += 1
+        return arrays, metadata
+
+    def put(self, key, arrays, metadata=None):
+        """Store an entry (written to a temporary file and renamed, so readers never see half of it)"""
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, __metadata__=np.array(json.dumps(metadata or {}, default=_to_json)), **arrays)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in ``max_bytes``"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            self._remove(path)
+        self.remove_stale_temporaries(max_age=0)
+
+
+def _default_cache(cache):
+    return cache if cache is not None else ModelCache()
+
+
+def cached_transition_model(env, sparse=False, cache=None, verbose=False):
+    """
+    ``extract_transition_model`` through the cache
+
+    Args:
+        env: Discrete gymnasium environment exposing ``unwrapped.P``
+        sparse: Return a SparseTransitionModel instead of the dense tensor
+        cache: ModelCache (the default cache directory when None)
+        verbose: Report the extraction on a miss
+
+    Returns:
+        (P, R): as ``extract_transition_model``
+    """
+    cache = _default_cache(cache)
+    key = cache_key("model", env, sparse=sparse)
+    entry = cache.get(key)
+    if entry is not None:
+        arrays, metadata = entry
+        if sparse:
+            P = SparseTransitionModel(*(arrays[name] for name in _SPARSE_ARRAYS),
+                                      metadata["n_states"], metadata["n_actions"])
+            return P, P.expected_rewards()
+        return arrays["P"], arrays["R"]
+
+    P, R = extract_transition_model(env, sparse=sparse, verbose=verbose)
+    if sparse:
+        arrays = {name: getattr(P, name) for name in _SPARSE_ARRAYS}
+        metadata = {"n_states": P.n_states, "n_actions": P.n_actions}
+    else:
+        arrays, metadata = {"P": P, "R": R}, {}
+    cache.put(key, arrays, {**metadata, "env": env_fingerprint(env)})
+    return P, R
+
+
+def cached_solution(env, gamma=0.9, tolerance=1e-8, solver="value_iteration", max_iterations=10000,
+                    cache=None, verbose=False):
+    """
+    Optimal V*, π* and Q* of a tabular env, solved once and then loaded from the cache
+
+    The model is taken from (and stored in) the cache in its sparse form.
+
+    Args:
+        env: Discrete gymnasium environment exposing ``unwrapped.P``
+        gamma: Discount factor
+        tolerance: Solver tolerance (value iteration: largest Bellman error;
+            policy iteration: evaluation tolerance)
+        solver: 'value_iteration' or 'policy_iteration'
+        max_iterations: Iteration cap of the solver
+        cache: ModelCache (the default cache directory when None)
+        verbose: Print the solver's progress on a miss
+
+    Returns:
+        (V, policy, Q): value function [n_states], deterministic policy matrix
+        [n_states, n_actions] and Q-function [n_states, n_actions], in the
+        order ``ValueIteration.run_value_iteration`` returns them
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver '{solver}', expected one of {SOLVERS}")
+    cache = _default_cache(cache)
+    key = cache_key("solution", env, gamma=gamma, tolerance=tolerance, solver=solver,
+                    max_iterations=max_iterations)
+    entry = cache.get(key)
+    if entry is not None:
+        arrays, _ = entry
+        return arrays["V"], arrays["policy"], arrays["Q"]
+
+    P, R = cached_transition_model(env, sparse=True, cache=cache)
+    start = time.perf_counter()
+    if solver == "value_iteration":
+        V, policy, Q = ValueIteration(P, R, gamma).run_value_iteration(
+            max_iterations=max_iterations, tolerance=tolerance, verbose=verbose)
+    else:
+        policy, V, Q = PolicyIteration(P, R, gamma).run_policy_iteration(
+            max_iterations=max_iterations, eval_tolerance=tolerance, verbose=verbose)
+    cache.put(key, {"V": V, "policy": policy, "Q": Q},
+              {"env": env_fingerprint(env), "gamma": gamma, "tolerance": tolerance, "solver": solver,
+               "solve_seconds": time.perf_counter() - start})
+    return V, policy, Q
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or clear the transition model / DP solution cache")
+    parser.add_argument("--dir", help="cache directory (default: $RL_TRAINING_CACHE_DIR or ~/.cache/rl_training)")
+    parser.add_argument("--clear", action="store_true", help="delete every entry")
+    args = parser.parse_args(argv)
+
+    cache = ModelCache(args.dir)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {cache.directory}")
+        return
+    entries = cache.entries()
+    print(f"{cache.directory}: {len(entries)} entries, {sum(size for _, size, _ in entries) / 2**20:.1f} MiB "
+          f"(limit {cache.max_bytes / 2**20:.0f} MiB)")
+    for path, size, used in reversed(entries):
+        try:
+            _, metadata = ModelCache.read(path)
+        except _UNREADABLE:
+            print(f"  {os.path.basename(path)[:12]}  {size / 2**10:9.1f} KiB  unreadable (dropped on next use)")
+            continue
+        env = metadata.get("env", {})
+        details = ", ".join(f"{name}={metadata[name]}" for name in ("gamma", "tolerance", "solver")
+                            if name in metadata)
+        print(f"  {os.path.basename(path)[:12]}  {size / 2**10:9.1f} KiB  "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(used))}  "
+              f"{env.get('env', '?')} {env.get('n_states', '?')} states" + (f"  {details}" if details else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Streaming learning-curve statistics in constant memory.
+
+``LearningCurve`` replaces the per-episode reward lists the learners used to
+return. It keeps the last ``window`` rewards in a ring buffer with running
+sums, so the windowed mean, variance and win / loss / draw rates cost O(1)
+per episode, and it stores at most ``max_points`` snapshots of them for
+plotting: snapshots are taken every ``stride`` episodes and, whenever the
+snapshot arrays fill up, every other one is dropped and the stride doubles.
+A multi-million-episode run therefore yields a plot-ready curve of
+``max_points // 2`` to ``max_points`` points without ever keeping the rewards.
+"""
+
+import numpy as np
+
+SNAPSHOT_FIELDS = ("episode", "mean", "std", "win_rate", "reward")
+
+
+class LearningCurve:
+    """Windowed reward statistics over a stream of episode rewards"""
+
+    def __init__(self, window=1000, max_points=1000):
+        """
+        Args:
+            window: Number of most recent episodes the statistics cover
+            max_points: Capacity of the snapshot arrays (at least 2)
+        """
+        if window < 1 or max_points < 2:
+            raise ValueError("LearningCurve needs window >= 1 and max_points >= 2")
+        self.window = window
+        self.max_points = max_points
+        self.count = 0
+        self.total = 0.0
+
+        self._buffer = np.zeros(window)
+        self._pos = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._wins = 0
+        self._losses = 0
+
+        self.stride = 1
+        self._n_points = 0
+        self._points = {name: np.zeros(max_points, dtype=np.int64 if name == "episode" else float)
+                        for name in SNAPSHOT_FIELDS}
+
+    @classmethod
+    def from_rewards(cls, rewards, window=1000, max_points=1000):
+        """Curve of an existing reward sequence"""
+        curve = cls(window, max_points)
+        curve.update_many(rewards)
+        return curve
+
+    # Windowed statistics
+
+    @property
+    def size(self):
+        """Episodes currently in the window"""
+        return min(self.count, self.window)
+
+    @property
+    def mean(self):
+        return self._sum / self.size if self.count else 0.0
+
+    @property
+    def var(self):
+        if not self.count:
+            return 0.0
+        return max(self._sumsq / self.size - self.mean ** 2, 0.0)
+
+    @property
+    def std(self):
+        return self.var ** 0.5
+
+    @property
+    def win_rate(self):
+        return self._wins / self.size if self.count else 0.0
+
+    @property
+    def loss_rate(self):
+        return self._losses / self.size if self.count else 0.0
+
+    @property
+    def draw_rate(self):
+        return 1.0 - self.win_rate - self.loss_rate if self.count else 0.0
+
+    @property
+    def overall_mean(self):
+        """Mean reward over every episode seen"""
+        return self.total / self.count if self.count else 0.0
+
+    def __len__(self):
+        return self.count
+
+    # Updates
+
+    def _resync(self):
+        """Recompute the running sums from the buffer (bounds floating-point drift)"""
+        values = self._buffer[:self.size]
+        self._sum = float(values.sum())
+        self._sumsq = float(np.dot(values, values))
+        self._wins = int(np.count_nonzero(values > 0))
+        self._losses = int(np.count_nonzero(values < 0))
+
+    def _compact(self):
+        """Drop every other snapshot and double the stride"""
+        keep = slice(1, self._n_points, 2)  # Episodes at multiples of 2 * stride
+        kept = len(range(*keep.indices(self._n_points)))
+        for array in self._points.values():
+            array[:kept] = array[keep]
+        self._n_points = kept
+        self.stride *= 2
+
+    def _snapshot(self, reward):
+        if self._n_points == self.max_points:
+            self._compact()
+        if self.count % self.stride == 0:
+            i = self._n_points
+            self._points["episode"][i] = self.count
+            self._points["mean"][i] = self.mean
+            self._points["std"][i] = self.std
+            self._points["win_rate"][i] = self.win_rate
+            self._points["reward"][i] = reward
+            self._n_points += 1
+
+    def update(self, reward):
+        """Add one episode's reward - O(1)"""
+        reward = float(reward)
+        if self.count >= self.window:
+            old = self._buffer[self._pos]
+            self._sum -= old
+            self._sumsq -= old * old
+            self._wins -= old > 0
+            self._losses -= old < 0
+        self._buffer[self._pos] = reward
+        self._sum += reward
+        self._sumsq += reward * reward
+        self._wins += reward > 0
+        self._losses += reward < 0
+        self.total += reward
+        self.count += 1
+        self._pos += 1
+        if self._pos == self.window:
+            self._pos = 0
+            self._resync()
+        self._snapshot(reward)
+
+    def update_many(self, rewards):
+        """Add a batch of episode rewards (vectorized; same result as calling ``update`` for each)"""
+        rewards = np.asarray(rewards, dtype=float).ravel()
+        while len(rewards):
+            if self._n_points == self.max_points:
+                self._compact()
+            # Never take more snapshots in one go than there is room for
+            free = self.max_points - self._n_points
+            limit = (self.count // self.stride + free) * self.stride - self.count
+            self._extend(rewards[:limit])
+            rewards = rewards[limit:]
+
+    def _extend(self, rewards):
+        """``update_many`` for a batch that fits in the snapshot arrays"""
+        if self.count < self.window:
+            recent = self._buffer[:self.count]
+        else:
+            recent = np.concatenate((self._buffer[self._pos:], self._buffer[:self._pos]))
+        base = self.count - len(recent)
+        history = np.concatenate((recent, rewards))
+
+        # Windowed sums at the snapshot episodes from prefix sums over history
+        start = self.count + 1
+        episodes = np.arange(-(-start // self.stride) * self.stride, self.count + len(rewards) + 1, self.stride)
+        if len(episodes):
+            cumsum = np.concatenate(([0.0], np.cumsum(history)))
+            cumsq = np.concatenate(([0.0], np.cumsum(history * history)))
+            cumwins = np.concatenate(([0], np.cumsum(history > 0)))
+            end = episodes - base
+            size = np.minimum(episodes, self.window)
+            begin = end - size
+            mean = (cumsum[end] - cumsum[begin]) / size
+            var = np.maximum((cumsq[end] - cumsq[begin]) / size - mean ** 2, 0.0)
+            i = slice(self._n_points, self._n_points + len(episodes))
+            self._points["episode"][i] = episodes
+            self._points["mean"][i] = mean
+            self._points["std"][i] = np.sqrt(var)
+            self._points["win_rate"][i] = (cumwins[end] - cumwins[begin]) / size
+            self._points["reward"][i] = history[end - 1]
+            self._n_points += len(episodes)
+
+        self.count += len(rewards)
+        self.total += float(rewards.sum())
+        tail = history[-self.window:]
+        if self.count >= self.window:
+            self._buffer[:] = tail
+            self._pos = 0
+        else:
+            self._buffer[:len(tail)] = tail
+            self._pos = len(tail)
+        self._resync()
+
+    # Output
+
+    def snapshots(self):
+        """
+        Downsampled curve for plotting
+
+        Returns:
+            points: dict of arrays 'episode' (episodes seen at the snapshot),
+            'mean', 'std', 'win_rate' (over the window ending there) and
+            'reward' (that episode's reward)
+        """
+        return {name: array[:self._n_points].copy() for name, array in self._points.items()}
+
+    def summary(self):
+        """Current windowed statistics as a dict"""
+        return {
+            "episodes": self.count,
+            "window": self.size,
+            "mean": self.mean,
+            "std": self.std,
+            "win_rate": self.win_rate,
+            "loss_rate": self.loss_rate,
+            "draw_rate": self.draw_rate,
+            "overall_mean": self.overall_mean,
+        }
+
+    def to_arrays(self):
+        """Complete state as a dict of arrays (e.g. for ``np.savez``)"""
+        arrays = {f"points_{name}": array for name, array in self.snapshots().items()}
+        recent = np.concatenate((self._buffer[self._pos:self.size], self._buffer[:self._pos])) \
+            if self.count >= self.window else self._buffer[:self.count]
+        arrays["recent"] = recent
+        arrays["state"] = np.array([self.window, self.max_points, self.count, self.stride], dtype=np.int64)
+        arrays["total"] = np.array(self.total)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Inverse of ``to_arrays``"""
+        window, max_points, count, stride = (int(value) for value in arrays["state"])
+        curve = cls(window, max_points)
+        recent = np.asarray(arrays["recent"], dtype=float)
+        curve._buffer[:len(recent)] = recent
+        curve.count = count
+        curve._pos = len(recent) % window
+        curve.total = float(arrays["total"])
+        curve.stride = stride
+        curve._resync()
+        curve._n_points = len(arrays["points_episode"])
+        for name in SNAPSHOT_FIELDS:
+            curve._points[name][:curve._n_points] = arrays[f"points_{name}"]
+        return curve
@@ -0,0 +1,1008 @@
+"""
+Dynamic programming for tabular MDPs.
+
+``BellmanEngine`` evaluates the Bellman operators as NumPy contractions over
+the whole ``P[s, a, s']`` tensor instead of Python loops over ``s``, ``a`` and
+``s'``. The model can be the dense tensor or a ``SparseTransitionModel``, in
+which case every sweep costs O(nnz) instead of O(S²A).
+
+``ValueIteration`` can also run asynchronously (``method="prioritized"``):
+prioritized sweeping backs up the states with the largest Bellman errors and
+then re-examines only the states that can transition into them, so regions
+whose values have already settled cost nothing.
+
+``PolicyEvaluator``, ``PolicyImprover``, ``PolicyIteration`` and
+``ValueIteration`` are the algorithms of the policy/value iteration notebook,
+built on the engine. They live here so that scripts and the benchmark suite
+(``rl_training.benchmarks``) can import them; the notebook subclasses them to
+add its plots. ``rl_training.batched_dp`` runs them over many MDPs at once.
+"""
+
+import time
+
+import numpy as np
+
+from rl_training.models import SparseTransitionModel
+
+# Supported ways of running a policy-evaluation / value-iteration sweep
+SWEEP_METHODS = ("sync", "gauss_seidel")
+EVALUATION_METHODS = SWEEP_METHODS + ("exact",)
+VALUE_ITERATION_METHODS = SWEEP_METHODS + ("prioritized",)
+
+# Prioritized sweeping backs up, each round, every state whose Bellman error is
+# at least this fraction of the largest one
+PRIORITY_RATIO = 0.25
+
+# Policy iteration returns the lowest-index action among those within this of
+# the best one under the exact values of its final policy (the round-off of an
+# exact solve: smaller Q-value gaps are indistinguishable from ties)
+FINAL_TIE_TOLERANCE = 1e-15
+
+# FrozenLake action names, used when reporting policy changes
+ACTION_NAMES = {0: "LEFT", 1: "DOWN", 2: "RIGHT", 3: "UP"}
+
+
+def _concat_ranges(starts, lengths):
+    """Indices of the ranges [starts[i], starts[i] + lengths[i]) concatenated in order"""
+    return np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+
+
+def _lowest_best_policy(Q, tie_tolerance):
+    """One-hot policy of the lowest-index action within ``tie_tolerance`` of max_a Q(s,a)"""
+    actions = np.argmax(Q >= Q.max(axis=1, keepdims=True) - tie_tolerance, axis=1)
+    policy = np.zeros_like(Q)
+    policy[np.arange(len(Q)), actions] = 1.0
+    return policy
+
+
+class BellmanEngine:
+    """Batched Bellman backups shared by the dynamic-programming classes"""
+
+    def __init__(self, P, R, gamma=0.9):
+        """
+        Initialize the engine
+
+        Args:
+            P: Transition probability tensor [n_states, n_actions, n_states]
+                or a SparseTransitionModel
+            R: Reward matrix [n_states, n_actions] (may be None for a sparse
+                model, whose own expected rewards are used)
+            gamma: Discount factor
+        """
+        self.sparse = isinstance(P, SparseTransitionModel)
+        if self.sparse:
+            self.P = P
+            self.R = P.expected_rewards() if R is None else np.asarray(R, dtype=float)
+            probability_sums = P.probability_sums()
+        else:
+            self.P = np.asarray(P, dtype=float)
+            self.R = np.asarray(R, dtype=float)
+            probability_sums = self.P.sum(axis=2)
+        self.gamma = gamma
+        self.n_states, self.n_actions = self.R.shape
+
+        # Σ_{s'} P(s'|s,a) R(s,a) - the reward half of every backup never
+        # depends on V, so it is computed once up front
+        self.expected_reward = self.R * probability_sums
+
+    def _next_values(self, V):
+        """Σ_{s'} P(s'|s,a) V(s') for every (s, a) pair"""
+        if self.sparse:
+            return self.P.expected_next_values(V)
+        return self.P @ V
+
+    def _state_next_values(self, s, V):
+        """``_next_values`` for the actions of a single state"""
+        if self.sparse:
+            return self.P.state_next_values(s, V)
+        return self.P[s] @ V
+
+    def q_values(self, V):
+        """
+        Compute Q(s,a) = Σ_{s'} P(s'|s,a)[R(s,a) + γV(s')] for all pairs at once
+
+        Args:
+            V: Value function [n_states]
+
+        Returns:
+            Q: Action-value function [n_states, n_actions]
+        """
+        return self.expected_reward + self.gamma * self._next_values(V)
+
+    def policy_model(self, policy):
+        """
+        Collapse the MDP under a fixed policy into a Markov reward process
+
+        Args:
+            policy: Policy matrix [n_states, n_actions] where policy[s,a] = π(a|s)
+
+        Returns:
+            (P_pi, r_pi): Transition matrix [n_states, n_states] (a CSRMatrix
+            for sparse models) and expected reward [n_states] under π
+        """
+        policy = np.asarray(policy, dtype=float)
+        r_pi = np.einsum("sa,sa->s", policy, self.expected_reward)
+        if self.sparse:
+            P_pi = self.P.policy_matrix(policy)
+        else:
+            P_pi = np.einsum("sa,sat->st", policy, self.P)
+        return P_pi, r_pi
+
+    def update_policy_model(self, policy_model, policy, states):
+        """
+        Refresh ``policy_model`` in place for the states whose policy changed
+
+        Args:
+            policy_model: ``(P_pi, r_pi)`` from ``policy_model`` for the old policy
+            policy: New policy matrix [n_states, n_actions]
+            states: States where the new policy differs from the old one
+
+        Returns:
+            policy_model: The same ``(P_pi, r_pi)``, now matching ``policy``
+        """
+        P_pi, r_pi = policy_model
+        policy = np.asarray(policy, dtype=float)
+        states = np.asarray(states, dtype=np.int64)
+        r_pi[states] = np.einsum("sa,sa->s", policy[states], self.expected_reward[states])
+        if self.sparse:
+            # P^π keeps one entry per (s, a, s') transition, so only their weights change
+            starts = self.P.indptr[states * self.n_actions]
+            index = _concat_ranges(starts, self.P.indptr[(states + 1) * self.n_actions] - starts)
+            P_pi.data[index] = self.P.probs[index] * policy.ravel()[self.P.rows[index]]
+        else:
+            P_pi[states] = np.einsum("sa,sat->st", policy[states], self.P[states])
+        return policy_model
+
+    def policy_sweep(self, V, policy_model, method="sync"):
+        """
+        Apply one sweep of the Bellman expectation operator
+
+        Args:
+            V: Current value function [n_states] (left untouched)
+            policy_model: ``(P_pi, r_pi)`` from ``policy_model``
+            method: 'sync' (Jacobi, every state reads the old V) or
+                'gauss_seidel' (in-place, later states read fresh values)
+
+        Returns:
+            V_new: Value function after the sweep [n_states]
+        """
+        P_pi, r_pi = policy_model
+        if method == "sync":
+            return r_pi + self.gamma * (P_pi @ V)
+        if method == "gauss_seidel":
+            V_new = np.array(V, dtype=float)
+            row_dot = P_pi.row_dot if self.sparse else lambda s, x: P_pi[s] @ x
+            for s in range(self.n_states):
+                V_new[s] = r_pi[s] + self.gamma * row_dot(s, V_new)
+            return V_new
+        raise ValueError(f"Unknown sweep method '{method}', expected one of {SWEEP_METHODS}")
+
+    def solve_policy(self, policy_model):
+        """
+        Evaluate a policy exactly by solving (I - γP^π)V = r^π
+
+        Sparse models use scipy's sparse solver when scipy is installed and
+        fall back to a dense solve otherwise.
+
+        Args:
+            policy_model: ``(P_pi, r_pi)`` from ``policy_model``
+
+        Returns:
+            V: Value function of the policy [n_states]
+        """
+        P_pi, r_pi = policy_model
+        if self.sparse:
+            try:
+                from scipy import sparse
+                from scipy.sparse.linalg import spsolve
+            except ImportError:
+                P_pi = P_pi.toarray()
+            else:
+                P_csr = sparse.csr_matrix((P_pi.data, P_pi.indices, P_pi.indptr), shape=P_pi.shape)
+                A = sparse.identity(self.n_states, format="csr") - self.gamma * P_csr
+                return spsolve(A.tocsc(), r_pi)
+        A = np.eye(self.n_states) - self.gamma * P_pi
+        return np.linalg.solve(A, r_pi)
+
+    def optimality_sweep(self, V, method="sync"):
+        """
+        Apply one sweep of the Bellman optimality operator V(s) = max_a Q(s,a)
+
+        Args:
+            V: Current value function [n_states] (left untouched)
+            method: 'sync' or 'gauss_seidel' (see ``policy_sweep``)
+
+        Returns:
+            V_new: Value function after the sweep [n_states]
+        """
+        if method == "sync":
+            return self.q_values(V).max(axis=1)
+        if method == "gauss_seidel":
+            V_new = np.array(V, dtype=float)
+            for s in range(self.n_states):
+                V_new[s] = np.max(self.expected_reward[s] + self.gamma * self._state_next_values(s, V_new))
+            return V_new
+        raise ValueError(f"Unknown sweep method '{method}', expected one of {SWEEP_METHODS}")
+
+    def transitions(self):
+        """
+        Non-zero transitions as flat arrays sorted by (state, action)
+
+        Returns:
+            (rows, next_states, probs): ``rows`` is s * n_actions + a
+        """
+        if self.sparse:
+            return self.P.rows, self.P.next_states, self.P.probs
+        rows, next_states = np.nonzero(self.P.reshape(-1, self.n_states))
+        return rows, next_states, self.P.reshape(-1, self.n_states)[rows, next_states]
+
+    def predecessors(self):
+        """
+        Index of the states that can reach each state in one step
+
+        Returns:
+            (indptr, sources): CSR layout - the predecessors of state t are
+            ``sources[indptr[t]:indptr[t + 1]]`` (each listed once, whatever
+            the number of actions leading to t)
+        """
+        rows, targets, probs = self.transitions()
+        reachable = probs > 0
+        sources, targets = rows[reachable] // self.n_actions, targets[reachable]
+        pairs = np.unique(targets * self.n_states + sources)
+        targets, sources = np.divmod(pairs, self.n_states)
+        indptr = np.zeros(self.n_states + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=self.n_states), out=indptr[1:])
+        return indptr, sources
+
+    def greedy_policy(self, Q):
+        """
+        Build the deterministic policy that acts greedily w.r.t. Q
+
+        Args:
+            Q: Action-value function [n_states, n_actions]
+
+        Returns:
+            policy: One-hot policy matrix [n_states, n_actions]
+        """
+        policy = np.zeros((self.n_states, self.n_actions))
+        policy[np.arange(self.n_states), np.argmax(Q, axis=1)] = 1.0
+        return policy
+
+
+class PredecessorBackups:
+    """
+    Bellman optimality backups of the predecessors of a set of states
+
+    Prioritized sweeping backs up the predecessors of every state it updates.
+    The predecessor index and the transitions sorted by state are built once,
+    so each call is a handful of NumPy gathers over the affected states only.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.indptr, self.sources = engine.predecessors()
+        self.rows, self.next_states, self.probs = engine.transitions()
+        # Transitions of state s are rows[state_ptr[s]:state_ptr[s + 1]]
+        self.state_ptr = np.searchsorted(self.rows, np.arange(engine.n_states + 1) * engine.n_actions)
+
+    def predecessors(self, states):
+        """Sorted states that can reach any of ``states`` in one step"""
+        starts = self.indptr[states]
+        return np.unique(self.sources[_concat_ranges(starts, self.indptr[states + 1] - starts)])
+
+    def backup(self, states, V):
+        """max_a Q(s, a) under V for the sorted ``states``"""
+        n_actions = self.engine.n_actions
+        starts = self.state_ptr[states]
+        lengths = self.state_ptr[states + 1] - starts
+        index = _concat_ranges(starts, lengths)
+        # Row of each gathered transition within the [len(states), n_actions] block
+        local_rows = self.rows[index] - np.repeat((states - np.arange(len(states))) * n_actions, lengths)
+        next_values = np.bincount(local_rows, weights=self.probs[index] * V[self.next_states[index]],
+                                  minlength=len(states) * n_actions)
+        q = self.engine.expected_reward[states] + self.engine.gamma * next_values.reshape(len(states), -1)
+        return q.max(axis=1)
+
+    def __call__(self, states, V):
+        """
+        Args:
+            states: States whose values just changed
+            V: Current value function [n_states]
+
+        Returns:
+            (preds, values): Predecessors of ``states`` and their backed-up
+            values max_a Q(p, a) under V
+        """
+        preds = self.predecessors(states)
+        return preds, self.backup(preds, V)
+
+
+class PolicyEvaluator:
+    """Implements Policy Evaluation with detailed tracking"""
+
+    def __init__(self, P, R, gamma=0.9):
+        """
+        Initialize Policy Evaluator
+
+        Args:
+            P: Transition probability tensor [n_states, n_actions, n_states]
+                or a SparseTransitionModel
+            R: Reward matrix [n_states, n_actions]
+            gamma: Discount factor
+        """
+        self.P = P
+        self.R = R
+        self.gamma = gamma
+        self.n_states, self.n_actions = R.shape
+        self.engine = BellmanEngine(P, R, gamma)
+
+        # Tracking variables
+        self.evaluation_history = []
+        self.convergence_history = []
+        self.converged = False
+
+    def evaluate_policy(self, policy, max_iterations=1000, tolerance=1e-6, verbose=True,
+                        method="sync", initial_value=None, policy_model=None):
+        """
+        Evaluate a policy using iterative policy evaluation
+
+        Args:
+            policy: Policy matrix [n_states, n_actions] where policy[s,a] = π(a|s)
+            max_iterations: Maximum number of iterations
+            tolerance: Convergence tolerance
+            verbose: Whether to print progress
+            method: 'sync' (full sweeps), 'gauss_seidel' (in-place sweeps)
+                or 'exact' (direct linear solve)
+            initial_value: Value function to start sweeping from (zeros if
+                None), e.g. the previous policy's values
+            policy_model: Precomputed ``engine.policy_model(policy)``
+
+        Returns:
+            V: Value function [n_states] (``self.converged`` tells whether it
+            met the tolerance within max_iterations)
+        """
+        if verbose:
+            print(f"🔄 Starting Policy Evaluation")
+            print(f"  • Max iterations: {max_iterations}")
+            print(f"  • Tolerance: {tolerance}")
+            print(f"  • Discount factor: {self.gamma}")
+            print(f"  • Method: {method}")
+
+        # Initialize value function
+        if initial_value is None:
+            V = np.zeros(self.n_states)
+        else:
+            V = np.array(initial_value, dtype=float)
+        self.evaluation_history = [V.copy()]
+        self.convergence_history = []
+        self.converged = False
+
+        if policy_model is None:
+            policy_model = self.engine.policy_model(policy)
+
+        if method == "exact":
+            # Solve (I - γP^π)V = r^π in one shot instead of sweeping
+            V = self.engine.solve_policy(policy_model)
+            self.convergence_history.append(np.max(np.abs(V - self.evaluation_history[0])))
+            self.evaluation_history.append(V.copy())
+            self.converged = True
+            if verbose:
+                print(f"✅ Solved exactly with a linear solve!")
+            return V
+
+        for iteration in range(max_iterations):
+            # Apply Bellman equation for policy evaluation to every state at once
+            # V^π(s) = Σ_a π(a|s) Σ_{s'} P(s'|s,a)[R(s,a,s') + γV^π(s')]
+            V_new = self.engine.policy_sweep(V, policy_model, method=method)
+
+            # Check convergence
+            max_change = np.max(np.abs(V - V_new))
+            self.convergence_history.append(max_change)
+
+            if verbose and (iteration + 1) % 10 == 0:
+                print(f"  Iteration {iteration + 1}: Max change = {max_change:.6f}")
+
+            if max_change < tolerance:
+                self.converged = True
+                if verbose:
+                    print(f"✅ Converged in {iteration + 1} iterations!")
+                    print(f"  Final max change: {max_change:.8f}")
+                break
+
+            V = V_new.copy()
+            self.evaluation_history.append(V.copy())
+
+        else:
+            if verbose:
+                print(f"⚠️ Did not converge in {max_iterations} iterations")
+                print(f"  Final max change: {max_change:.8f}")
+
+        return V
+
+
+class PolicyImprover:
+    """Implements Policy Improvement with detailed analysis"""
+
+    def __init__(self, P, R, gamma=0.9):
+        """
+        Initialize Policy Improver
+
+        Args:
+            P: Transition probability tensor [n_states, n_actions, n_states]
+                or a SparseTransitionModel
+            R: Reward matrix [n_states, n_actions]
+            gamma: Discount factor
+        """
+        self.P = P
+        self.R = R
+        self.gamma = gamma
+        self.n_states, self.n_actions = R.shape
+        self.engine = BellmanEngine(P, R, gamma)
+
+        # States whose policy differed in the last compare_policies
+        self.changed_states = np.zeros(0, dtype=np.int64)
+
+    def compute_q_function(self, V, verbose=True):
+        """
+        Compute action-value function Q^π(s,a) from value function V^π(s)
+
+        Args:
+            V: Value function [n_states]
+            verbose: Whether to print progress
+
+        Returns:
+            Q: Action-value function [n_states, n_actions]
+        """
+        if verbose:
+            print(f"🧮 Computing Q-function from value function...")
+
+        # Q^π(s,a) = Σ_{s'} P(s'|s,a)[R(s,a,s') + γV^π(s')]
+        Q = self.engine.q_values(V)
+
+        if verbose:
+            print(f"✅ Q-function computed successfully!")
+            print(f"  • Q-function shape: {Q.shape}")
+            print(f"  • Q-values range: [{Q.min():.4f}, {Q.max():.4f}]")
+
+        return Q
+
+    def improve_policy(self, V, verbose=True, current_policy=None, tie_tolerance=1e-12):
+        """
+        Improve policy using value function (Policy Improvement step)
+
+        Args:
+            V: Value function [n_states]
+            verbose: Whether to print progress
+            current_policy: Policy being improved; where its action is within
+                tie_tolerance of the best one it is kept, so that round-off
+                between equally good actions cannot make the policy flip
+                forever
+            tie_tolerance: Q-value difference treated as a tie
+
+        Returns:
+            new_policy: Improved policy [n_states, n_actions]
+            Q: Action-value function [n_states, n_actions]
+        """
+        if verbose:
+            print(f"🚀 Starting Policy Improvement...")
+
+        # Compute Q-function
+        Q = self.compute_q_function(V, verbose=False)
+
+        # Create new policy by acting greedily w.r.t. Q-function:
+        # π'(s) = argmax_a Q^π(s,a), deterministic
+        new_policy = self.engine.greedy_policy(Q)
+        if current_policy is not None:
+            states = np.arange(self.n_states)
+            old_actions = np.argmax(current_policy, axis=1)
+            keep = Q[states, old_actions] >= Q.max(axis=1) - tie_tolerance
+            new_policy[keep] = 0.0
+            new_policy[states[keep], old_actions[keep]] = 1.0
+
+        if verbose:
+            print(f"✅ Policy improvement completed!")
+            print(f"  • New policy is deterministic")
+            print(f"  • Q-values range: [{Q.min():.4f}, {Q.max():.4f}]")
+
+        return new_policy, Q
+
+    def compare_policies(self, old_policy, new_policy, verbose=True):
+        """
+        Compare two policies and count changes
+
+        Args:
+            old_policy: Previous policy [n_states, n_actions]
+            new_policy: New policy [n_states, n_actions]
+            verbose: Whether to print detailed comparison
+
+        Returns:
+            changes: Number of states where policy changed
+            is_stable: Whether policies are identical
+            (the states whose action distribution changed at all are kept in
+            ``self.changed_states``)
+        """
+        old_actions = np.argmax(old_policy, axis=1)
+        new_actions = np.argmax(new_policy, axis=1)
+
+        changes = np.sum(old_actions != new_actions)
+        is_stable = (changes == 0)
+        # Any change of π(·|s) counts here, e.g. uniform → greedy with the same argmax
+        self.changed_states = np.flatnonzero(np.any(old_policy != new_policy, axis=1))
+
+        if verbose:
+            print(f"📊 Policy Comparison Results:")
+            print(f"  • States with policy changes: {changes}/{self.n_states}")
+            print(f"  • Policy stable: {is_stable}")
+
+            if changes > 0 and changes <= 5:  # Show details for small number of changes
+                print(f"  • Changed states:")
+                for s in np.flatnonzero(old_actions != new_actions):
+                    old_action_name = ACTION_NAMES.get(old_actions[s], old_actions[s])
+                    new_action_name = ACTION_NAMES.get(new_actions[s], new_actions[s])
+                    print(f"    State {s}: {old_action_name} → {new_action_name}")
+
+        return changes, is_stable
+
+
+class PolicyIteration:
+    """Complete Policy Iteration Algorithm with comprehensive tracking"""
+
+    # Component classes (the notebook plugs in subclasses with plotting methods)
+    evaluator_class = PolicyEvaluator
+    improver_class = PolicyImprover
+
+    def __init__(self, P, R, gamma=0.9):
+        """
+        Initialize Policy Iteration
+
+        Args:
+            P: Transition probability tensor [n_states, n_actions, n_states]
+                or a SparseTransitionModel
+            R: Reward matrix [n_states, n_actions]
+            gamma: Discount factor
+        """
+        self.P = P
+        self.R = R
+        self.gamma = gamma
+        self.n_states, self.n_actions = R.shape
+
+        # Initialize components
+        self.evaluator = self.evaluator_class(P, R, gamma)
+        self.improver = self.improver_class(P, R, gamma)
+
+        # Tracking variables
+        self.policy_history = []
+        self.value_history = []
+        self.q_history = []
+        self.iteration_stats = []
+
+    def create_random_policy(self):
+        """Create a random initial policy"""
+        policy = np.random.rand(self.n_states, self.n_actions)
+        # Normalize to make it a valid probability distribution
+        policy = policy / policy.sum(axis=1, keepdims=True)
+        return policy
+
+    def create_uniform_policy(self):
+        """Create a uniform random policy"""
+        return np.ones((self.n_states, self.n_actions)) / self.n_actions
+
+    def run_policy_iteration(self, initial_policy=None, max_iterations=100,
+                             eval_tolerance=1e-6, verbose=True, eval_method="sync",
+                             warm_start=False, eval_sweeps=None):
+        """
+        Run complete Policy Iteration algorithm
+
+        With ``eval_sweeps`` set this is modified policy iteration: every
+        evaluation starts from the previous value function and stops after
+        at most ``eval_sweeps`` sweeps, so early, far-from-optimal policies are
+        only partially evaluated. The loop ends once the policy is stable
+        *and* its evaluation has reached ``eval_tolerance``, the same
+        criterion as the full algorithm. Between iterations the policy model
+        (P^π, r^π) is only rebuilt for the states whose action changed.
+
+        Whatever the evaluation schedule, the returned policy comes from a
+        final exact evaluation (see ``_final_policy``), so full, warm-started
+        and modified policy iteration return the same policy.
+
+        Args:
+            initial_policy: Starting policy (if None, uses uniform random)
+            max_iterations: Maximum number of policy iterations
+            eval_tolerance: Tolerance for policy evaluation convergence
+            verbose: Whether to print detailed progress
+            eval_method: Policy evaluation method ('sync', 'gauss_seidel' or 'exact')
+            warm_start: Start each evaluation from the previous value function
+                (implied by eval_sweeps)
+            eval_sweeps: Cap on the sweeps per evaluation (None: evaluate to
+                eval_tolerance); not applicable to 'exact' evaluation
+
+        Returns:
+            optimal_policy: Optimal policy found
+            optimal_value: Optimal value function (the exact value of optimal_policy)
+            optimal_q: Optimal Q-function
+        """
+        if eval_sweeps is not None:
+            if eval_method == "exact":
+                raise ValueError("eval_sweeps needs an iterative eval_method, not 'exact'")
+            warm_start = True
+        eval_max_iterations = 1000 if eval_sweeps is None else eval_sweeps
+
+        if verbose:
+            print(f"🔄 STARTING POLICY ITERATION")
+            print(f"=" * 50)
+            print(f"  • Max iterations: {max_iterations}")
+            print(f"  • Evaluation tolerance: {eval_tolerance}")
+            print(f"  • Discount factor: {self.gamma}")
+            if eval_sweeps is not None:
+                print(f"  • Modified policy iteration: at most {eval_sweeps} warm-started sweeps per evaluation")
+            elif warm_start:
+                print(f"  • Warm-started evaluation")
+
+        # Initialize policy
+        if initial_policy is None:
+            current_policy = self.create_uniform_policy()
+            if verbose:
+                print(f"  • Using uniform random initial policy")
+        else:
+            current_policy = initial_policy.copy()
+            if verbose:
+                print(f"  • Using provided initial policy")
+
+        # Reset tracking
+        self.policy_history = [current_policy.copy()]
+        self.value_history = []
+        self.q_history = []
+        self.iteration_stats = []
+
+        policy_model = self.evaluator.engine.policy_model(current_policy)
+        current_value = None
+
+        if verbose:
+            print(f"\n🚀 Starting Policy Iteration Loop...")
+
+        for iteration in range(max_iterations):
+            if verbose:
+                print(f"\n📍 ITERATION {iteration + 1}")
+                print(f"-" * 30)
+
+            # Step 1: Policy Evaluation
+            if verbose:
+                print(f"📊 Step 1: Policy Evaluation")
+
+            start_time = time.time()
+            current_value = self.evaluator.evaluate_policy(
+                current_policy, max_iterations=eval_max_iterations, tolerance=eval_tolerance,
+                verbose=verbose, method=eval_method,
+                initial_value=current_value if warm_start else None, policy_model=policy_model
+            )
+            eval_time = time.time() - start_time
+            eval_converged = self.evaluator.converged
+
+            self.value_history.append(current_value.copy())
+
+            # Step 2: Policy Improvement
+            if verbose:
+                print(f"\n🚀 Step 2: Policy Improvement")
+
+            start_time = time.time()
+            new_policy, current_q = self.improver.improve_policy(
+                current_value, verbose=verbose, current_policy=current_policy
+            )
+            improve_time = time.time() - start_time
+
+            self.q_history.append(current_q.copy())
+
+            # Step 3: Check for convergence
+            if verbose:
+                print(f"\n🔍 Step 3: Convergence Check")
+
+            changes, is_stable = self.improver.compare_policies(
+                current_policy, new_policy, verbose=verbose
+            )
+
+            # Store iteration statistics
+            stats = {
+                "iteration": iteration + 1,
+                "eval_time": eval_time,
+                "eval_sweeps": len(self.evaluator.convergence_history),
+                "eval_converged": eval_converged,
+                "improve_time": improve_time,
+                "policy_changes": changes,
+                "is_stable": is_stable,
+                "max_value": np.max(current_value),
+                "avg_value": np.mean(current_value),
+                "value_range": np.max(current_value) - np.min(current_value)
+            }
+            self.iteration_stats.append(stats)
+
+            # Update policy (and its model, for the states that changed)
+            current_policy = new_policy.copy()
+            self.policy_history.append(current_policy.copy())
+            self.evaluator.engine.update_policy_model(policy_model, current_policy,
+                                                      self.improver.changed_states)
+
+            if verbose:
+                print(f"  • Evaluation time: {eval_time:.4f}s")
+                print(f"  • Improvement time: {improve_time:.4f}s")
+                print(f"  • Value function range: [{np.min(current_value):.4f}, {np.max(current_value):.4f}]")
+
+            # Check convergence (a truncated evaluation may still change the greedy policy)
+            if is_stable and eval_converged:
+                if verbose:
+                    print(f"\n🎉 CONVERGENCE ACHIEVED!")
+                    print(f"  • Policy converged in {iteration + 1} iterations")
+                    print(f"  • Optimal policy found!")
+                break
+
+        else:
+            if verbose:
+                print(f"\n⚠️ Maximum iterations ({max_iterations}) reached")
+                print(f"  • Policy may not have fully converged")
+                print(f"  • Last iteration had {changes} policy changes")
+
+        # Final policy and values from exact evaluations, independent of the evaluation schedule
+        current_policy, optimal_value, optimal_q = self._final_policy(current_policy, policy_model)
+
+        if verbose:
+            print(f"\n✅ POLICY ITERATION COMPLETED")
+            print(f"=" * 40)
+            print(f"  • Total iterations: {len(self.iteration_stats)}")
+            print(f"  • Final policy is optimal: {is_stable and eval_converged}")
+            print(f"  • Optimal value range: [{np.min(optimal_value):.4f}, {np.max(optimal_value):.4f}]")
+            print(f"  • Start state value: {optimal_value[0]:.4f}")
+
+        return current_policy, optimal_value, optimal_q
+
+    def _final_policy(self, policy, policy_model, max_iterations=100):
+        """
+        Finish with exact policy iteration under a fixed tie rule
+
+        An evaluation stopped at ``eval_tolerance`` leaves errors of up to
+        about γ/(1-γ) times it, so which of two nearly equal actions the loop
+        settles on depends on how it evaluated (cold, warm-started or
+        truncated). Solving (I - γP^π)V = r^π exactly and taking the
+        lowest-index action within ``FINAL_TIE_TOLERANCE`` of the best one,
+        until that policy is stable, gives every evaluation schedule the same
+        policy - greedy w.r.t. Q* with a deterministic tie break. Starting
+        from the loop's policy this takes one or two solves.
+
+        Returns:
+            (policy, V, Q): Final policy, its exact values and Q-function
+        """
+        engine = self.evaluator.engine
+        for _ in range(max_iterations):
+            V = engine.solve_policy(policy_model)
+            Q = self.improver.compute_q_function(V, verbose=False)
+            new_policy = _lowest_best_policy(Q, FINAL_TIE_TOLERANCE)
+            changed = np.flatnonzero(np.any(new_policy != policy, axis=1))
+            if not len(changed):
+                break
+            policy = new_policy
+            engine.update_policy_model(policy_model, policy, changed)
+        return policy, V, Q
+
+
+class ValueIteration:
+    """
+    Value Iteration algorithm implementation
+
+    Directly computes optimal value function using Bellman optimality equation:
+    V*(s) = max_a Σ_{s'} P(s'|s,a)[R(s,a,s') + γV*(s')]
+    """
+
+    def __init__(self, P, R, gamma=0.9):
+        """
+        Initialize Value Iteration
+
+        Args:
+            P: Transition probability tensor [n_states, n_actions, n_states]
+                or a SparseTransitionModel
+            R: Reward matrix [n_states, n_actions]
+            gamma: Discount factor
+        """
+        self.P = P
+        self.R = R
+        self.gamma = gamma
+        self.n_states, self.n_actions = R.shape
+        self.engine = BellmanEngine(P, R, gamma)
+
+        # Tracking variables
+        self.value_history = []
+        self.iteration_stats = []
+
+    def run_value_iteration(self, max_iterations=1000, tolerance=1e-6, verbose=True,
+                            method="sync"):
+        """
+        Run Value Iteration algorithm to find optimal value function
+
+        Args:
+            max_iterations: Maximum number of iterations (for 'prioritized', a
+                budget of max_iterations * n_states backups)
+            tolerance: Convergence tolerance on the largest Bellman error
+            verbose: Whether to print progress
+            method: 'sync' (full sweeps), 'gauss_seidel' (in-place sweeps) or
+                'prioritized' (asynchronous prioritized sweeping)
+
+        Returns:
+            optimal_value: Optimal value function V*
+            optimal_policy: Optimal policy π*
+            optimal_q: Optimal Q-function Q*
+        """
+        if method not in VALUE_ITERATION_METHODS:
+            raise ValueError(f"Unknown value iteration method '{method}', "
+                             f"expected one of {VALUE_ITERATION_METHODS}")
+        if verbose:
+            print(f"🔄 STARTING VALUE ITERATION")
+            print(f"=" * 50)
+            print(f"  • Max iterations: {max_iterations}")
+            print(f"  • Convergence tolerance: {tolerance}")
+            print(f"  • Discount factor: {self.gamma}")
+            print(f"  • Method: {method}")
+
+        self.iteration_stats = []
+
+        if method == "prioritized":
+            V, max_change = self._run_prioritized(max_iterations, tolerance, verbose)
+        else:
+            V, max_change = self._run_sweeps(max_iterations, tolerance, verbose, method)
+
+        # Extract optimal policy from optimal value function
+        optimal_q = self.engine.q_values(V)
+
+        # Extract greedy policy (deterministic)
+        optimal_policy = self.engine.greedy_policy(optimal_q)
+
+        if verbose:
+            print(f"\n✅ VALUE ITERATION COMPLETED")
+            print(f"=" * 40)
+            print(f"  • Total iterations: {len(self.iteration_stats)}")
+            print(f"  • Total backups: {self.iteration_stats[-1]['backups']}")
+            print(f"  • Converged: {max_change < tolerance}")
+            print(f"  • Optimal value range: [{np.min(V):.6f}, {np.max(V):.6f}]")
+            print(f"  • Start state value: {V[0]:.6f}")
+
+        return V, optimal_policy, optimal_q
+
+    def _record_stats(self, V, max_change, backups):
+        stats = {
+            "iteration": len(self.iteration_stats) + 1,
+            "backups": backups,
+            "max_change": max_change,
+            "max_value": np.max(V),
+            "avg_value": np.mean(V),
+            "value_range": np.max(V) - np.min(V)
+        }
+        self.iteration_stats.append(stats)
+
+    def _run_sweeps(self, max_iterations, tolerance, verbose, method):
+        """Synchronous / Gauss-Seidel sweeps over every state; returns (V, max_change)"""
+        # Initialize value function
+        V = np.zeros(self.n_states)
+        self.value_history = [V.copy()]
+
+        if verbose:
+            print(f"\n🚀 Starting Value Iteration Loop...")
+
+        for iteration in range(max_iterations):
+            if verbose and iteration < 5:
+                print(f"\n📍 ITERATION {iteration + 1}")
+                print(f"-" * 30)
+
+            # Apply Bellman optimality operator to every state at once
+            # V*(s) = max_a Σ_{s'} P(s'|s,a)[R(s,a,s') + γV(s')]
+            V_new = self.engine.optimality_sweep(V, method=method)
+
+            # Track maximum change for convergence
+            max_change = np.max(np.abs(V_new - V))
+
+            # Store iteration statistics
+            self._record_stats(V_new, max_change, (iteration + 1) * self.n_states)
+
+            if verbose and iteration < 5:
+                print(f"  • Max value change: {max_change:.8f}")
+                print(f"  • Value function range: [{np.min(V_new):.6f}, {np.max(V_new):.6f}]")
+
+            # Check convergence
+            if max_change < tolerance:
+                if verbose:
+                    print(f"\n🎉 CONVERGENCE ACHIEVED!")
+                    print(f"  • Value iteration converged in {iteration + 1} iterations")
+                    print(f"  • Final max change: {max_change:.8f}")
+                    print(f"  • Optimal value function found!")
+                break
+
+            # Update value function
+            V = V_new.copy()
+            self.value_history.append(V.copy())
+
+            # Progress update for longer runs
+            if verbose and iteration >= 5 and (iteration + 1) % 50 == 0:
+                print(f"  Iteration {iteration + 1}: Max change = {max_change:.8f}")
+
+        else:
+            if verbose:
+                print(f"\n⚠️ Maximum iterations ({max_iterations}) reached")
+                print(f"  • Final max change: {max_change:.8f}")
+                print(f"  • May not have fully converged")
+
+        return V, max_change
+
+    def _run_prioritized(self, max_iterations, tolerance, verbose):
+        """
+        Prioritized sweeping: back up the states with the largest Bellman
+        errors first, then refresh only the errors of their predecessors
+
+        ``target[s]`` always holds the backup max_a Q(s,a) under the current V
+        and ``error[s] = |target[s] - V[s]|``: assigning V[s] = target[s] can
+        only change the backups of states that reach s, so those are the only
+        ones recomputed. Each round takes every state whose error is at least
+        ``PRIORITY_RATIO`` times the largest one (and at least ``tolerance``)
+        as one batch, so a round is a few vectorized gathers rather than a
+        Python loop over a heap. It stops when every Bellman error is below
+        ``tolerance`` - the same rule as the sweeping methods. One
+        ``iteration_stats`` entry is recorded per n_states backups (the work
+        of one full sweep) and a last one at the end.
+
+        On the benchmark maps (tolerance 1e-8) this needs 30-35% fewer
+        backups than synchronous sweeps on FrozenLake 4x4 / 8x8, 4x fewer on
+        a generated 32x32 map and 15x fewer on 64x64. A round costs a few
+        times a small full sweep, though, so it is only faster in wall-clock
+        time on the larger maps (about 2x faster on 64x64, 1.4x slower on
+        32x32, 2-3x slower on 4x4 / 8x8).
+
+        Returns:
+            (V, max_change): Value function and its largest Bellman error
+        """
+        n_states = self.n_states
+        backup_predecessors = PredecessorBackups(self.engine)
+        max_backups = max_iterations * n_states
+
+        V = np.zeros(n_states)
+        self.value_history = [V.copy()]
+        target = self.engine.optimality_sweep(V)
+        error = np.abs(target - V)
+        backups = n_states
+        next_record = n_states
+        max_change = error.max()
+
+        if verbose:
+            print(f"\n🚀 Starting Prioritized Sweeping...")
+            print(f"  • Predecessor links: {len(backup_predecessors.sources)}")
+            print(f"  • States above tolerance after the first sweep: {np.count_nonzero(error >= tolerance)}")
+
+        while max_change >= tolerance and backups < max_backups:
+            batch = np.flatnonzero(error >= max(tolerance, PRIORITY_RATIO * max_change))
+            V[batch] = target[batch]
+            error[batch] = 0.0
+
+            preds, values = backup_predecessors(batch, V)
+            target[preds] = values
+            error[preds] = np.abs(values - V[preds])
+            backups += len(preds)
+            max_change = error.max()
+
+            while backups >= next_record:
+                self._record_stats(V, max_change, next_record)
+                self.value_history.append(V.copy())
+                next_record += n_states
+                if verbose and len(self.iteration_stats) % 50 == 0:
+                    print(f"  {next_record - n_states} backups: Max Bellman error = "
+                          f"{self.iteration_stats[-1]['max_change']:.8f}, "
+                          f"above tolerance = {np.count_nonzero(error >= tolerance)}")
+
+        if not self.iteration_stats or self.iteration_stats[-1]["backups"] != backups:
+            self._record_stats(V, max_change, backups)
+            self.value_history.append(V.copy())
+
+        if verbose:
+            if max_change < tolerance:
+                print(f"\n🎉 CONVERGENCE ACHIEVED!")
+                print(f"  • Prioritized sweeping converged after {backups} backups "
+                      f"({backups / n_states:.1f} sweeps' worth)")
+                print(f"  • Final max Bellman error: {max_change:.8f}")
+            else:
+                print(f"\n⚠️ Backup budget ({max_backups}) reached")
+                print(f"  • Final max Bellman error: {max_change:.8f}")
+                print(f"  • May not have fully converged")
+
+        return V, max_change
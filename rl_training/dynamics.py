@@ -0,0 +1,339 @@
+"""
+Batched NumPy models of the Pendulum-v1 and MountainCar-v0 dynamics.
+
+gymnasium steps one state at a time. ``PendulumDynamics`` and
+``MountainCarDynamics`` apply the same equations, in the same floating-point
+order, to a whole batch of states at once, so a planner
+(``rl_training.mpc``) can roll out thousands of candidate action sequences
+per control tick. The state is the env's internal state
+(``env.unwrapped.state``), not the observation: Pendulum's is (θ, θ̇) and
+MountainCar's (position, velocity). Batches are laid out ``[2, N]``, one
+contiguous row per state variable, with actions ``[N]``.
+
+``step`` reproduces the env exactly in float64. ``plan_step`` plus
+``action_rewards`` is the planner's version: it also runs in float32 (where
+NumPy's vectorized sin and cos are an order of magnitude faster), avoids the
+env's slow floating-point modulo and lets the action-only reward terms be
+computed for a whole plan at once, at the price of rounding differences
+that do not matter for ranking candidate plans.
+
+``verify_dynamics`` plays an env with random actions and replays every
+transition through ``step`` from the env's own previous state, reporting
+the largest state, reward and termination mismatch::
+
+    python -m rl_training.dynamics --steps 5000
+"""
+
+import argparse
+
+import gymnasium as gym
+import numpy as np
+
+from rl_training.manual import PENDULUM_EPISODE_STEPS
+
+# Largest model/env mismatch ``main`` accepts. States match exactly; Pendulum
+# rewards can differ in the last float32 bit of the 0.001 u² term, which
+# the env squares as a NumPy float32 scalar (not correctly rounded) and the
+# model as an array
+STATE_TOLERANCE = 0.0
+REWARD_TOLERANCE = 1e-9
+
+
+def angle_normalize(x):
+    """Angle wrapped to [-π, π), as gymnasium's Pendulum does"""
+    return ((x + np.pi) % (2 * np.pi)) - np.pi
+
+
+class PendulumDynamics:
+    """Pendulum-v1: torque-limited swing-up, continuous torque"""
+
+    env_id = "Pendulum-v1"
+    discrete = False
+
+    def __init__(self, g=10.0, m=1.0, l=1.0, dt=0.05, max_speed=8.0, max_torque=2.0):
+        self.g = g
+        self.m = m
+        self.l = l
+        self.dt = dt
+        self.max_speed = max_speed
+        self.max_torque = max_torque
+        self.action_low = -max_torque
+        self.action_high = max_torque
+        # Grouped exactly like PendulumEnv.step, so results match bit for bit
+        self._gravity = 3 * g / (2 * l)
+        self._inertia = 3.0 / (m * l**2)
+
+    @classmethod
+    def from_env(cls, env):
+        env = env.unwrapped
+        return cls(env.g, env.m, env.l, env.dt, env.max_speed, env.max_torque)
+
+    @staticmethod
+    def get_state(env):
+        """Internal state of a live env [2]"""
+        return np.array(env.unwrapped.state, dtype=float)
+
+    @staticmethod
+    def state_from_obs(obs):
+        """(θ, θ̇) with θ in [-π, π] from an observation (cos θ, sin θ, θ̇)"""
+        obs = np.asarray(obs, dtype=float)
+        return np.array([np.arctan2(obs[1], obs[0]), obs[2]])
+
+    @staticmethod
+    def observe(states):
+        """Observations of states [2, N], as the env returns them [N, 3]"""
+        theta, theta_dot = states
+        return np.stack([np.cos(theta), np.sin(theta), theta_dot], axis=-1).astype(np.float32)
+
+    def step(self, states, actions):
+        """
+        One env step for every state, exactly as PendulumEnv.step
+
+        Args:
+            states: (θ, θ̇) [2, N]
+            actions: Torques [N] or [N, 1]
+
+        Returns:
+            (next_states, rewards, terminated): [2, N], [N] and [N] (never
+            terminated; episodes are cut by the time limit)
+        """
+        theta, theta_dot = states
+        # The action keeps its dtype: the env computes float32 torques in float32
+        u = np.clip(np.asarray(actions).reshape(len(theta)), -self.max_torque, self.max_torque)
+        costs = angle_normalize(theta) ** 2 + 0.1 * theta_dot**2 + 0.001 * (u**2)
+
+        new_theta_dot = theta_dot + (self._gravity * np.sin(theta) + self._inertia * u) * self.dt
+        new_theta_dot = np.clip(new_theta_dot, -self.max_speed, self.max_speed)
+        new_theta = theta + new_theta_dot * self.dt
+        return np.stack([new_theta, new_theta_dot]), -costs, np.zeros(len(theta), dtype=bool)
+
+    def plan_step(self, states, actions):
+        """
+        ``step`` for planning: keeps θ wrapped to [-π, π) instead of
+        normalizing it for the cost, keeps the dtype of ``states`` and leaves
+        the action's share of the reward to ``action_rewards``
+
+        Args:
+            states: (θ, θ̇) [2, N] with θ in [-π, π)
+            actions: Torques within ±max_torque [N]
+
+        Returns:
+            (next_states, state_rewards, terminated): [2, N], [N] and False
+        """
+        theta, theta_dot = states
+        rewards = theta * theta
+        rewards += 0.1 * (theta_dot * theta_dot)
+        np.negative(rewards, out=rewards)
+
+        acceleration = np.sin(theta)
+        acceleration *= self._gravity
+        acceleration += self._inertia * actions
+        next_states = np.empty_like(states)
+        new_theta, new_theta_dot = next_states
+        np.clip(theta_dot + acceleration * self.dt, -self.max_speed, self.max_speed, out=new_theta_dot)
+        np.add(theta, new_theta_dot * self.dt, out=new_theta)
+        # One step moves θ by at most max_speed * dt < 2π, so one wrap is enough
+        new_theta -= (2 * np.pi) * (new_theta >= np.pi)
+        new_theta += (2 * np.pi) * (new_theta < -np.pi)
+        return next_states, rewards, False
+
+    def action_rewards(self, actions):
+        """Reward terms of ``step`` that only depend on the action: -0.001 u² for actions of any shape"""
+        return -0.001 * (actions * actions)
+
+    def energy(self, actions):
+        """Energy of the lab's bookkeeping (``torque_energy``): |torque| * 0.1 per step"""
+        return np.abs(actions) * 0.1
+
+    def terminal_value(self, states):
+        """Value estimate at the end of a planning horizon (none: the costs are dense)"""
+        return 0.0
+
+
+class MountainCarDynamics:
+    """MountainCar-v0: underpowered car, discrete action 0 (left), 1 (none), 2 (right)"""
+
+    env_id = "MountainCar-v0"
+    discrete = True
+    n_actions = 3
+
+    # Value of one unit of mechanical energy short of the goal, in steps (the
+    # car gains at most force * max_speed energy per step; about half that
+    # on average over a swing)
+    STEPS_PER_ENERGY = 2.0 / (0.001 * 0.07)
+
+    def __init__(self, min_position=-1.2, max_position=0.6, max_speed=0.07, goal_position=0.5,
+                 goal_velocity=0.0, force=0.001, gravity=0.0025):
+        self.min_position = min_position
+        self.max_position = max_position
+        self.max_speed = max_speed
+        self.goal_position = goal_position
+        self.goal_velocity = goal_velocity
+        self.force = force
+        self.gravity = gravity
+        self.goal_energy = float(self.mechanical_energy(np.array([goal_position, goal_velocity])))
+
+    @classmethod
+    def from_env(cls, env):
+        env = env.unwrapped
+        return cls(env.min_position, env.max_position, env.max_speed, env.goal_position,
+                   env.goal_velocity, env.force, env.gravity)
+
+    @staticmethod
+    def get_state(env):
+        """Internal state of a live env [2]"""
+        return np.array(env.unwrapped.state, dtype=float)
+
+    @staticmethod
+    def state_from_obs(obs):
+        """(position, velocity) from an observation (the float32 rounding is lost)"""
+        return np.asarray(obs, dtype=float)
+
+    @staticmethod
+    def observe(states):
+        """Observations of states [2, N], as the env returns them [N, 2]"""
+        return np.asarray(states, dtype=np.float32).T
+
+    def step(self, states, actions):
+        """
+        One env step for every state, exactly as MountainCarEnv.step
+
+        Args:
+            states: (position, velocity) [2, N]
+            actions: Actions in {0, 1, 2} [N]
+
+        Returns:
+            (next_states, rewards, terminated): [2, N], [N] (always -1) and [N]
+        """
+        position, velocity = states
+        velocity = velocity + ((np.asarray(actions) - 1) * self.force + np.cos(3 * position) * (-self.gravity))
+        velocity = np.clip(velocity, -self.max_speed, self.max_speed)
+        position = np.clip(position + velocity, self.min_position, self.max_position)
+        velocity = np.where((position == self.min_position) & (velocity < 0), 0.0, velocity)
+
+        terminated = (position >= self.goal_position) & (velocity >= self.goal_velocity)
+        return np.stack([position, velocity]), np.full(len(position), -1.0), terminated
+
+    def plan_step(self, states, actions):
+        """
+        ``step`` for planning: the same arithmetic without temporaries, in
+        the dtype of ``states`` (float32 states need float32 actions)
+
+        Returns:
+            (next_states, state_rewards, terminated): [2, N], -1 and [N]
+        """
+        position, velocity = states
+        next_states = np.empty_like(states)
+        new_position, new_velocity = next_states
+        np.cos(3 * position, out=new_velocity)
+        new_velocity *= -self.gravity
+        new_velocity += (actions - 1) * self.force
+        new_velocity += velocity
+        np.clip(new_velocity, -self.max_speed, self.max_speed, out=new_velocity)
+        np.clip(position + new_velocity, self.min_position, self.max_position, out=new_position)
+        new_velocity[(new_position == self.min_position) & (new_velocity < 0)] = 0.0
+        terminated = (new_position >= self.goal_position) & (new_velocity >= self.goal_velocity)
+        return next_states, -1.0, terminated
+
+    def action_rewards(self, actions):
+        """Reward terms of ``step`` that only depend on the action (none)"""
+        return np.zeros(np.shape(actions))
+
+    def energy(self, actions):
+        """Energy of the lab's bookkeeping (``push_energy``): one unit per push"""
+        return (actions != 1).astype(float)
+
+    def mechanical_energy(self, states):
+        """Kinetic plus potential energy of the hill (height ∝ sin 3x) of states [2, N]"""
+        position, velocity = states
+        return 0.5 * velocity**2 + self.gravity / 3 * np.sin(3 * position)
+
+    def terminal_value(self, states):
+        """
+        Value estimate at the end of a planning horizon: minus the steps still
+        needed to pump the missing energy (the -1 rewards alone cannot tell
+        two unfinished rollouts apart)
+        """
+        deficit = np.maximum(self.goal_energy - self.mechanical_energy(states), 0.0)
+        return -self.STEPS_PER_ENERGY * deficit
+
+
+DYNAMICS = {
+    PendulumDynamics.env_id: PendulumDynamics,
+    MountainCarDynamics.env_id: MountainCarDynamics,
+}
+
+
+def make_dynamics(env_id):
+    """Dynamics model of 'Pendulum-v1' or 'MountainCar-v0'"""
+    if env_id not in DYNAMICS:
+        raise ValueError(f"No dynamics model for '{env_id}', expected one of {tuple(DYNAMICS)}")
+    return DYNAMICS[env_id]()
+
+
+def verify_dynamics(env_id, num_steps=2000, seed=0):
+    """
+    Step an env with random actions and replay every transition through the model
+
+    Each transition starts the model from the env's own previous state, so
+    errors cannot accumulate; episodes restart whenever the env ends one.
+
+    Args:
+        env_id: 'Pendulum-v1' or 'MountainCar-v0'
+        num_steps: Transitions to compare
+        seed: Seed of the env and of the action sampling
+
+    Returns:
+        errors: dict with steps, max_state_error, max_obs_error,
+        max_reward_error and terminated_mismatches
+    """
+    kwargs = {"max_episode_steps": PENDULUM_EPISODE_STEPS} if env_id == PendulumDynamics.env_id else {}
+    env = gym.make(env_id, **kwargs)
+    model = DYNAMICS[env_id].from_env(env)
+    env.action_space.seed(seed)
+    env.reset(seed=seed)
+    errors = {"steps": num_steps, "max_state_error": 0.0, "max_obs_error": 0.0, "max_reward_error": 0.0,
+              "terminated_mismatches": 0}
+    try:
+        for _ in range(num_steps):
+            state = model.get_state(env)
+            action = env.action_space.sample()
+            obs, reward, terminated, truncated, _ = env.step(action)
+            next_states, rewards, model_terminated = model.step(state[:, None], np.asarray(action)[None])
+
+            errors["max_state_error"] = max(errors["max_state_error"],
+                                            float(np.max(np.abs(next_states[:, 0] - model.get_state(env)))))
+            errors["max_obs_error"] = max(errors["max_obs_error"],
+                                          float(np.max(np.abs(model.observe(next_states)[0] - obs))))
+            errors["max_reward_error"] = max(errors["max_reward_error"], abs(float(rewards[0]) - float(reward)))
+            errors["terminated_mismatches"] += int(bool(model_terminated[0]) != terminated)
+            if terminated or truncated:
+                env.reset()
+    finally:
+        env.close()
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the NumPy dynamics models against gymnasium")
+    parser.add_argument("--env", choices=tuple(DYNAMICS), action="append",
+                        help="env to check (repeatable; default: all)")
+    parser.add_argument("--steps", type=int, default=2000, help="transitions per env")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for env_id in args.env or DYNAMICS:
+        errors = verify_dynamics(env_id, args.steps, args.seed)
+        passed = (errors["max_state_error"] <= STATE_TOLERANCE and errors["max_reward_error"] <= REWARD_TOLERANCE
+                  and errors["terminated_mismatches"] == 0)
+        failed |= not passed
+        print(f"{'✅' if passed else '❌'} {env_id}: {errors['steps']} steps | "
+              f"state error {errors['max_state_error']:.2e} | obs error {errors['max_obs_error']:.2e} | "
+              f"reward error {errors['max_reward_error']:.2e} | "
+              f"termination mismatches {errors['terminated_mismatches']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
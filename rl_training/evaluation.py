@@ -0,0 +1,202 @@
+"""
+Vectorized policy evaluation over ``gymnasium.vector`` envs.
+
+``evaluate_episodes`` plays a fixed policy in N sub-envs at once (in this
+process with ``vectorization_mode='sync'``, or one subprocess per env with
+'async') and collects per-episode returns and lengths into preallocated
+arrays. It reports the mean return with a normal-approximation confidence
+interval, win / loss / draw counts and episode-length statistics, and it can
+stop as soon as the confidence interval is narrower than a target width.
+
+Policies can be
+    - tabular: a ``TabularPolicy``, an action table [n_states] or a policy
+      matrix [n_states, n_actions] (acted on greedily)
+    - a per-state callable ``policy(state) -> action`` (``simple_policy``,
+      ``RandomAgent.select_action``, ...)
+    - a batched callable ``policy(observations) -> actions`` with
+      ``batched=True``
+"""
+
+import time
+from statistics import NormalDist
+
+import gymnasium as gym
+import numpy as np
+
+from rl_training.tabular import StateIndexer, TabularPolicy
+
+
+def make_vector_env(env, num_envs=8, vectorization_mode="sync", max_episode_steps=None, **kwargs):
+    """
+    Build a headless vector env with ``num_envs`` copies of an env
+
+    Args:
+        env: Env id, EnvSpec, or an existing env whose spec (map, slippery
+            flag, ``sab``, ...) is copied
+        num_envs: Number of sub-envs
+        vectorization_mode: 'sync' (same process) or 'async' (subprocesses)
+        max_episode_steps: Override the time limit of every episode
+        **kwargs: Extra keyword arguments for the env constructor
+
+    Returns:
+        envs: gymnasium VectorEnv
+    """
+    spec = env.spec if isinstance(env, gym.Env) else env
+    if max_episode_steps is not None:
+        kwargs["max_episode_steps"] = max_episode_steps
+    # Evaluation never renders, whatever the source env was created with
+    kwargs.setdefault("render_mode", None)
+    return gym.make_vec(spec, num_envs=num_envs, vectorization_mode=vectorization_mode, **kwargs)
+
+
+def _encode_observations(indexer, observations):
+    if isinstance(observations, tuple):
+        return indexer.encode_batch(*observations)
+    return indexer.encode_batch(observations)
+
+
+def _split_observations(observations):
+    """Per-env observations, in the form a single env returns them"""
+    if isinstance(observations, tuple):
+        return list(zip(*(np.asarray(column).tolist() for column in observations)))
+    return list(observations)
+
+
+def make_action_selector(policy, observation_space, batched=False):
+    """
+    Wrap any supported policy into ``select(observations) -> actions`` over a batch
+
+    Args:
+        policy: Tabular policy, per-state callable or batched callable
+        observation_space: Observation space of a single env
+        batched: ``policy`` already maps a batch of observations to actions
+    """
+    if batched:
+        return lambda observations: np.asarray(policy(observations))
+
+    if isinstance(policy, TabularPolicy):
+        indexer, table = policy.indexer, policy.table
+    elif isinstance(policy, np.ndarray):
+        indexer = StateIndexer.from_space(observation_space)
+        table = np.argmax(policy, axis=1) if policy.ndim == 2 else policy.astype(np.int64)
+    elif callable(policy):
+        return lambda observations: np.array([policy(state) for state in _split_observations(observations)])
+    else:
+        raise TypeError(f"Unsupported policy type {type(policy).__name__}")
+    return lambda observations: table[_encode_observations(indexer, observations)]
+
+
+def evaluate_episodes(envs, policy, num_episodes=10000, batched=False, seed=None, ci_width=None,
+                      confidence=0.95, min_episodes=100, success_threshold=None):
+    """
+    Run a policy on a vector env and summarize the episode returns
+
+    Exactly the first ``num_episodes`` episodes started are counted, so
+    short episodes are not over-represented when the target is reached.
+
+    Args:
+        envs: gymnasium VectorEnv (see ``make_vector_env``)
+        policy: See ``make_action_selector``
+        num_episodes: Maximum number of episodes
+        batched: ``policy`` maps a batch of observations to a batch of actions
+        seed: Seed for ``envs.reset`` (sub-env i gets seed + i)
+        ci_width: Stop once the confidence interval of the mean return is
+            narrower than this (None = always run ``num_episodes``)
+        confidence: Confidence level of the interval
+        min_episodes: Episodes before the early-stopping check kicks in
+        success_threshold: Also report the fraction of returns >= this value
+
+    Returns:
+        results: dict with avg_reward, std_reward, ci_low, ci_high,
+        wins / losses / draws (return > 0, < 0, == 0) and their rates,
+        avg_length, std_length, min_length, max_length, success_rate (with
+        success_threshold), total_rewards, episode_lengths, num_episodes,
+        stopped_early, elapsed and episodes_per_second
+    """
+    select = make_action_selector(policy, envs.single_observation_space, batched)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    num_envs = envs.num_envs
+
+    total_rewards = np.zeros(num_episodes)
+    episode_lengths = np.zeros(num_episodes, dtype=np.int64)
+    completed = 0
+    reward_sum = reward_sq_sum = 0.0
+    stopped_early = False
+
+    returns = np.zeros(num_envs)
+    lengths = np.zeros(num_envs, dtype=np.int64)
+    # counting[i]: the episode currently running in env i is one of the first num_episodes
+    counting = np.arange(num_envs) < num_episodes
+    started = int(counting.sum())
+    # Envs whose next step is gymnasium's autoreset step (no transition)
+    autoreset = np.zeros(num_envs, dtype=bool)
+
+    start_time = time.perf_counter()
+    observations, _ = envs.reset(seed=seed)
+    while counting.any():
+        observations, rewards, terminated, truncated, _ = envs.step(select(observations))
+        active = ~autoreset
+        returns[active] += rewards[active]
+        lengths[active] += 1
+
+        done = (terminated | truncated) & active
+        finished = np.flatnonzero(done & counting)
+        if len(finished):
+            new = slice(completed, completed + len(finished))
+            total_rewards[new] = returns[finished]
+            episode_lengths[new] = lengths[finished]
+            completed += len(finished)
+            reward_sum += returns[finished].sum()
+            reward_sq_sum += np.square(returns[finished]).sum()
+
+        # Envs that just finished start a counted episode while the budget lasts
+        ended = np.flatnonzero(done)
+        counting[ended] = False
+        extra = min(len(ended), num_episodes - started)
+        counting[ended[:extra]] = True
+        started += extra
+        returns[done] = 0.0
+        lengths[done] = 0
+        autoreset = terminated | truncated
+
+        if ci_width is not None and len(finished) and completed >= max(min_episodes, 2):
+            variance = max(reward_sq_sum - reward_sum ** 2 / completed, 0.0) / (completed - 1)
+            if 2 * z * np.sqrt(variance / completed) <= ci_width:
+                stopped_early = True
+                break
+
+    elapsed = time.perf_counter() - start_time
+    total_rewards, episode_lengths = total_rewards[:completed], episode_lengths[:completed]
+    n = max(completed, 1)
+    std_error = total_rewards.std(ddof=1) / np.sqrt(completed) if completed > 1 else np.inf
+    avg_reward = float(total_rewards.mean()) if completed else float("nan")
+    wins = int(np.count_nonzero(total_rewards > 0))
+    losses = int(np.count_nonzero(total_rewards < 0))
+    draws = completed - wins - losses
+
+    results = {
+        "num_episodes": completed,
+        "avg_reward": avg_reward,
+        "std_reward": float(total_rewards.std()) if completed else float("nan"),
+        "ci_low": avg_reward - z * std_error,
+        "ci_high": avg_reward + z * std_error,
+        "confidence": confidence,
+        "wins": wins,
+        "losses": losses,
+        "draws": draws,
+        "win_rate": wins / n,
+        "loss_rate": losses / n,
+        "draw_rate": draws / n,
+        "avg_length": float(episode_lengths.mean()) if completed else float("nan"),
+        "std_length": float(episode_lengths.std()) if completed else float("nan"),
+        "min_length": int(episode_lengths.min()) if completed else 0,
+        "max_length": int(episode_lengths.max()) if completed else 0,
+        "total_rewards": total_rewards,
+        "episode_lengths": episode_lengths,
+        "stopped_early": stopped_early,
+        "elapsed": elapsed,
+        "episodes_per_second": completed / elapsed if elapsed > 0 else float("inf"),
+    }
+    if success_threshold is not None:
+        results["success_rate"] = float(np.count_nonzero(total_rewards >= success_threshold)) / n
+    return results
@@ -0,0 +1,252 @@
+"""
+Headless, unthrottled episode runner for the manual-control lab scripts.
+
+The scripts in ``day1/morning/lab`` read actions from the keyboard and pace
+themselves with ``pygame.time.Clock``. In headless mode they hand a
+controller to ``run_controller`` instead: no window, no pygame, no frame-rate
+cap, so thousands of episodes run at full simulator speed and report the same
+per-episode numbers the interactive loop prints.
+
+A controller is any callable ``controller(obs) -> action``. If it also has a
+``reset()`` method, that is called at the start of every episode.
+``RecordedController`` replays previously recorded action sequences.
+"""
+
+import os
+
+import numpy as np
+
+from rl_training.profiling import NULL_PROFILER
+
+
+class RecordedController:
+    """Replay recorded action sequences, one recorded episode per env episode"""
+
+    def __init__(self, episodes, default_action=0):
+        """
+        Args:
+            episodes: List of action arrays, one per recorded episode; replay
+                cycles through them
+            default_action: Action once a recording runs out before the env
+                episode ends
+        """
+        if not len(episodes):
+            raise ValueError("RecordedController needs at least one recorded episode")
+        self.episodes = [np.asarray(actions) for actions in episodes]
+        self.default_action = default_action
+        self.episode = -1
+        self.step = 0
+
+    @classmethod
+    def load(cls, path, default_action=0):
+        """
+        Load recordings from a trajectory directory written with ``--record``,
+        an ``.npz`` (``actions`` plus ``episode_starts`` offsets) or a ``.npy``
+        file holding a single episode's actions
+        """
+        if os.path.isdir(path):
+            from rl_training.recording import TrajectoryStore
+            return cls(TrajectoryStore(path).action_episodes(), default_action)
+        data = np.load(path, allow_pickle=False)
+        if isinstance(data, np.ndarray):
+            return cls([data], default_action)
+        with data:
+            actions, starts = data["actions"], data["episode_starts"]
+        return cls(np.split(actions, starts[1:]), default_action)
+
+    def reset(self):
+        self.episode = (self.episode + 1) % len(self.episodes)
+        self.step = 0
+
+    def __call__(self, obs):
+        actions = self.episodes[self.episode]
+        if self.step >= len(actions):
+            return self.default_action
+        action = actions[self.step]
+        self.step += 1
+        return action
+
+
+def run_controller(env, controller, num_episodes=1, max_steps=None, energy=None, rating=None, seed=None,
+                   profiler=NULL_PROFILER):
+    """
+    Play episodes with a controller as fast as the simulator allows
+
+    Args:
+        env: Env created without ``render_mode="human"``
+        controller: ``controller(obs) -> action`` (optionally with ``reset()``)
+        num_episodes: Number of episodes
+        max_steps: End an episode after this many steps (on top of the env's
+            own time limit)
+        energy: ``energy(action) -> float`` cost of one action, summed into
+            the episode's 'energy'
+        rating: ``rating(episode) -> (rating, description)`` from the
+            per-episode metrics, e.g. built on ``get_performance_rating``
+        seed: Seed for the first ``env.reset``
+        profiler: ``rl_training.profiling.Profiler`` to time the 'reset',
+            'policy', 'env.step' and 'bookkeeping' phases
+
+    Returns:
+        episodes: One dict per episode with episode, total_reward,
+        avg_reward, steps, energy, terminated, truncated, final_obs and
+        (with ``rating``) rating / rating_desc
+    """
+    reset = getattr(controller, "reset", None)
+    episodes = []
+    profiler.start_episode()
+    t = profiler.now()
+    obs, _ = env.reset(seed=seed)
+
+    for episode in range(1, num_episodes + 1):
+        if episode > 1:
+            profiler.start_episode()
+            t = profiler.now()
+            obs, _ = env.reset()
+        if reset is not None:
+            reset()
+        t = profiler.lap("reset", t)
+
+        total_reward = 0.0
+        energy_used = 0.0
+        steps = 0
+        terminated = truncated = False
+        while not (terminated or truncated):
+            action = controller(obs)
+            t = profiler.lap("policy", t)
+            obs, reward, terminated, truncated, _ = env.step(action)
+            t = profiler.lap("env.step", t)
+            total_reward += float(reward)
+            steps += 1
+            if energy is not None:
+                energy_used += energy(action)
+            if max_steps is not None and steps >= max_steps:
+                truncated = True
+            t = profiler.lap("bookkeeping", t)
+        profiler.end_episode(steps)
+
+        result = {
+            "episode": episode,
+            "total_reward": total_reward,
+            "avg_reward": total_reward / steps,
+            "steps": steps,
+            "energy": energy_used,
+            "terminated": bool(terminated),
+            "truncated": bool(truncated) and not terminated,
+            "final_obs": np.asarray(obs),
+        }
+        if rating is not None:
+            result["rating"], result["rating_desc"] = rating(result)
+        episodes.append(result)
+
+    return episodes
+
+
+def summarize_episodes(episodes):
+    """
+    Aggregate the per-episode metrics of ``run_controller``
+
+    Returns:
+        summary: dict with episodes, mean/std/min/max of total_reward, mean
+        avg_reward, steps and energy, the terminated fraction and a count per
+        rating (when rated)
+    """
+    total = np.array([episode["total_reward"] for episode in episodes])
+    summary = {
+        "episodes": len(episodes),
+        "mean_total_reward": float(total.mean()),
+        "std_total_reward": float(total.std()),
+        "min_total_reward": float(total.min()),
+        "max_total_reward": float(total.max()),
+        "mean_avg_reward": float(np.mean([episode["avg_reward"] for episode in episodes])),
+        "mean_steps": float(np.mean([episode["steps"] for episode in episodes])),
+        "mean_energy": float(np.mean([episode["energy"] for episode in episodes])),
+        "terminated_rate": float(np.mean([episode["terminated"] for episode in episodes])),
+    }
+    if "rating" in episodes[0]:
+        ratings = {}
+        for episode in episodes:
+            ratings[episode["rating"]] = ratings.get(episode["rating"], 0) + 1
+        summary["ratings"] = ratings
+    return summary
+
+
+def print_summary(summary):
+    """Print a ``summarize_episodes`` result in the scripts' report style"""
+    print(f"\n📈 HEADLESS RUN: {summary['episodes']} episodes")
+    print(f"   Total Reward: {summary['mean_total_reward']:.1f} ± {summary['std_total_reward']:.1f} "
+          f"(min {summary['min_total_reward']:.1f}, max {summary['max_total_reward']:.1f})")
+    print(f"   Average Reward per step: {summary['mean_avg_reward']:.3f}")
+    print(f"   Steps: {summary['mean_steps']:.1f}")
+    print(f"   Energy Used: {summary['mean_energy']:.1f}")
+    print(f"   Terminated: {summary['terminated_rate']:.1%}")
+    for rating, count in summary.get("ratings", {}).items():
+        print(f"   {rating}: {count} ({count / summary['episodes']:.1%})")
+
+
+def print_episode(result):
+    """One-line report of a ``run_controller`` episode"""
+    line = (f"Episode {result['episode']:4d} | Total Reward: {result['total_reward']:8.1f} | "
+            f"Steps: {result['steps']:4d} | Energy Used: {result['energy']:6.1f}")
+    if "rating" in result:
+        line += f" | {result['rating']}"
+    print(line)
+
+
+def add_headless_arguments(parser, default_episodes=100):
+    """Command-line options shared by the manual-control scripts"""
+    parser.add_argument("--headless", action="store_true",
+                        help="no window and no frame-rate cap; actions come from --controller")
+    parser.add_argument("--episodes", type=int, default=default_episodes,
+                        help="number of headless episodes")
+    parser.add_argument("--controller", choices=("scripted", "recorded", "mpc"), default="scripted",
+                        help="scripted policy, recorded actions (--actions) or the model-predictive "
+                             "autopilot (Pendulum and MountainCar)")
+    parser.add_argument("--actions", help="recorded actions (a --record directory, .npz with "
+                                          "actions/episode_starts, or .npy)")
+    parser.add_argument("--mpc-method", choices=("cem", "random"), default="cem",
+                        help="MPC planner: cross-entropy method or random shooting")
+    parser.add_argument("--mpc-samples", type=int, help="MPC action sequences per planning round")
+    parser.add_argument("--mpc-horizon", type=int, help="MPC planning horizon in env steps")
+    parser.add_argument("--seed", type=int, help="seed for the first reset")
+    parser.add_argument("--verbose", action="store_true", help="print every headless episode")
+    parser.add_argument("--record", metavar="DIR",
+                        help="append every transition to a trajectory directory (see rl_training.recording)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="time the loop's phases and write the report to FILE (.json or .csv)")
+    parser.add_argument("--physics-hz", type=float,
+                        help="interactive env steps per second (default: the env's render_fps)")
+    parser.add_argument("--render-fps", type=float,
+                        help="interactive frames drawn per second (default and maximum: --physics-hz)")
+    return parser
+
+
+def controller_from_args(args, scripted, default_action=0, env_id=None):
+    """
+    Pick the controller selected by ``add_headless_arguments`` options
+
+    ``env_id`` names the env the MPC autopilot plans for (see
+    ``rl_training.mpc``); without it ``--controller mpc`` is rejected.
+    """
+    if args.controller == "scripted":
+        return scripted
+    if args.controller == "mpc":
+        from rl_training.mpc import MPC_DEFAULTS, mpc_controller
+        if env_id not in MPC_DEFAULTS:
+            raise SystemExit(f"--controller mpc is only available for {', '.join(MPC_DEFAULTS)}")
+        return mpc_controller(env_id, args.mpc_method, args.mpc_samples, args.mpc_horizon, args.seed)
+    if not args.actions:
+        raise SystemExit("--controller recorded needs --actions FILE")
+    return RecordedController.load(args.actions, default_action)
+
+
+def report(episodes, verbose=False, controller=None):
+    """Print the episodes (with ``verbose``), their summary and the controller's own report, if it has one"""
+    if verbose:
+        for result in episodes:
+            print_episode(result)
+    summary = summarize_episodes(episodes)
+    print_summary(summary)
+    print_report = getattr(controller, "print_report", None)
+    if print_report is not None:
+        print_report()
+    return summary
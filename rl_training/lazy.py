@@ -0,0 +1,84 @@
+"""
+Optional dependencies, imported on first use.
+
+Headless training only needs NumPy and gymnasium. The window (pygame), the
+plots (matplotlib), Box2D envs (LunarLander) and progress bars (tqdm) are
+imported by the code paths that use them, never at module import time, so
+``import rl_training.<module>`` stays within the startup budget measured by
+the ``startup/*`` benchmark cases. ``require`` imports such a module with an
+install hint instead of a bare ImportError; ``check_dependencies`` reports
+what is installed without importing anything (the notebooks call it instead
+of pip-installing packages at runtime).
+"""
+
+import importlib
+import importlib.util
+
+# Import name -> pip requirement
+OPTIONAL_DEPENDENCIES = {
+    "pygame": "pygame",
+    "matplotlib": "matplotlib",
+    "Box2D": "gymnasium[box2d]",
+    "tqdm": "tqdm",
+}
+# Modules a headless training job must never pay for
+HEAVY_MODULES = ("pygame", "matplotlib", "Box2D")
+
+CORE_DEPENDENCIES = {
+    "numpy": "numpy",
+    "gymnasium": "gymnasium",
+}
+
+
+def require(module, feature=None):
+    """
+    Import an optional dependency
+
+    Args:
+        module: Import name, e.g. 'pygame'
+        feature: What needs it, for the error message
+
+    Returns:
+        module: The imported module
+
+    Raises:
+        ImportError: With the pip command that installs it
+    """
+    try:
+        return importlib.import_module(module)
+    except ImportError as error:
+        requirement = OPTIONAL_DEPENDENCIES.get(module, CORE_DEPENDENCIES.get(module, module))
+        needed_by = f"{feature} needs" if feature else "Missing optional dependency"
+        raise ImportError(f"{needed_by} '{module}': pip install '{requirement}'") from error
+
+
+def progress(iterable=None, **kwargs):
+    """``tqdm`` progress bar, importing tqdm on first use"""
+    return require("tqdm").tqdm(iterable, **kwargs)
+
+
+def check_dependencies(modules=None, verbose=True):
+    """
+    Report which dependencies are installed, without importing them
+
+    Args:
+        modules: Import names to check (core and optional dependencies when None)
+        verbose: Print one line per module
+
+    Returns:
+        missing: pip requirements of the modules that are not installed
+    """
+    requirements = {**CORE_DEPENDENCIES, **OPTIONAL_DEPENDENCIES}
+    missing = []
+    for module in modules or requirements:
+        requirement = requirements.get(module, module)
+        installed = importlib.util.find_spec(module) is not None
+        if not installed:
+            missing.append(requirement)
+        if verbose:
+            print(f"{'✅' if installed else '❌'} {module}"
+                  + ("" if installed else f" (pip install '{requirement}')"))
+    if verbose and missing:
+        print("\nInstall the missing packages with:")
+        print("    pip install " + " ".join(f"'{requirement}'" for requirement in missing))
+    return missing
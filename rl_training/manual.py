@@ -0,0 +1,169 @@
+"""
+Helpers of the manual-control lab scripts (day1/morning/lab).
+
+Status descriptions, performance ratings, the scripted controllers that
+stand in for the keyboard in ``--headless`` runs and the energy bookkeeping
+of Pendulum, LunarLander and MountainCar. They only need NumPy, so headless
+jobs and notebooks can import them without pygame or a display.
+"""
+
+import math
+
+import numpy as np
+
+# Pendulum doesn't naturally terminate, so we run episodes of 500 steps
+PENDULUM_EPISODE_STEPS = 500
+
+# Fuel burned per frame by each action (the same weights LunarLander's reward uses)
+# 0=nothing, 1=fire left, 2=fire main, 3=fire right
+ENGINE_FUEL = {0: 0.0, 1: 0.03, 2: 0.3, 3: 0.03}
+
+
+# --- Pendulum ---------------------------------------------------------------
+
+def get_pendulum_status(cos_theta, sin_theta):
+    """Get pendulum status description"""
+    # Calculate angle from upright position
+    angle = math.atan2(sin_theta, cos_theta)
+    angle_deg = math.degrees(angle)
+
+    # Normalize angle to [-180, 180]
+    while angle_deg > 180:
+        angle_deg -= 360
+    while angle_deg < -180:
+        angle_deg += 360
+
+    if abs(angle_deg) < 10:
+        return "🟢 UPRIGHT", "Excellent!", angle_deg
+    elif abs(angle_deg) < 30:
+        return "🟡 NEAR UP", "Close!", angle_deg
+    elif abs(angle_deg) < 60:
+        return "🟠 TILTED", "Needs correction", angle_deg
+    elif abs(angle_deg) < 120:
+        return "🔴 SIDEWAYS", "Far from target", angle_deg
+    else:
+        return "🔵 HANGING", "Upside down", angle_deg
+
+
+def pendulum_rating(avg_reward):
+    """Rate performance based on average reward"""
+    if avg_reward > -0.5:
+        return "🏆 EXPERT", "Outstanding control!"
+    elif avg_reward > -1.0:
+        return "🥇 ADVANCED", "Excellent performance!"
+    elif avg_reward > -2.0:
+        return "🥈 INTERMEDIATE", "Good control!"
+    elif avg_reward > -5.0:
+        return "🥉 BEGINNER", "Learning well!"
+    else:
+        return "🔰 NOVICE", "Keep practicing!"
+
+
+def pendulum_controller(obs, max_torque=2.0):
+    """
+    Scripted stand-in for the keyboard: pump energy into the swing until the
+    pendulum is near the top, then balance it with a PD controller
+    """
+    cos_theta, sin_theta, angular_velocity = obs
+    angle = math.atan2(sin_theta, cos_theta)
+    if cos_theta > 0.85:
+        torque = -(10.0 * angle + 2.0 * angular_velocity)
+    else:
+        # Energy relative to resting upright; torque along the swing adds energy
+        energy = 0.5 * angular_velocity ** 2 + 15.0 * (cos_theta - 1.0)
+        torque = -energy * angular_velocity
+    return np.array([np.clip(torque, -max_torque, max_torque)], dtype=np.float32)
+
+
+def torque_energy(action):
+    """Energy bookkeeping of the interactive loop: |torque| * 0.1 per step"""
+    return abs(float(action[0])) * 0.1
+
+
+# --- LunarLander ------------------------------------------------------------
+
+def lander_rating(total_reward):
+    """Rate a landing based on the episode's total reward"""
+    if total_reward >= 200:
+        return "🏆 EXPERT PILOT", "Perfect score!"
+    elif total_reward >= 100:
+        return "🥇 SKILLED PILOT", "Well done!"
+    elif total_reward >= 0:
+        return "🥈 COMPETENT PILOT", "Could be smoother!"
+    elif total_reward >= -100:
+        return "🥉 NOVICE PILOT", "Rough landing!"
+    else:
+        return "💀 NEEDS MORE PRACTICE", "The lander was destroyed."
+
+
+def lander_controller(obs):
+    """
+    Scripted stand-in for the keyboard: gymnasium's reference heuristic pilot
+    (tilt towards the pad, hover lower the closer it gets, then cut the engines)
+    """
+    x_pos, y_pos, x_vel, y_vel, angle, angular_vel, left_leg, right_leg = obs
+    angle_target = max(-0.4, min(0.4, x_pos * 0.5 + x_vel * 1.0))
+    hover_target = 0.55 * abs(x_pos)
+    angle_todo = (angle_target - angle) * 0.5 - angular_vel * 1.0
+    hover_todo = (hover_target - y_pos) * 0.5 - y_vel * 0.5
+    if left_leg or right_leg:
+        angle_todo = 0
+        hover_todo = -y_vel * 0.5
+
+    if hover_todo > abs(angle_todo) and hover_todo > 0.05:
+        return 2
+    elif angle_todo < -0.05:
+        return 3
+    elif angle_todo > 0.05:
+        return 1
+    return 0
+
+
+def engine_energy(action):
+    """Fuel burned by one action"""
+    return ENGINE_FUEL[int(action)]
+
+
+# --- MountainCar ------------------------------------------------------------
+
+def mountain_car_rating(terminated):
+    """Rate an episode by whether the car reached the flag"""
+    if terminated:
+        return "🎉 SUCCESS", "You reached the goal!"
+    return "⏰ TIME LIMIT", "Try again!"
+
+
+def mountain_car_controller(obs):
+    """Scripted stand-in for the keyboard: always push in the direction of motion"""
+    position, velocity = obs
+    return 2 if velocity >= 0 else 0
+
+
+def push_energy(action):
+    """One unit of energy for every step the car pushes (left or right)"""
+    return 0.0 if action == 1 else 1.0
+
+
+# Env id -> rating of an episode's metrics (see rl_training.headless.run_controller)
+RATINGS = {
+    "Pendulum-v1": lambda episode: pendulum_rating(episode["avg_reward"]),
+    "LunarLander-v3": lambda episode: lander_rating(episode["total_reward"]),
+    "MountainCar-v0": lambda episode: mountain_car_rating(episode["terminated"]),
+}
+
+
+def get_performance_rating(env_id, episode):
+    """
+    Rating of one episode of a manual-control env
+
+    Args:
+        env_id: 'Pendulum-v1', 'LunarLander-v3' or 'MountainCar-v0'
+        episode: Episode metrics from ``run_controller`` (avg_reward,
+            total_reward, terminated, ...)
+
+    Returns:
+        (rating, description)
+    """
+    if env_id not in RATINGS:
+        raise ValueError(f"No rating for '{env_id}', expected one of {tuple(RATINGS)}")
+    return RATINGS[env_id](episode)
@@ -0,0 +1,213 @@
+"""
+Compact transition models for tabular MDPs.
+
+``extract_transition_model`` builds the dense ``P[s, a, s']`` tensor the
+notebooks start from, but each FrozenLake ``(s, a)`` reaches at most three
+successors. ``SparseTransitionModel`` keeps only those successors in CSR form
+(one row per ``(s, a)`` pair), so memory and sweep time scale with the number
+of nonzero transitions instead of S².
+"""
+
+import numpy as np
+
+
+class CSRMatrix:
+    """Minimal compressed-sparse-row matrix with the products the DP sweeps need"""
+
+    def __init__(self, indptr, indices, data, shape):
+        """
+        Args:
+            indptr: Row pointer array [n_rows + 1]
+            indices: Column index of every stored entry [nnz]
+            data: Value of every stored entry [nnz]
+            shape: (n_rows, n_cols)
+        """
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=float)
+        self.shape = tuple(shape)
+        # Row id of every stored entry, so products reduce with one bincount
+        self.rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def __matmul__(self, x):
+        return np.bincount(self.rows, weights=self.data * x[self.indices], minlength=self.shape[0])
+
+    def row_dot(self, row, x):
+        """Dot product of a single row with ``x`` (used by in-place sweeps)"""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.data[start:end] @ x[self.indices[start:end]]
+
+    def toarray(self):
+        dense = np.zeros(self.shape)
+        np.add.at(dense, (self.rows, self.indices), self.data)
+        return dense
+
+
+class SparseTransitionModel:
+    """
+    Transition model stored as CSR arrays over (state, action) rows
+
+    Row ``s * n_actions + a`` holds the successors of ``(s, a)`` in
+    ``next_states[indptr[row]:indptr[row + 1]]`` together with their
+    probabilities, rewards and done flags, exactly as listed in
+    ``env.unwrapped.P[s][a]``.
+    """
+
+    def __init__(self, indptr, next_states, probs, rewards, dones, n_states, n_actions):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.next_states = np.asarray(next_states, dtype=np.int64)
+        self.probs = np.asarray(probs, dtype=float)
+        self.rewards = np.asarray(rewards, dtype=float)
+        self.dones = np.asarray(dones, dtype=bool)
+        self.n_states = n_states
+        self.n_actions = n_actions
+
+        self.shape = (n_states, n_actions, n_states)
+        # Flat (s, a) row and source state of every stored transition
+        self.rows = np.repeat(np.arange(n_states * n_actions), np.diff(self.indptr))
+        self.states = self.rows // n_actions
+
+    @classmethod
+    def from_env(cls, env):
+        """
+        Build the model in a single pass over ``env.unwrapped.P``
+
+        Args:
+            env: Discrete gymnasium environment exposing ``unwrapped.P``
+                (FrozenLake, Taxi, CliffWalking, ...)
+
+        Returns:
+            model: SparseTransitionModel
+        """
+        n_states = env.observation_space.n
+        n_actions = env.action_space.n
+        transitions = env.unwrapped.P
+
+        indptr = np.zeros(n_states * n_actions + 1, dtype=np.int64)
+        entries = []
+        for state in range(n_states):
+            for action in range(n_actions):
+                row = transitions[state][action]
+                entries.extend(row)
+                indptr[state * n_actions + action + 1] = len(row)
+        np.cumsum(indptr, out=indptr)
+
+        probs, next_states, rewards, dones = (np.array(column) for column in zip(*entries))
+        return cls(indptr, next_states, probs, rewards, dones, n_states, n_actions)
+
+    @property
+    def nnz(self):
+        return len(self.probs)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.indptr, self.next_states, self.probs,
+                                      self.rewards, self.dones, self.rows, self.states))
+
+    def _reduce(self, weights):
+        """Sum per-transition ``weights`` into an [n_states, n_actions] array"""
+        sums = np.bincount(self.rows, weights=weights, minlength=self.n_states * self.n_actions)
+        return sums.reshape(self.n_states, self.n_actions)
+
+    def expected_rewards(self):
+        """R[s,a] = Σ_{s'} P(s'|s,a) r(s,a,s') - same as the dense ``R`` matrix"""
+        return self._reduce(self.probs * self.rewards)
+
+    def probability_sums(self):
+        """Σ_{s'} P(s'|s,a) for every pair (1 for a proper model)"""
+        return self._reduce(self.probs)
+
+    def expected_next_values(self, V):
+        """Σ_{s'} P(s'|s,a) V(s') for every pair, i.e. the dense ``P @ V``"""
+        return self._reduce(self.probs * V[self.next_states])
+
+    def state_next_values(self, state, V):
+        """``expected_next_values`` restricted to one state [n_actions]"""
+        start = self.indptr[state * self.n_actions]
+        end = self.indptr[(state + 1) * self.n_actions]
+        weights = self.probs[start:end] * V[self.next_states[start:end]]
+        return np.bincount(self.rows[start:end] - state * self.n_actions,
+                           weights=weights, minlength=self.n_actions)
+
+    def policy_matrix(self, policy):
+        """
+        Transition matrix P^π(s'|s) = Σ_a π(a|s) P(s'|s,a) under a policy
+
+        Args:
+            policy: Policy matrix [n_states, n_actions]
+
+        Returns:
+            P_pi: CSRMatrix [n_states, n_states] (duplicate entries are summed
+            by the products, so no merging pass is needed)
+        """
+        data = self.probs * np.asarray(policy, dtype=float).ravel()[self.rows]
+        indptr = self.indptr[::self.n_actions]
+        return CSRMatrix(indptr, self.next_states, data, (self.n_states, self.n_states))
+
+    def to_dense(self):
+        """
+        Expand into the notebook's dense representation
+
+        Returns:
+            P: Transition probability tensor [n_states, n_actions, n_states]
+            R: Reward matrix [n_states, n_actions]
+        """
+        P = np.zeros(self.shape)
+        np.add.at(P, (self.states, self.rows % self.n_actions, self.next_states), self.probs)
+        return P, self.expected_rewards()
+
+
+def extract_transition_model(env, sparse=False, verbose=True):
+    """
+    Extract transition probabilities and rewards from environment
+
+    With sparse=True the model is returned as a SparseTransitionModel that
+    only stores the (at most 3) successors of each (s, a) pair. All DP
+    classes in rl_training.dp accept it in place of the dense tensor.
+
+    Returns:
+        (P, R): Transition tensor [n_states, n_actions, n_states] (or the
+        SparseTransitionModel) and expected reward matrix [n_states, n_actions]
+    """
+    n_states = env.observation_space.n
+    n_actions = env.action_space.n
+
+    if sparse:
+        if verbose:
+            print("🔄 Extracting sparse transition model...")
+        P = SparseTransitionModel.from_env(env)
+        R = P.expected_rewards()
+        if verbose:
+            print(f"✅ Transition model extracted successfully!")
+            print(f"  • Nonzero transitions: {P.nnz} (dense tensor would hold {n_states * n_actions * n_states})")
+            print(f"  • Reward matrix shape: {R.shape}")
+        return P, R
+
+    # Initialize transition probability tensor P[s][a][s'] and reward matrix R[s][a]
+    P = np.zeros((n_states, n_actions, n_states))
+    R = np.zeros((n_states, n_actions))
+
+    if verbose:
+        print("🔄 Extracting transition model...")
+
+    for state in range(n_states):
+        for action in range(n_actions):
+            transitions = env.unwrapped.P[state][action]
+            expected_reward = 0
+
+            for prob, next_state, reward, done in transitions:
+                P[state, action, next_state] += prob
+                expected_reward += prob * reward
+
+            R[state, action] = expected_reward
+
+    if verbose:
+        print(f"✅ Transition model extracted successfully!")
+        print(f"  • Transition tensor shape: {P.shape}")
+        print(f"  • Reward matrix shape: {R.shape}")
+
+    return P, R
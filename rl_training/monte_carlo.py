@@ -0,0 +1,348 @@
+"""
+Monte Carlo prediction and control for Blackjack.
+
+These are the learners from the Monte Carlo notebook, kept in an importable
+module so that worker processes (``rl_training.sweep``) can run them. Every
+function works on a gymnasium ``Blackjack-v1`` env; the ``batch_size`` options
+switch to the NumPy engine in ``rl_training.blackjack``.
+"""
+
+import random
+
+import numpy as np
+
+from rl_training.blackjack import (
+    INDEXER as BLACKJACK_STATES,
+    discounted_returns,
+    epsilon_greedy_actions,
+    first_visit_mask,
+    rollout_episodes,
+    tabulate_policy,
+)
+from rl_training.curves import LearningCurve
+from rl_training.evaluation import evaluate_episodes, make_vector_env
+from rl_training.lazy import progress
+from rl_training.profiling import NULL_PROFILER
+from rl_training.tabular import QTable, VTable
+
+
+def _progress(iterable, verbose):
+    return progress(iterable) if verbose else iterable
+
+
+def generate_episode(env, policy, profiler=NULL_PROFILER):
+    """
+    Generate a complete episode following the given policy
+    Returns: list of (state, action, reward) tuples
+
+    profiler: rl_training.profiling.Profiler timing 'reset', 'policy',
+        'env.step' and 'bookkeeping'
+    """
+    episode = []
+    profiler.start_episode()
+    t = profiler.now()
+    state, _ = env.reset()
+    t = profiler.lap("reset", t)
+
+    while True:
+        action = policy(state)
+        t = profiler.lap("policy", t)
+        next_state, reward, terminated, truncated, _ = env.step(action)
+        t = profiler.lap("env.step", t)
+        episode.append((state, action, reward))
+        t = profiler.lap("bookkeeping", t)
+
+        if terminated or truncated:
+            break
+        state = next_state
+
+    profiler.end_episode(len(episode))
+    return episode
+
+
+def simple_policy(state):
+    """
+    Simple policy: Hit if player sum < 20, else stick
+    """
+    player_sum = state[0]
+    return 1 if player_sum < 20 else 0
+
+
+def epsilon_greedy_policy(Q, state, epsilon=0.1):
+    """
+    Epsilon-greedy policy for exploration
+    """
+    if random.random() < epsilon:
+        return random.choice([0, 1])  # Random action
+    else:
+        q = Q[state]  # One row lookup in the Q table
+        return 0 if q[0] > q[1] else 1  # Greedy action
+
+
+def monte_carlo_evaluation(env, policy, num_episodes=10000, gamma=1.0, batch_size=None, rollouts=None,
+                           verbose=True):
+    """
+    Monte Carlo evaluation to estimate V^π(s)
+
+    batch_size: play the episodes batch_size at a time with the NumPy
+        Blackjack engine instead of stepping env one transition at a time
+    rollouts: evaluate pre-generated episodes from rollout_episodes
+    """
+    if batch_size is not None and rollouts is None:
+        if verbose:
+            print(f"Simulating {num_episodes} episodes in batches of {batch_size}...")
+        rollouts = rollout_episodes(
+            tabulate_policy(policy), num_episodes, batch_size,
+            sab=env.unwrapped.sab, natural=env.unwrapped.natural,
+            seed=np.random.randint(2**31 - 1)
+        )
+    if rollouts is not None:
+        # First-visit MC on the flat transition arrays: V(s) = mean of first-visit returns
+        V = VTable(BLACKJACK_STATES)
+        G = discounted_returns(rollouts, gamma)
+        first = first_visit_mask(rollouts.episode_ids, rollouts.states)
+        V.update_batch(rollouts.states[first], G[first])
+        return V
+
+    # Initialize: V(s) and visit counts N(s) in dense arrays
+    V = VTable(BLACKJACK_STATES)
+
+    if verbose:
+        print(f"Running Monte Carlo Evaluation for {num_episodes} episodes...")
+
+    for episode_num in _progress(range(num_episodes), verbose):
+        # Generate episode
+        episode = generate_episode(env, policy)
+
+        # Calculate returns for each state
+        G = 0
+        visited_states = set()
+
+        # Work backwards through episode
+        for t in reversed(range(len(episode))):
+            state, action, reward = episode[t]
+            G = gamma * G + reward
+
+            # First-visit MC
+            if state not in visited_states:
+                # Running mean: V(s) ← V(s) + (G - V(s)) / N(s)
+                V.update(state, G)
+                visited_states.add(state)
+
+    return V
+
+
+def batched_monte_carlo_control(env, num_episodes, alpha, epsilon, gamma, batch_size, first_visit=True,
+                                verbose=True, curve_window=1000):
+    """
+    Constant-α MC control on the NumPy Blackjack engine
+
+    Each batch of episodes follows ε-greedy w.r.t. the Q-values at the start
+    of the batch; the updates are then applied in the same order as the
+    episode-by-episode loop (episodes in order, each one backwards in time).
+    """
+    rng = np.random.default_rng(np.random.randint(2**31 - 1))
+    Q = QTable(BLACKJACK_STATES, 2)
+    curve = LearningCurve(curve_window)
+
+    def behaviour_policy(states):
+        return epsilon_greedy_actions(Q.values, states, epsilon, rng)
+
+    for start in _progress(range(0, num_episodes, batch_size), verbose):
+        rollouts = rollout_episodes(
+            behaviour_policy, min(batch_size, num_episodes - start), batch_size,
+            sab=env.unwrapped.sab, natural=env.unwrapped.natural, seed=rng
+        )
+        curve.update_many(np.bincount(rollouts.episode_ids, weights=rollouts.rewards))
+
+        G = discounted_returns(rollouts, gamma)
+        order = np.lexsort((-rollouts.steps, rollouts.episode_ids))
+        if first_visit:
+            pairs = rollouts.states * 2 + rollouts.actions
+            order = order[first_visit_mask(rollouts.episode_ids, pairs)[order]]
+        Q.update_batch(rollouts.states[order], rollouts.actions[order], G[order], alpha=alpha)
+
+    return Q, curve
+
+
+def constant_alpha_monte_carlo_control(env, num_episodes=100000, alpha=0.01, epsilon=0.1, gamma=1.0,
+                                       batch_size=None, verbose=True, curve_window=1000):
+    """
+    Constant-α Monte Carlo Control
+    Uses incremental updates instead of averaging all returns
+
+    batch_size: play batch_size episodes at a time with the NumPy Blackjack
+        engine (see batched_monte_carlo_control) instead of stepping env
+    curve_window: episodes in the moving window of the returned LearningCurve
+
+    Returns: (Q, curve) - curve holds the windowed reward statistics and
+        downsampled snapshots of them (see rl_training.curves)
+    """
+    if batch_size is not None:
+        if verbose:
+            print(f"Running batched Constant-α Monte Carlo Control...")
+            print(f"Episodes: {num_episodes}, α: {alpha}, ε: {epsilon}, batch: {batch_size}")
+        return batched_monte_carlo_control(env, num_episodes, alpha, epsilon, gamma, batch_size,
+                                           verbose=verbose, curve_window=curve_window)
+
+    # Initialize Q-values: dense [states, 2 actions: stick(0), hit(1)] table
+    Q = QTable(BLACKJACK_STATES, 2)
+
+    if verbose:
+        print(f"Running Constant-α Monte Carlo Control...")
+        print(f"Episodes: {num_episodes}, α: {alpha}, ε: {epsilon}")
+
+    curve = LearningCurve(curve_window)
+
+    for episode_num in _progress(range(num_episodes), verbose):
+        # Generate episode using ε-greedy policy
+        episode = []
+        state, _ = env.reset()
+        episode_reward = 0
+
+        # Generate episode
+        while True:
+            action = epsilon_greedy_policy(Q, state, epsilon)
+            next_state, reward, terminated, truncated, _ = env.step(action)
+            episode.append((state, action, reward))
+            episode_reward += reward
+
+            if terminated or truncated:
+                break
+            state = next_state
+
+        curve.update(episode_reward)
+
+        # Update Q-values using constant-α
+        G = 0
+        visited_pairs = set()
+
+        # Work backwards through episode
+        for t in reversed(range(len(episode))):
+            state, action, reward = episode[t]
+            G = gamma * G + reward
+
+            # First-visit update
+            if (state, action) not in visited_pairs:
+                # Constant-α update: Q(s,a) ← Q(s,a) + α[G - Q(s,a)]
+                Q.update(state, action, G, alpha)
+                visited_pairs.add((state, action))
+
+    return Q, curve
+
+
+def every_visit_monte_carlo_control(env, num_episodes=50000, alpha=0.01, epsilon=0.1, gamma=1.0,
+                                    batch_size=None, verbose=True):
+    """
+    Every-visit Monte Carlo Control (vs First-visit)
+    Updates Q-values for every occurrence of (s,a) in an episode
+
+    batch_size: play batch_size episodes at a time with the NumPy Blackjack engine
+    """
+    if batch_size is not None:
+        if verbose:
+            print(f"Running batched Every-Visit Monte Carlo Control...")
+        Q, _ = batched_monte_carlo_control(env, num_episodes, alpha, epsilon, gamma, batch_size,
+                                           first_visit=False, verbose=verbose)
+        return Q
+
+    Q = QTable(BLACKJACK_STATES, 2)
+
+    if verbose:
+        print(f"Running Every-Visit Monte Carlo Control...")
+
+    for episode_num in _progress(range(num_episodes), verbose):
+        # Generate episode
+        episode = []
+        state, _ = env.reset()
+
+        while True:
+            action = epsilon_greedy_policy(Q, state, epsilon)
+            next_state, reward, terminated, truncated, _ = env.step(action)
+            episode.append((state, action, reward))
+
+            if terminated or truncated:
+                break
+            state = next_state
+
+        # Update Q-values for every visit (not just first visit)
+        G = 0
+
+        for t in reversed(range(len(episode))):
+            state, action, reward = episode[t]
+            G = gamma * G + reward
+
+            # Every-visit update (no check for previous visits)
+            Q.update(state, action, G, alpha)
+
+    return Q
+
+
+def extract_policy(Q):
+    """
+    Extract greedy policy from Q-values
+
+    For a QTable this is a single argmax over the whole table, and the
+    returned TabularPolicy answers lookups with an array index.
+    """
+    if isinstance(Q, QTable):
+        return Q.greedy_policy()
+    policy = {}
+    for state in Q:
+        policy[state] = np.argmax(Q[state])
+    return policy
+
+
+def policy_function(state, policy_dict):
+    """
+    Policy function that can be used with generate_episode
+    """
+    # Default action for unseen states: 0 (Stick)
+    return policy_dict.get(state, 0)
+
+
+def test_policy(env, policy, num_episodes=10000, num_envs=None, ci_width=None):
+    """
+    Test a policy and return average reward
+
+    num_envs: play num_envs copies of env at once with the vectorized
+        harness in rl_training.evaluation; the results then also include
+        confidence intervals and episode-length statistics
+    ci_width: with num_envs, stop early once the 95% confidence interval of
+        the average reward is narrower than this
+    """
+    if num_envs is not None:
+        envs = make_vector_env(env, num_envs)
+        try:
+            return evaluate_episodes(envs, policy, num_episodes, seed=np.random.randint(2**31 - 1),
+                                     ci_width=ci_width)
+        finally:
+            envs.close()
+
+    total_reward = 0
+    wins = 0
+    losses = 0
+    draws = 0
+
+    for _ in range(num_episodes):
+        episode = generate_episode(env, policy)
+        episode_reward = sum(reward for _, _, reward in episode)
+        total_reward += episode_reward
+
+        if episode_reward > 0:
+            wins += 1
+        elif episode_reward < 0:
+            losses += 1
+        else:
+            draws += 1
+
+    avg_reward = total_reward / num_episodes
+    win_rate = wins / num_episodes
+
+    return {
+        'avg_reward': avg_reward,
+        'win_rate': win_rate,
+        'wins': wins,
+        'losses': losses,
+        'draws': draws
+    }
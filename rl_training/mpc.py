@@ -0,0 +1,231 @@
+"""
+Sampling-based model-predictive control for Pendulum and MountainCar.
+
+An automatic baseline to compare keyboard play against. At every control
+tick ``MPCController`` samples ``num_samples`` action sequences of
+``horizon`` steps, rolls all of them out at once through a batched dynamics
+model (``rl_training.dynamics``), and applies the first action of the best
+one:
+
+- ``method="random"``: random shooting, one round of uniformly sampled
+  sequences;
+- ``method="cem"``: the cross-entropy method, ``iterations`` rounds that
+  refit a sampling distribution (per-step Gaussian for torques, per-step
+  categorical for discrete actions) to the ``elite_fraction`` best
+  sequences.
+
+The previous tick's plan, shifted by one step, warm-starts the next one and
+is always among the candidates. A rollout's score is its reward minus
+``energy_weight`` times the energy the lab scripts bill, plus the model's
+terminal value. Planning time is tracked per tick against ``budget``
+(20 ms, one frame of the 50 FPS pendulum loop).
+
+It is a ``run_controller`` controller (``controller(obs) -> action`` plus
+``reset()``); the lab scripts run it with ``--headless --controller mpc``.
+"""
+
+import time
+
+import numpy as np
+
+from rl_training.dynamics import DYNAMICS
+from rl_training.profiling import LatencyStats
+
+MPC_METHODS = ("cem", "random")
+DEFAULT_BUDGET = 0.02
+
+# Per-env defaults: horizon, num_samples, iterations
+MPC_DEFAULTS = {
+    "Pendulum-v1": {"horizon": 20, "num_samples": 1000, "iterations": 3},
+    "MountainCar-v0": {"horizon": 30, "num_samples": 500, "iterations": 2},
+}
+
+
+def rollout_returns(dynamics, state, actions, energy_weight=0.0, dtype=np.float32):
+    """
+    Score of every action sequence from one start state
+
+    Args:
+        dynamics: Batched dynamics model (rolled out with ``plan_step``)
+        state: Start state [2]
+        actions: Action sequences [num_sequences, horizon]
+        energy_weight: Penalty per unit of the lab's energy bookkeeping
+        dtype: Precision of the rollout (float32: twice the sequences per
+            memory pass and vectorized trig)
+
+    Returns:
+        returns: Summed rewards (up to termination) minus the energy penalty,
+        plus the terminal value of unfinished rollouts [num_sequences]
+    """
+    num_sequences, horizon = actions.shape
+    states = np.repeat(np.asarray(state, dtype=dtype)[:, None], num_sequences, axis=1)
+    # Time-major, so every step reads one contiguous row
+    steps = np.ascontiguousarray(actions.T, dtype=dtype)
+    # The action-only terms of every step at once, outside the time loop
+    action_rewards = dynamics.action_rewards(steps)
+    if energy_weight:
+        action_rewards -= energy_weight * dynamics.energy(steps)
+
+    if not dynamics.discrete:
+        # Never terminates: accumulate in the rollout dtype and sum the action terms in bulk
+        returns = action_rewards.sum(axis=0, dtype=float)
+        for t in range(horizon):
+            states, rewards, _ = dynamics.plan_step(states, steps[t])
+            returns += rewards
+        return returns + dynamics.terminal_value(states)
+
+    returns = np.zeros(num_sequences)
+    alive = np.ones(num_sequences, dtype=bool)
+    for t in range(horizon):
+        states, rewards, terminated = dynamics.plan_step(states, steps[t])
+        returns += np.where(alive, rewards + action_rewards[t], 0.0)
+        alive &= ~terminated
+    return returns + np.where(alive, dynamics.terminal_value(states), 0.0)
+
+
+class MPCController:
+    """Random-shooting / cross-entropy MPC on a batched dynamics model"""
+
+    def __init__(self, dynamics, horizon=30, num_samples=1000, method="cem", iterations=4,
+                 elite_fraction=0.1, energy_weight=0.0, budget=DEFAULT_BUDGET, seed=None):
+        """
+        Args:
+            dynamics: PendulumDynamics or MountainCarDynamics (or an env id)
+            horizon: Planning horizon in env steps
+            num_samples: Action sequences rolled out per CEM iteration
+            method: 'cem' or 'random'
+            iterations: CEM iterations per tick (random shooting: 1)
+            elite_fraction: Fraction of the samples the CEM refits to
+            energy_weight: Penalty per unit of energy (|torque| * 0.1 for
+                Pendulum, one per push for MountainCar)
+            budget: Planning time per tick in seconds, for the report
+            seed: Seed of the action sampling
+        """
+        if method not in MPC_METHODS:
+            raise ValueError(f"Unknown MPC method '{method}', expected one of {MPC_METHODS}")
+        if isinstance(dynamics, str):
+            dynamics = DYNAMICS[dynamics]()
+        self.dynamics = dynamics
+        self.horizon = horizon
+        self.num_samples = num_samples
+        self.method = method
+        self.iterations = iterations if method == "cem" else 1
+        self.num_elites = max(2, int(round(elite_fraction * num_samples)))
+        self.energy_weight = energy_weight
+        self.budget = budget
+        self.rng = np.random.default_rng(seed)
+
+        # Tracking variables
+        self.ticks = LatencyStats()
+        self.over_budget = 0
+        self.plan = None
+
+    def reset(self):
+        """Forget the warm-start plan (a new episode starts elsewhere)"""
+        self.plan = None
+
+    def _sample(self, mean, spread, count):
+        """``count`` sequences around a distribution: (mean, std) for torques, probabilities for actions"""
+        if self.dynamics.discrete:
+            if mean is None:
+                return self.rng.integers(self.dynamics.n_actions, size=(count, self.horizon))
+            draws = self.rng.random((count, self.horizon), dtype=np.float32)
+            actions = np.zeros((count, self.horizon), dtype=np.int64)
+            # Inverse CDF: count the per-step cumulative probabilities each draw exceeds
+            for threshold in np.cumsum(mean, axis=1)[:, :-1].T:
+                actions += draws > threshold
+            return actions
+        low, high = self.dynamics.action_low, self.dynamics.action_high
+        if mean is None:
+            return self.rng.uniform(low, high, size=(count, self.horizon))
+        return np.clip(mean + spread * self.rng.standard_normal((count, self.horizon)), low, high)
+
+    def _fit(self, elites):
+        """Sampling distribution of the elite sequences"""
+        if self.dynamics.discrete:
+            counts = np.stack([(elites == action).sum(axis=0) for action in range(self.dynamics.n_actions)], axis=1)
+            # Keep every action possible, so one bad round cannot lock the plan in
+            probabilities = counts + 0.1 * len(elites) / self.dynamics.n_actions
+            return probabilities / probabilities.sum(axis=1, keepdims=True), None
+        spread = 0.05 * (self.dynamics.action_high - self.dynamics.action_low)
+        return elites.mean(axis=0), np.maximum(elites.std(axis=0), spread)
+
+    def plan_actions(self, state):
+        """
+        Best action sequence from ``state``
+
+        Args:
+            state: Model state [2]
+
+        Returns:
+            (actions, score): best sequence [horizon] and its rollout score
+        """
+        warm = None
+        if self.plan is not None:
+            # Shift last tick's plan by one step, repeating its final action
+            warm = np.concatenate([self.plan[1:], self.plan[-1:]])
+
+        mean = spread = None
+        best, best_score = None, -np.inf
+        for _ in range(self.iterations):
+            candidates = self._sample(mean, spread, self.num_samples)
+            if warm is not None:
+                candidates[0] = warm
+            if best is not None:
+                candidates[1] = best
+            scores = rollout_returns(self.dynamics, state, candidates, self.energy_weight)
+            top = np.argmax(scores)
+            if scores[top] > best_score:
+                best, best_score = candidates[top].copy(), scores[top]
+            if self.method == "cem":
+                elites = candidates[np.argpartition(scores, -self.num_elites)[-self.num_elites:]]
+                mean, spread = self._fit(elites)
+        self.plan = best
+        return best, best_score
+
+    def __call__(self, obs):
+        start = time.perf_counter_ns()
+        actions, _ = self.plan_actions(self.dynamics.state_from_obs(obs))
+        elapsed = time.perf_counter_ns() - start
+        self.ticks.add(elapsed)
+        if elapsed > self.budget * 1e9:
+            self.over_budget += 1
+        if self.dynamics.discrete:
+            return int(actions[0])
+        return np.array([actions[0]], dtype=np.float32)
+
+    def summary(self):
+        """Planning time per tick (µs percentiles, as the profiler reports them) and budget overruns"""
+        summary = self.ticks.summary(self.ticks.total_ns)
+        summary.update({
+            "method": self.method,
+            "horizon": self.horizon,
+            "num_samples": self.num_samples,
+            "iterations": self.iterations,
+            "rollouts_per_tick": self.num_samples * self.iterations,
+            "budget_ms": self.budget * 1e3,
+            "over_budget": self.over_budget,
+        })
+        return summary
+
+    def print_report(self):
+        summary = self.summary()
+        print(f"\n🧠 MPC ({summary['method']}): {summary['rollouts_per_tick']} rollouts × "
+              f"{summary['horizon']} steps per tick, {summary['calls']} ticks")
+        print(f"   planning time: mean {summary['mean_us'] / 1e3:.1f}ms, p50 {summary['p50_us'] / 1e3:.1f}ms, "
+              f"p99 {summary['p99_us'] / 1e3:.1f}ms, max {summary['max_us'] / 1e3:.1f}ms")
+        print(f"   over the {summary['budget_ms']:.0f}ms budget: {summary['over_budget']} ticks "
+              f"({summary['over_budget'] / max(summary['calls'], 1):.1%})")
+
+
+def mpc_controller(env_id, method="cem", num_samples=None, horizon=None, seed=None, **kwargs):
+    """``MPCController`` for 'Pendulum-v1' or 'MountainCar-v0' with that env's defaults (``MPC_DEFAULTS``)"""
+    if env_id not in DYNAMICS:
+        raise ValueError(f"No dynamics model for '{env_id}', expected one of {tuple(DYNAMICS)}")
+    options = dict(MPC_DEFAULTS[env_id])
+    if num_samples is not None:
+        options["num_samples"] = num_samples
+    if horizon is not None:
+        options["horizon"] = horizon
+    options.update(kwargs)
+    return MPCController(DYNAMICS[env_id](), method=method, seed=seed, **options)
@@ -0,0 +1,266 @@
+"""
+Versioned binary files for tabular policies and value tables.
+
+A file holds a ``QTable``, ``VTable`` or ``TabularPolicy`` as flat typed
+arrays behind a small JSON header::
+
+    b"RLTAB\\0"  magic
+    uint16      format version (little endian)
+    uint32      header length in bytes
+    header      UTF-8 JSON: kind, observation encoding (StateIndexer dims and
+                starts), dtype / shape / offset of every array, metadata
+    padding     up to a 64-byte boundary
+    arrays      each one C-contiguous and 64-byte aligned
+
+Arrays are opened with ``np.memmap``, so loading is O(1) and lookups read
+straight from the page cache. Nothing in a file is executable, unlike the
+pickles this replaces; ``convert_pickle`` turns the old ``policy_*.bin``
+dicts into the new format::
+
+    python -m rl_training.policy_io policy_first.bin policy_first.rlt
+"""
+
+import importlib
+import json
+import pickle
+import struct
+import sys
+
+import numpy as np
+
+from rl_training.tabular import QTable, StateIndexer, TabularPolicy, VTable
+
+MAGIC = b"RLTAB\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<6sHI")
+
+# Kind written in the header -> arrays the table is rebuilt from
+KINDS = {
+    "q": ("values", "counts", "visited"),
+    "v": ("values", "counts", "visited"),
+    "policy": ("actions", "known"),
+}
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _to_json(value):
+    """``json.dumps`` fallback for NumPy scalars and arrays in metadata"""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _table_arrays(table):
+    """(kind, core arrays, extra header fields) of a table or policy"""
+    if isinstance(table, TabularPolicy):
+        return "policy", {"actions": table.actions, "known": table.known}, \
+            {"default_action": int(table.default_action)}
+    if isinstance(table, QTable):
+        kind = "q"
+    elif isinstance(table, VTable):
+        kind = "v"
+    else:
+        raise TypeError(f"Cannot save {type(table).__name__}, expected QTable, VTable or TabularPolicy")
+    core = {"values": table.values, "counts": table.counts, "visited": table.visited}
+    if not table.counts.any():
+        # Tables without visit counts (e.g. converted value functions) skip them
+        del core["counts"]
+    return kind, core, {}
+
+
+def save_table(path, table, metadata=None, **arrays):
+    """
+    Write a table or policy to ``path``
+
+    Args:
+        path: Output file
+        table: QTable, VTable or TabularPolicy
+        metadata: JSON-serializable dict stored in the header (e.g. test_policy results)
+        **arrays: Extra named arrays stored alongside (e.g. training_rewards=...)
+    """
+    kind, core, extra = _table_arrays(table)
+    core.update(arrays)
+
+    entries = {}
+    offset = 0
+    for name, array in core.items():
+        array = np.ascontiguousarray(array)
+        core[name] = array
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+
+    indexer = table.indexer
+    header = {
+        "kind": kind,
+        "observation": {"dims": list(indexer.dims), "starts": indexer.starts.tolist(),
+                        "scalar": bool(indexer.scalar)},
+        "arrays": entries,
+        "metadata": metadata or {},
+        **extra,
+    }
+    header_bytes = json.dumps(header, default=_to_json).encode("utf-8")
+    data_start = _aligned(_PREAMBLE.size + len(header_bytes))
+
+    with open(path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in core.items():
+            f.write(b"\0" * (data_start + entries[name]["offset"] - f.tell()))
+            f.write(array.tobytes())
+
+
+def read_table_file(path, mmap_mode="r"):
+    """
+    Read the header and arrays of a table file
+
+    Args:
+        path: File written by ``save_table``
+        mmap_mode: 'r' (read-only), 'r+' (write through), 'c' (copy-on-write)
+            or None to read the arrays into memory
+
+    Returns:
+        (header, arrays): Parsed JSON header and a dict of arrays by name
+    """
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError(f"{path} is too short to be a table file")
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a table file (bad magic {magic!r})")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} uses format version {version}, "
+                             f"this code reads up to version {FORMAT_VERSION}")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+
+    data_start = _aligned(_PREAMBLE.size + header_length)
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype, shape = np.dtype(entry["dtype"]), tuple(entry["shape"])
+        offset = data_start + entry["offset"]
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.empty(shape, dtype=dtype)
+        elif mmap_mode is None:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=offset, shape=shape)
+    return header, arrays
+
+
+def load_table(path, mmap_mode="r"):
+    """
+    Load a table or policy written by ``save_table``
+
+    The result drops into the notebook code unchanged: a TabularPolicy works
+    with ``policy_function`` (via ``.get``) and directly as the policy passed
+    to ``test_policy``; Q/V tables keep their mapping interface.
+
+    Args:
+        path: File written by ``save_table``
+        mmap_mode: See ``read_table_file``; with 'r' the returned table is
+            read-only
+
+    Returns:
+        table: QTable, VTable or TabularPolicy (extra arrays and metadata are
+        available through ``read_table_file``)
+    """
+    header, arrays = read_table_file(path, mmap_mode)
+    kind = header["kind"]
+    if kind not in KINDS:
+        raise ValueError(f"Unknown table kind '{kind}' in {path}, expected one of {tuple(KINDS)}")
+
+    observation = header["observation"]
+    dims = observation["dims"][0] if observation["scalar"] else observation["dims"]
+    indexer = StateIndexer(dims, observation["starts"])
+
+    if kind != "policy" and "counts" not in arrays:
+        arrays["counts"] = np.zeros(arrays["values"].shape, dtype=np.int64)
+    core = [arrays[name] for name in KINDS[kind]]
+    if kind == "policy":
+        return TabularPolicy(indexer, *core, default_action=header["default_action"])
+    return (QTable if kind == "q" else VTable).from_arrays(indexer, *core)
+
+
+class _NumpyScalarUnpickler(pickle.Unpickler):
+    """Unpickler that only rebuilds NumPy scalars and dtypes"""
+
+    _ALLOWED = {("numpy.core.multiarray", "scalar"), ("numpy._core.multiarray", "scalar"),
+                ("numpy", "dtype")}
+
+    def find_class(self, module, name):
+        if (module, name) not in self._ALLOWED:
+            raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from a policy pickle")
+        if name == "dtype":
+            return np.dtype
+        # numpy.core was renamed to numpy._core in NumPy 2
+        for candidate in ("numpy._core.multiarray", "numpy.core.multiarray"):
+            try:
+                return getattr(importlib.import_module(candidate), name)
+            except (ImportError, AttributeError):
+                continue
+        raise pickle.UnpicklingError(f"Cannot find {module}.{name} in this NumPy version")
+
+
+def load_pickle_table(path):
+    """
+    Read one of the legacy ``policy_*.bin`` pickles without running arbitrary code
+
+    Returns:
+        table: dict mapping int states (or tuples of ints) to float values
+    """
+    with open(path, "rb") as f:
+        raw = _NumpyScalarUnpickler(f).load()
+
+    def key(state):
+        if isinstance(state, tuple):
+            return tuple(int(x) for x in state)
+        return int(state)
+
+    return {key(state): float(value) for state, value in raw.items()}
+
+
+def convert_pickle(src, dst, indexer=None, metadata=None):
+    """
+    Convert a legacy pickled {state: value} dict into a VTable file
+
+    Args:
+        src: Pickle file, e.g. 'policy_first.bin' (tic-tac-toe board hashes
+            -> state values)
+        dst: Output table file
+        indexer: StateIndexer for the keys; by default the smallest box
+            covering every key
+        metadata: Extra header metadata
+
+    Returns:
+        table: The converted VTable
+    """
+    raw = load_pickle_table(src)
+    states = list(raw)
+    if indexer is None:
+        keys = np.array(states, dtype=np.int64)
+        if keys.ndim == 1:
+            indexer = StateIndexer(int(keys.max()) + 1)
+        else:
+            low, high = keys.min(axis=0), keys.max(axis=0)
+            indexer = StateIndexer(high - low + 1, low)
+
+    table = VTable(indexer)
+    rows = np.array([indexer.encode(state) for state in states], dtype=np.int64)
+    table.values[rows] = list(raw.values())
+    table.visited[rows] = True
+    save_table(dst, table, metadata={"source": str(src), **(metadata or {})})
+    return table
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m rl_training.policy_io SRC.bin DST.rlt")
+    converted = convert_pickle(sys.argv[1], sys.argv[2])
+    print(f"Converted {len(converted)} states from {sys.argv[1]} to {sys.argv[2]}")
@@ -0,0 +1,236 @@
+"""
+Opt-in, low-overhead timing of episode loops.
+
+Loops take a ``profiler`` argument and mark the end of every phase with
+``lap``::
+
+    t = profiler.now()
+    action = agent.select_action(state)
+    t = profiler.lap("policy", t)
+    next_state, reward, terminated, truncated, info = env.step(action)
+    t = profiler.lap("env.step", t)
+
+``Profiler`` adds the elapsed nanoseconds to the phase's total and to a
+log2-bucketed latency histogram (one ``int.bit_length`` per call, no
+allocation). The default ``NULL_PROFILER`` has the same methods as no-ops, so
+an unprofiled loop pays one cheap method call per phase. ``summary`` reports
+steps/sec, the share of wall-clock time per phase and latency percentiles;
+``to_json`` / ``to_csv`` export it for comparing runs. ``LatencyStats`` is the
+per-phase accumulator on its own, for code that times one operation (a control
+tick, an action request) without phases.
+"""
+
+import contextlib
+import csv
+import json
+import time
+
+# Latency histograms: bucket b counts durations in [2**(b-1), 2**b) nanoseconds
+N_BUCKETS = 64
+
+
+class LatencyStats:
+    """Call count, total/max and latency histogram of one timed operation"""
+
+    __slots__ = ("calls", "total_ns", "max_ns", "histogram")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.histogram = [0] * N_BUCKETS
+
+    def add(self, elapsed_ns):
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.histogram[min(elapsed_ns.bit_length(), N_BUCKETS - 1)] += 1
+
+    def percentile_us(self, q):
+        """Upper bucket edge below which a fraction q of the calls fall"""
+        target = q * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                return min(2 ** bucket, self.max_ns) / 1e3
+        return self.max_ns / 1e3
+
+    def summary(self, wall_ns):
+        return {
+            "calls": self.calls,
+            "total_seconds": self.total_ns / 1e9,
+            "share": self.total_ns / wall_ns if wall_ns else 0.0,
+            "mean_us": self.total_ns / self.calls / 1e3 if self.calls else 0.0,
+            "p50_us": self.percentile_us(0.5),
+            "p90_us": self.percentile_us(0.9),
+            "p99_us": self.percentile_us(0.99),
+            "max_us": self.max_ns / 1e3,
+        }
+
+
+class Profiler:
+    """Per-phase wall-clock timings, step throughput and episode latencies"""
+
+    enabled = True
+
+    def __init__(self, name="profile"):
+        self.name = name
+        self.phases = {}
+        self.episodes = LatencyStats()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded and restart the wall clock"""
+        self.phases.clear()
+        self.episodes = LatencyStats()
+        self.steps = 0
+        self._start_ns = time.perf_counter_ns()
+        self._episode_start_ns = self._start_ns
+
+    now = staticmethod(time.perf_counter_ns)
+
+    def lap(self, phase, start_ns):
+        """Charge the time since ``start_ns`` to ``phase``; returns the current time"""
+        now_ns = time.perf_counter_ns()
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = LatencyStats()
+        stats.add(now_ns - start_ns)
+        return now_ns
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Context manager form of ``lap`` for coarse, infrequent phases"""
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.lap(name, start_ns)
+
+    def step(self, count=1):
+        self.steps += count
+
+    def start_episode(self):
+        """Mark the start of an episode (e.g. right before ``env.reset``)"""
+        self._episode_start_ns = time.perf_counter_ns()
+
+    def end_episode(self, steps=0, start_ns=None):
+        """
+        Record the latency of the episode started last and add its steps
+
+        Loops over several envs at once pass the ``now()`` their episode
+        started at as ``start_ns`` instead.
+        """
+        now_ns = time.perf_counter_ns()
+        if start_ns is None:
+            start_ns = self._episode_start_ns
+            self._episode_start_ns = now_ns
+        self.episodes.add(now_ns - start_ns)
+        self.steps += steps
+
+    def summary(self):
+        """
+        Returns:
+            summary: dict with name, wall_seconds, steps, episodes,
+            steps_per_second, episodes_per_second, 'phases' (per phase: calls,
+            total_seconds, share of wall time, mean / p50 / p90 / p99 / max
+            latency in µs), 'unaccounted_share' and 'episode_latency'
+        """
+        wall_ns = time.perf_counter_ns() - self._start_ns
+        wall = wall_ns / 1e9
+        phases = {name: stats.summary(wall_ns) for name, stats in self.phases.items()}
+        return {
+            "name": self.name,
+            "wall_seconds": wall,
+            "steps": self.steps,
+            "episodes": self.episodes.calls,
+            "steps_per_second": self.steps / wall if wall else 0.0,
+            "episodes_per_second": self.episodes.calls / wall if wall else 0.0,
+            "phases": phases,
+            "unaccounted_share": max(1.0 - sum(phase["share"] for phase in phases.values()), 0.0),
+            "episode_latency": self.episodes.summary(wall_ns),
+        }
+
+    def histograms(self):
+        """{phase: (bucket upper edges in µs, counts)} over the non-empty bucket range"""
+        result = {}
+        for name, stats in list(self.phases.items()) + [("episode", self.episodes)]:
+            used = [bucket for bucket, count in enumerate(stats.histogram) if count]
+            if used:
+                buckets = range(used[0], used[-1] + 1)
+                result[name] = ([2 ** bucket / 1e3 for bucket in buckets], [stats.histogram[b] for b in buckets])
+        return result
+
+    def to_json(self, path):
+        """Write the summary plus latency histograms as JSON"""
+        data = self.summary()
+        data["histograms"] = {name: {"upper_us": edges, "counts": counts}
+                              for name, (edges, counts) in self.histograms().items()}
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    def to_csv(self, path):
+        """Write one row per phase (plus 'episode') with the summary numbers"""
+        summary = self.summary()
+        rows = dict(summary["phases"], episode=summary["episode_latency"])
+        columns = ["calls", "total_seconds", "share", "mean_us", "p50_us", "p90_us", "p99_us", "max_us"]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "phase"] + columns + ["steps_per_second"])
+            for phase, stats in rows.items():
+                writer.writerow([self.name, phase] + [stats[column] for column in columns]
+                                + [summary["steps_per_second"]])
+
+    def save(self, path):
+        """``to_csv`` for a ``.csv`` path, ``to_json`` otherwise"""
+        if path.endswith(".csv"):
+            self.to_csv(path)
+        else:
+            self.to_json(path)
+
+    def print_report(self):
+        """Table of the summary, slowest phase first"""
+        summary = self.summary()
+        print(f"\n⏱️  PROFILE {summary['name']}: {summary['steps']} steps, {summary['episodes']} episodes "
+              f"in {summary['wall_seconds']:.2f}s ({summary['steps_per_second']:.0f} steps/s)")
+        phases = sorted(summary["phases"].items(), key=lambda item: item[1]["total_seconds"], reverse=True)
+        for name, stats in phases:
+            print(f"   {name:<12} {stats['share']:6.1%} | {stats['calls']:8d} calls | "
+                  f"mean {stats['mean_us']:9.1f}µs | p99 {stats['p99_us']:9.1f}µs | max {stats['max_us']:9.1f}µs")
+        print(f"   {'(other)':<12} {summary['unaccounted_share']:6.1%}")
+        if summary["episodes"]:
+            latency = summary["episode_latency"]
+            print(f"   episode latency: mean {latency['mean_us'] / 1e3:.1f}ms, "
+                  f"p50 {latency['p50_us'] / 1e3:.1f}ms, p99 {latency['p99_us'] / 1e3:.1f}ms")
+
+
+class NullProfiler:
+    """Profiler interface that records nothing"""
+
+    enabled = False
+
+    def reset(self):
+        pass
+
+    def now(self):
+        return 0
+
+    def lap(self, phase, start_ns):
+        return 0
+
+    def phase(self, name):
+        return contextlib.nullcontext()
+
+    def step(self, count=1):
+        pass
+
+    def start_episode(self):
+        pass
+
+    def end_episode(self, steps=0, start_ns=None):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
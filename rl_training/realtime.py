@@ -0,0 +1,310 @@
+"""
+Real-time runtime for the interactive manual-control lab scripts.
+
+The original interactive loops polled the keyboard, stepped the env, printed
+and drew the ``render_mode="human"`` window once per ``clock.tick``, so a
+slow frame or a burst of console output stretched the simulated time step
+and delayed the next key press. ``ManualControlLoop`` decouples them:
+
+- physics steps at a fixed rate off a time accumulator; steps that fall
+  behind are caught up (at most ``max_catch_up`` in a row, after which the
+  backlog is dropped and counted as late steps);
+- the keyboard is polled between steps at ``input_hz``, far faster than the
+  physics rate;
+- the env renders to ``rgb_array`` and the frame is blitted into the window
+  at an independent, usually lower rate; frames that come due while the loop
+  is busy are skipped and counted as dropped;
+- console output goes through ``LogSink``, a background thread that prints
+  at most ``max_lines_per_second`` lines (excess lines are dropped and
+  counted; ``force=True`` lines always get through);
+- the pause after an episode is a state of the loop rather than a blocking
+  wait, so the window keeps drawing and R / ESC respond immediately.
+
+Input-to-action latency - from the poll that first sees a new action to the
+end of the env step that applies it - is recorded in a log2 histogram like
+the ``Profiler`` phases and reported together with the dropped frames.
+"""
+
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+from rl_training.lazy import require
+from rl_training.profiling import NULL_PROFILER, LatencyStats
+
+
+class LogSink:
+    """Rate-limited console output written by a background thread"""
+
+    def __init__(self, max_lines_per_second=20, burst=40, capacity=10000, stream=None):
+        """
+        Args:
+            max_lines_per_second: Sustained print rate
+            burst: Lines that may be printed back to back after a quiet period
+            capacity: Lines buffered before ``log`` starts dropping them
+            stream: File to write to (sys.stdout when None)
+        """
+        self.max_lines_per_second = max_lines_per_second
+        self.burst = burst
+        self.stream = stream
+        self.printed = 0
+        # Written by different threads, so kept apart
+        self._dropped_full = 0
+        self._dropped_rate = 0
+        self._queue = queue.Queue(capacity)
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self):
+        """Lines dropped so far (rate limit or full buffer)"""
+        return self._dropped_full + self._dropped_rate
+
+    def log(self, *lines, force=False):
+        """Queue lines for printing without blocking; ``force`` bypasses the rate limit"""
+        for line in lines:
+            try:
+                self._queue.put_nowait((str(line), force))
+            except queue.Full:
+                self._dropped_full += 1
+
+    __call__ = log
+
+    def _write(self, line):
+        print(line, file=self.stream or sys.stdout)
+        self.printed += 1
+
+    def _run(self):
+        tokens = float(self.burst)
+        last = time.perf_counter()
+        suppressed = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            line, force = item
+            now = time.perf_counter()
+            tokens = min(self.burst, tokens + (now - last) * self.max_lines_per_second)
+            last = now
+            if force or tokens >= 1:
+                if suppressed:
+                    self._write(f"   … {suppressed} log lines dropped")
+                    suppressed = 0
+                self._write(line)
+                tokens -= 1
+            else:
+                suppressed += 1
+                self._dropped_rate += 1
+            if self._queue.empty():
+                (self.stream or sys.stdout).flush()
+        if suppressed:
+            self._write(f"   … {suppressed} log lines dropped")
+
+    def close(self):
+        """Print what is still queued and stop the thread"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        (self.stream or sys.stdout).flush()
+
+
+def _same_action(a, b):
+    return np.array_equal(a, b)
+
+
+class ManualControlLoop:
+    """Fixed-rate physics, independent rendering and non-blocking pauses for keyboard control"""
+
+    def __init__(self, env, physics_hz=None, render_fps=None, title="Manual control", end_pause=3.0,
+                 input_hz=500, max_catch_up=5, log=None, profiler=NULL_PROFILER):
+        """
+        Args:
+            env: Env created with ``render_mode="rgb_array"``
+            physics_hz: Env steps per second (the env's ``render_fps``
+                metadata, i.e. the rate its human mode ran at, when None)
+            render_fps: Frames drawn per second (at most physics_hz; same as
+                physics_hz when None)
+            title: Window caption
+            end_pause: Seconds between the end of an episode and the next reset
+            input_hz: Keyboard polls per second while idle
+            max_catch_up: Late physics steps run back to back before the
+                rest of the backlog is dropped
+            log: LogSink for the callbacks' output (a new one when None)
+            profiler: rl_training.profiling.Profiler timing 'input',
+                'env.step', 'callbacks', 'render' and 'idle'
+        """
+        self.env = env
+        default_rate = env.metadata.get("render_fps") or 30
+        self.physics_hz = physics_hz or default_rate
+        self.render_fps = min(render_fps or self.physics_hz, self.physics_hz)
+        self.title = title
+        self.end_pause = end_pause
+        self.input_hz = input_hz
+        self.max_catch_up = max_catch_up
+        self.log = log if log is not None else LogSink()
+        self.profiler = profiler
+
+        self.latency = LatencyStats()
+        self.physics_steps = 0
+        self.late_steps = 0
+        self.frames = 0
+        self.dropped_frames = 0
+        self.wall_seconds = 0.0
+        self.running = False
+
+    def stop(self):
+        self.running = False
+
+    def run(self, select_action, on_step, on_episode_end=None, on_reset=None, initial_action=0):
+        """
+        Play until the window is closed or ESC is pressed
+
+        Args:
+            select_action: ``select_action(keys) -> action`` from
+                ``pygame.key.get_pressed()``; called at every poll
+            on_step: ``on_step(obs, reward, terminated, truncated, action)``
+                after every env step
+            on_episode_end: ``on_episode_end(terminated, truncated)`` when an
+                episode ends, before the ``end_pause`` (R skips the pause)
+            on_reset: ``on_reset(manual)`` after every reset but the first
+                (``manual``: R interrupted a running episode)
+            initial_action: Action until ``select_action`` returns another
+
+        Returns:
+            obs: Last observation
+        """
+        pygame = require("pygame", "ManualControlLoop")
+
+        profiler = self.profiler
+        obs, _ = self.env.reset()
+        frame = self.env.render()
+        screen = pygame.display.set_mode((frame.shape[1], frame.shape[0]))
+        pygame.display.set_caption(self.title)
+
+        step_dt = 1.0 / self.physics_hz
+        frame_dt = 1.0 / self.render_fps
+        poll_dt = 1.0 / self.input_hz
+        action = initial_action
+        changed_ns = None  # When the pending action change was first seen
+        pause_until = None
+
+        def reset(manual):
+            nonlocal obs
+            obs, _ = self.env.reset()
+            profiler.start_episode()
+            if on_reset is not None:
+                on_reset(manual)
+
+        start = time.perf_counter()
+        next_step = next_frame = start
+        profiler.start_episode()
+        self.running = True
+        while self.running:
+            t = profiler.now()
+            reset_requested = False
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        self.running = False
+                    elif event.key == pygame.K_r:
+                        reset_requested = True
+            if not self.running:
+                break
+            new_action = select_action(pygame.key.get_pressed())
+            if not _same_action(new_action, action):
+                action = new_action
+                if changed_ns is None:
+                    changed_ns = time.perf_counter_ns()
+            t = profiler.lap("input", t)
+
+            now = time.perf_counter()
+            if reset_requested or (pause_until is not None and now >= pause_until):
+                # R during play interrupts the episode; during the pause it only skips the wait
+                reset(manual=reset_requested and pause_until is None)
+                pause_until = None
+                next_step = now
+                t = profiler.lap("callbacks", t)
+
+            steps = 0
+            while pause_until is None and now >= next_step:
+                obs, reward, terminated, truncated, _ = self.env.step(action)
+                if changed_ns is not None:
+                    self.latency.add(time.perf_counter_ns() - changed_ns)
+                    changed_ns = None
+                t = profiler.lap("env.step", t)
+                profiler.step()
+                self.physics_steps += 1
+                steps += 1
+                next_step += step_dt
+
+                on_step(obs, reward, terminated, truncated, action)
+                if terminated or truncated:
+                    profiler.end_episode()
+                    if on_episode_end is not None:
+                        on_episode_end(terminated, truncated)
+                    pause_until = time.perf_counter() + self.end_pause
+                t = profiler.lap("callbacks", t)
+
+                now = time.perf_counter()
+                if steps >= self.max_catch_up and now >= next_step:
+                    # Too far behind: let simulated time slip instead of spiralling
+                    behind = int((now - next_step) / step_dt) + 1
+                    self.late_steps += behind
+                    next_step += behind * step_dt
+                    break
+
+            if now >= next_frame:
+                missed = int((now - next_frame) / frame_dt)
+                self.dropped_frames += missed
+                frame = self.env.render()
+                pygame.surfarray.blit_array(screen, frame.swapaxes(0, 1))
+                pygame.display.flip()
+                self.frames += 1
+                next_frame += (missed + 1) * frame_dt
+                t = profiler.lap("render", t)
+
+            wake = min(next_frame, time.perf_counter() + poll_dt)
+            wake = min(wake, pause_until if pause_until is not None else next_step)
+            delay = wake - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            profiler.lap("idle", t)
+
+        self.wall_seconds = time.perf_counter() - start
+        return obs
+
+    def summary(self):
+        """Rates, late steps, dropped frames and input latency of the last run"""
+        wall = self.wall_seconds
+        return {
+            "wall_seconds": wall,
+            "physics_hz": self.physics_hz,
+            "physics_steps": self.physics_steps,
+            "achieved_physics_hz": self.physics_steps / wall if wall else 0.0,
+            "late_steps": self.late_steps,
+            "render_fps": self.render_fps,
+            "frames": self.frames,
+            "achieved_fps": self.frames / wall if wall else 0.0,
+            "dropped_frames": self.dropped_frames,
+            "input_latency": self.latency.summary(wall * 1e9),
+            "log_lines_dropped": self.log.dropped,
+        }
+
+    def print_report(self):
+        summary = self.summary()
+        latency = summary["input_latency"]
+        print(f"\n⏱️  REAL-TIME LOOP: {summary['wall_seconds']:.1f}s")
+        print(f"   physics: {summary['physics_steps']} steps at {summary['achieved_physics_hz']:.1f} Hz "
+              f"(target {summary['physics_hz']} Hz, {summary['late_steps']} late steps dropped)")
+        print(f"   render:  {summary['frames']} frames at {summary['achieved_fps']:.1f} fps "
+              f"(target {summary['render_fps']} fps, {summary['dropped_frames']} dropped)")
+        if latency["calls"]:
+            print(f"   input → action latency: mean {latency['mean_us'] / 1e3:.1f}ms, "
+                  f"p50 {latency['p50_us'] / 1e3:.1f}ms, p99 {latency['p99_us'] / 1e3:.1f}ms "
+                  f"({latency['calls']} action changes)")
+        print(f"   log lines dropped: {summary['log_lines_dropped']}")
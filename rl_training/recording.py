@@ -0,0 +1,356 @@
+"""
+Record-and-replay of (obs, action, reward) trajectories.
+
+``RecordTrajectories`` is a gymnasium wrapper that keeps every transition an
+env produces: the manual-control scripts wrap their env with it
+(``--record DIR``) and every human demonstration ends up on disk. Transitions
+go into preallocated NumPy chunks; filled parts of a chunk are handed to a
+background writer thread, so the 30-50 FPS render loop only ever does an
+array assignment per step.
+
+A recording is a directory of append-only files::
+
+    meta.json       format version, env spec, dtype and shape of every field
+    obs.bin         observation before each action       [n, *obs_shape]
+    actions.bin     action taken                         [n, *action_shape]
+    rewards.bin     reward received                      [n]
+    terminated.bin  / truncated.bin                      [n]
+    episodes.bin    (start, length, seed) per episode, written after the
+                    episode's transitions
+
+Every ``.bin`` file is raw C-order data, so ``TrajectoryStore`` opens them with
+``np.memmap`` without reading them. Each episode starts with an explicitly
+seeded ``reset``, so ``replay_episode`` can feed the recorded actions back
+through the env and reproduce the episode exactly.
+"""
+
+import json
+import os
+import queue
+import threading
+
+import gymnasium as gym
+import numpy as np
+
+FORMAT_VERSION = 1
+FIELDS = ("obs", "actions", "rewards", "terminated", "truncated")
+EPISODE_DTYPE = np.dtype([("start", "<i8"), ("length", "<i8"), ("seed", "<i8")])
+
+
+def _field_layout(observation_space, action_space):
+    """dtype and per-step shape of every field"""
+    return {
+        "obs": (np.dtype(observation_space.dtype), tuple(observation_space.shape)),
+        "actions": (np.dtype(action_space.dtype), tuple(action_space.shape)),
+        "rewards": (np.dtype(np.float64), ()),
+        "terminated": (np.dtype(bool), ()),
+        "truncated": (np.dtype(bool), ()),
+    }
+
+
+class TrajectoryWriter:
+    """Chunked, append-only transition writer with a background flushing thread"""
+
+    def __init__(self, path, layout, spec=None, chunk_size=4096):
+        """
+        Args:
+            path: Recording directory (created, or appended to if it exists)
+            layout: {field: (dtype, shape)} for every name in FIELDS
+            spec: JSON description of the env (``EnvSpec.to_json()``)
+            chunk_size: Transitions per preallocated chunk
+        """
+        self.path = path
+        self.layout = layout
+        self.chunk_size = chunk_size
+        os.makedirs(path, exist_ok=True)
+        self.position = self._open_meta(spec)
+
+        self._chunk = self._new_chunk()
+        self._filled = 0    # Transitions stored in the current chunk
+        self._flushed = 0   # ... of which already handed to the writer
+        self._episode_start = self.position
+        self._episode_seed = None
+
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._write_loop, name="trajectory-writer", daemon=True)
+        self._thread.start()
+
+    def _open_meta(self, spec):
+        """Write meta.json, or validate it and recover the end of the last complete episode"""
+        meta_path = os.path.join(self.path, "meta.json")
+        fields = {name: {"dtype": dtype.str, "shape": list(shape)} for name, (dtype, shape) in self.layout.items()}
+        if not os.path.exists(meta_path):
+            with open(meta_path, "w") as f:
+                json.dump({"version": FORMAT_VERSION, "spec": spec, "fields": fields}, f, indent=2)
+            return 0
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["fields"] != fields:
+            raise ValueError(f"{self.path} holds a recording with different fields: {meta['fields']}")
+        episodes = _read_episodes(self.path)
+        end = int(episodes["start"][-1] + episodes["length"][-1]) if len(episodes) else 0
+        # Drop transitions of an episode that never finished (e.g. a crash)
+        for name, (dtype, shape) in self.layout.items():
+            file_path = os.path.join(self.path, f"{name}.bin")
+            if os.path.exists(file_path):
+                os.truncate(file_path, end * dtype.itemsize * int(np.prod(shape)))
+        return end
+
+    def _new_chunk(self):
+        return {name: np.empty((self.chunk_size,) + shape, dtype=dtype)
+                for name, (dtype, shape) in self.layout.items()}
+
+    def _write_loop(self):
+        files = {name: open(os.path.join(self.path, f"{name}.bin"), "ab") for name in FIELDS}
+        episodes = open(os.path.join(self.path, "episodes.bin"), "ab")
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                kind, payload = item
+                try:
+                    if kind == "transitions":
+                        for name, block in payload.items():
+                            files[name].write(block.tobytes())
+                            files[name].flush()
+                    else:
+                        episodes.write(payload.tobytes())
+                        episodes.flush()
+                except Exception as error:  # Surfaced on the next call from the main thread
+                    self._error = error
+        finally:
+            for f in files.values():
+                f.close()
+            episodes.close()
+
+    def _check(self):
+        if self._error is not None:
+            raise RuntimeError(f"Writing {self.path} failed") from self._error
+
+    def _flush_chunk(self):
+        """Hand the filled, not yet flushed part of the chunk to the writer (no copy)"""
+        if self._filled > self._flushed:
+            self._queue.put(("transitions", {name: array[self._flushed:self._filled]
+                                             for name, array in self._chunk.items()}))
+            self._flushed = self._filled
+
+    def begin_episode(self, seed):
+        """Start a new episode (ending the current one, if any)"""
+        self.end_episode()
+        self._episode_start = self.position
+        self._episode_seed = seed
+
+    def add(self, obs, action, reward, terminated, truncated):
+        """Store one transition - an array assignment, never a disk write"""
+        self._check()
+        i = self._filled
+        chunk = self._chunk
+        chunk["obs"][i] = obs
+        chunk["actions"][i] = action
+        chunk["rewards"][i] = reward
+        chunk["terminated"][i] = terminated
+        chunk["truncated"][i] = truncated
+        self._filled += 1
+        self.position += 1
+        if self._filled == self.chunk_size:
+            # The writer keeps a view of the full chunk; recording continues in a fresh one
+            self._flush_chunk()
+            self._chunk = self._new_chunk()
+            self._filled = self._flushed = 0
+
+    def end_episode(self):
+        """Publish the current episode (no-op when nothing was recorded)"""
+        length = self.position - self._episode_start
+        if self._episode_seed is None or length == 0:
+            return
+        self._flush_chunk()
+        record = np.array([(self._episode_start, length, self._episode_seed)], dtype=EPISODE_DTYPE)
+        self._queue.put(("episode", record))
+        self._episode_start = self.position
+
+    def close(self):
+        """Publish the last episode and wait for the writer to finish"""
+        self.end_episode()
+        self._episode_seed = None
+        self._queue.put(None)
+        self._thread.join()
+        self._check()
+
+
+class RecordTrajectories(gym.Wrapper):
+    """Record every transition of the wrapped env to a trajectory directory"""
+
+    def __init__(self, env, path, chunk_size=4096, seed=None):
+        """
+        Args:
+            env: Env to record
+            path: Recording directory (appended to if it already exists)
+            chunk_size: Transitions per preallocated chunk
+            seed: Seeds the generator that picks reset seeds when the caller
+                does not pass one
+        """
+        super().__init__(env)
+        spec = env.spec.to_json() if env.spec is not None else None
+        self.writer = TrajectoryWriter(path, _field_layout(env.observation_space, env.action_space),
+                                       spec, chunk_size)
+        self._seeds = np.random.default_rng(seed)
+        self._obs = None
+
+    def reset(self, *, seed=None, options=None):
+        # Every episode gets an explicit seed so that it can be replayed exactly
+        if seed is None:
+            seed = int(self._seeds.integers(2**31 - 1))
+        obs, info = self.env.reset(seed=seed, options=options)
+        self.writer.begin_episode(seed)
+        self._obs = obs
+        return obs, info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        self.writer.add(self._obs, action, reward, terminated, truncated)
+        self._obs = obs
+        return obs, reward, terminated, truncated, info
+
+    def close(self):
+        self.writer.close()
+        super().close()
+
+
+def _read_episodes(path):
+    episodes_path = os.path.join(path, "episodes.bin")
+    if not os.path.exists(episodes_path) or os.path.getsize(episodes_path) == 0:
+        return np.zeros(0, dtype=EPISODE_DTYPE)
+    return np.fromfile(episodes_path, dtype=EPISODE_DTYPE)
+
+
+class TrajectoryStore:
+    """Read-only, memory-mapped view of a recording directory"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta["version"] > FORMAT_VERSION:
+            raise ValueError(f"{path} uses format version {self.meta['version']}, "
+                             f"this code reads up to version {FORMAT_VERSION}")
+        self.episodes = _read_episodes(path)
+        self.num_transitions = int(self.episodes["start"][-1] + self.episodes["length"][-1]) \
+            if len(self.episodes) else 0
+
+        self.fields = {}
+        for name in FIELDS:
+            dtype = np.dtype(self.meta["fields"][name]["dtype"])
+            shape = (self.num_transitions,) + tuple(self.meta["fields"][name]["shape"])
+            if self.num_transitions == 0:
+                self.fields[name] = np.empty(shape, dtype=dtype)
+            else:
+                self.fields[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype,
+                                              mode="r", shape=shape)
+
+    def __len__(self):
+        return len(self.episodes)
+
+    def __getitem__(self, name):
+        """Every recorded transition of a field, e.g. store['obs']"""
+        return self.fields[name]
+
+    def episode(self, index):
+        """Fields of one episode as memmap slices, plus its 'seed'"""
+        start, length, seed = self.episodes[index]
+        result = {name: array[start:start + length] for name, array in self.fields.items()}
+        result["seed"] = int(seed)
+        return result
+
+    def action_episodes(self):
+        """Recorded action sequence of every episode (e.g. for RecordedController)"""
+        return [self.fields["actions"][start:start + length] for start, length, _ in self.episodes]
+
+    def make_env(self, **kwargs):
+        """Headless env built from the recorded spec"""
+        if self.meta["spec"] is None:
+            raise ValueError(f"{self.path} has no env spec, pass an env to replay")
+        kwargs.setdefault("render_mode", None)
+        return gym.make(gym.envs.registration.EnvSpec.from_json(self.meta["spec"]), **kwargs)
+
+
+def replay_episode(env, store, index, atol=1e-5):
+    """
+    Feed a recorded episode back through an env and compare what it produces
+
+    Args:
+        env: Env of the same kind (e.g. ``store.make_env()``)
+        store: TrajectoryStore
+        index: Episode index
+        atol: Tolerance for observation / reward mismatches
+
+    Returns:
+        result: dict with episode, steps, total_reward, max_obs_error,
+        max_reward_error and matches
+    """
+    episode = store.episode(index)
+    obs, _ = env.reset(seed=episode["seed"])
+    max_obs_error = float(np.max(np.abs(np.asarray(obs, dtype=float) - episode["obs"][0]), initial=0.0))
+    max_reward_error = 0.0
+    total_reward = 0.0
+    steps = len(episode["actions"])
+
+    for t in range(steps):
+        obs, reward, _, _, _ = env.step(episode["actions"][t])
+        total_reward += float(reward)
+        max_reward_error = max(max_reward_error, abs(float(reward) - float(episode["rewards"][t])))
+        if t + 1 < steps:
+            error = np.max(np.abs(np.asarray(obs, dtype=float) - episode["obs"][t + 1]), initial=0.0)
+            max_obs_error = max(max_obs_error, float(error))
+
+    return {
+        "episode": index,
+        "steps": steps,
+        "total_reward": total_reward,
+        "max_obs_error": max_obs_error,
+        "max_reward_error": max_reward_error,
+        "matches": max_obs_error <= atol and max_reward_error <= atol,
+    }
+
+
+def replay(store, env=None, episodes=None, atol=1e-5):
+    """
+    Replay recorded episodes (all by default) and verify them
+
+    Args:
+        store: TrajectoryStore or a recording directory
+        env: Env to replay in (default: built from the recorded spec)
+        episodes: Episode indices to replay
+        atol: See ``replay_episode``
+
+    Returns:
+        results: ``replay_episode`` result per episode
+    """
+    if not isinstance(store, TrajectoryStore):
+        store = TrajectoryStore(store)
+    own_env = env is None
+    if own_env:
+        env = store.make_env()
+    try:
+        indices = range(len(store)) if episodes is None else episodes
+        return [replay_episode(env, store, index, atol) for index in indices]
+    finally:
+        if own_env:
+            env.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a trajectory recording and verify it")
+    parser.add_argument("path", help="recording directory")
+    args = parser.parse_args()
+
+    results = replay(args.path)
+    for result in results:
+        status = "ok" if result["matches"] else "MISMATCH"
+        print(f"Episode {result['episode']:4d} | Steps: {result['steps']:4d} | "
+              f"Total Reward: {result['total_reward']:8.1f} | max obs error {result['max_obs_error']:.2e} | {status}")
+    print(f"{sum(result['matches'] for result in results)}/{len(results)} episodes replayed exactly")
@@ -0,0 +1,331 @@
+"""
+Experience replay for off-policy agents (DQN and friends).
+
+``ReplayBuffer`` is a fixed-capacity ring buffer backed by preallocated NumPy
+arrays, one per field::
+
+    obs       [capacity, *obs_shape]     observation before the action
+    actions   [capacity, *action_shape]
+    rewards   [capacity]                 float32
+    next_obs  [capacity, *obs_shape]
+    dones     [capacity]                 bool: the episode *terminated* (a
+                                         time-limit truncation still bootstraps)
+
+``add`` writes one transition in O(1) (a handful of array assignments, no
+allocation) and overwrites the oldest one once the buffer is full;
+``add_batch`` writes a whole vector-env step at once. ``sample`` draws a
+minibatch with one fancy-indexing gather per field.
+
+With ``prioritized=True`` transitions are drawn with probability ∝ pᵢ^α
+(prioritized experience replay). The priorities live in a ``SumTree``, so
+updating one costs O(log N) and drawing a batch is one vectorized descent of
+the tree. New transitions get the largest priority seen so far; importance
+weights (N · P(i))^-β are normalized by the batch maximum.
+
+``save`` writes a directory in the ``rl_training.recording`` style - raw
+C-order ``.bin`` files plus ``meta.json`` - and ``load`` opens it with
+``np.memmap``, so a buffer of millions of transitions is available without
+reading it. With ``mmap_mode="r+"`` adds write straight into the files;
+``save`` to that same directory then flushes them and rewrites only
+``meta.json`` and the priorities::
+
+    buffer = ReplayBuffer.for_env(env, capacity=1_000_000, prioritized=True)
+    run_episode(env, agent, buffer=buffer)
+    batch = buffer.sample(64)
+    buffer.update_priorities(batch["indices"], np.abs(td_errors))
+    buffer.save("replay/")
+"""
+
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+FIELDS = ("obs", "actions", "rewards", "next_obs", "dones")
+
+
+class SumTree:
+    """Binary tree of non-negative priorities whose inner nodes hold the sum of their children"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Leaves start at index `leaves`; node i has children 2i and 2i + 1, the root is node 1
+        self.leaves = 1 << max(capacity - 1, 0).bit_length()
+        self.depth = self.leaves.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaves)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    @property
+    def priorities(self):
+        """Leaf priorities [capacity] (a view)"""
+        return self.tree[self.leaves:self.leaves + self.capacity]
+
+    def update(self, index, priority):
+        """Set one priority, O(log N)"""
+        tree = self.tree
+        node = index + self.leaves
+        tree[node] = priority
+        while node > 1:
+            node >>= 1
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+
+    def update_batch(self, indices, priorities):
+        """Set many priorities, one vectorized pass per tree level"""
+        nodes = np.asarray(indices) + self.leaves
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes >> 1)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def rebuild(self):
+        """Recompute every inner node from the leaves"""
+        for level in range(self.depth - 1, -1, -1):
+            start = 1 << level
+            nodes = np.arange(start, 2 * start)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, targets):
+        """
+        Leaf of every prefix-sum target: the first index whose cumulative
+        priority exceeds the target
+
+        Args:
+            targets: Values in [0, total) [batch]
+
+        Returns:
+            indices: Leaf indices [batch], never a zero-priority leaf
+        """
+        targets = np.array(targets, dtype=float)
+        nodes = np.ones(len(targets), dtype=np.int64)
+        tree = self.tree
+        for _ in range(self.depth):
+            nodes <<= 1  # Left child
+            left = tree[nodes]
+            # Rounding can leave a target just past the left sum with nothing on the right
+            go_right = (targets >= left) & (tree[nodes + 1] > 0)
+            np.subtract(targets, left, out=targets, where=go_right)
+            nodes += go_right
+        return nodes - self.leaves
+
+
+class ReplayBuffer:
+    """Fixed-capacity ring buffer of transitions with optional prioritized sampling"""
+
+    def __init__(self, capacity, obs_shape=(8,), obs_dtype=np.float32, action_shape=(), action_dtype=np.int64,
+                 prioritized=False, alpha=0.6, epsilon=1e-6, seed=None):
+        """
+        Args:
+            capacity: Transitions kept; the oldest are overwritten beyond it
+            obs_shape: Shape of one observation (LunarLander: (8,))
+            obs_dtype: Observation dtype
+            action_shape: Shape of one action (() for discrete actions)
+            action_dtype: Action dtype
+            prioritized: Sample ∝ priority^alpha instead of uniformly
+            alpha: Prioritization exponent (0: uniform)
+            epsilon: Added to every priority so no transition becomes unreachable
+            seed: Seed of the sampling
+        """
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self.capacity = int(capacity)
+        self.layout = {
+            "obs": (np.dtype(obs_dtype), tuple(obs_shape)),
+            "actions": (np.dtype(action_dtype), tuple(action_shape)),
+            "rewards": (np.dtype(np.float32), ()),
+            "next_obs": (np.dtype(obs_dtype), tuple(obs_shape)),
+            "dones": (np.dtype(bool), ()),
+        }
+        self.arrays = {name: np.zeros((self.capacity,) + shape, dtype=dtype)
+                       for name, (dtype, shape) in self.layout.items()}
+        self.position = 0  # Next slot to write
+        self.size = 0
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.max_priority = 1.0
+        self.tree = SumTree(self.capacity) if prioritized else None
+        self.rng = np.random.default_rng(seed)
+        self.path = None  # Directory the arrays are mapped onto read-write (load with mmap_mode="r+")
+
+    @classmethod
+    def for_env(cls, env, capacity, **kwargs):
+        """Buffer shaped for an env's (or a vector env's single) observation and action spaces"""
+        observation_space = getattr(env, "single_observation_space", env.observation_space)
+        action_space = getattr(env, "single_action_space", env.action_space)
+        return cls(capacity, observation_space.shape, observation_space.dtype, action_space.shape,
+                   action_space.dtype, **kwargs)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        """The stored part of a field, e.g. buffer['rewards'] (a view in slot order, not chronological once wrapped)"""
+        return self.arrays[name][:self.size]
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def add(self, obs, action, reward, next_obs, done):
+        """Store one transition, O(1) (O(log N) with priorities)"""
+        i = self.position
+        arrays = self.arrays
+        arrays["obs"][i] = obs
+        arrays["actions"][i] = action
+        arrays["rewards"][i] = reward
+        arrays["next_obs"][i] = next_obs
+        arrays["dones"][i] = done
+        if self.tree is not None:
+            self.tree.update(i, self.max_priority ** self.alpha)
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def add_batch(self, obs, actions, rewards, next_obs, dones):
+        """Store a batch of transitions (e.g. one vector-env step) [batch, ...]"""
+        count = len(rewards)
+        if count > self.capacity:
+            # Only the last `capacity` transitions would survive
+            obs, actions, rewards, next_obs, dones = (
+                np.asarray(x)[-self.capacity:] for x in (obs, actions, rewards, next_obs, dones))
+            count = self.capacity
+        indices = (self.position + np.arange(count)) % self.capacity
+        for name, values in zip(FIELDS, (obs, actions, rewards, next_obs, dones)):
+            self.arrays[name][indices] = values
+        if self.tree is not None:
+            self.tree.update_batch(indices, np.full(count, self.max_priority ** self.alpha))
+        self.position = int((self.position + count) % self.capacity)
+        self.size = min(self.size + count, self.capacity)
+
+    def sample(self, batch_size, beta=0.4):
+        """
+        Draw a minibatch
+
+        Args:
+            batch_size: Transitions to draw (with replacement)
+            beta: Importance-sampling exponent (prioritized mode only)
+
+        Returns:
+            batch: dict with obs, actions, rewards, next_obs, dones, their
+            'indices' and (prioritized) importance 'weights' [batch_size]
+        """
+        if self.size == 0:
+            raise ValueError("Cannot sample from an empty replay buffer")
+        if self.tree is None:
+            indices = self.rng.integers(self.size, size=batch_size)
+            weights = None
+        else:
+            # Stratified: one draw from each of batch_size equal slices of the total priority
+            total = self.tree.total
+            targets = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+            indices = self.tree.find(np.minimum(targets, np.nextafter(total, 0)))
+            probabilities = self.tree.priorities[indices] / total
+            weights = (self.size * probabilities) ** -beta
+            weights = (weights / weights.max()).astype(np.float32)
+
+        batch = {name: array[indices] for name, array in self.arrays.items()}
+        batch["indices"] = indices
+        if weights is not None:
+            batch["weights"] = weights
+        return batch
+
+    def update_priorities(self, indices, priorities):
+        """New priorities (e.g. |TD error|) of sampled transitions"""
+        if self.tree is None:
+            raise ValueError("update_priorities needs a buffer created with prioritized=True")
+        priorities = np.abs(np.asarray(priorities, dtype=float)) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update_batch(indices, priorities ** self.alpha)
+
+    def save(self, path):
+        """
+        Write the buffer to a directory: meta.json plus one raw ``.bin`` file
+        per field (and the priorities), sized for the full capacity (the
+        unused tail is never written, so it stays sparse on disk)
+
+        Every file is written to a temporary name and moved into place, so
+        saving over a buffer that is still mapped (mode 'r' or 'c') leaves
+        its mappings intact. Saving a buffer loaded with ``mmap_mode="r+"``
+        back to its own directory only flushes the field files, which already
+        hold every add, and rewrites meta.json and the priorities.
+        """
+        os.makedirs(path, exist_ok=True)
+        fields = {name: {"dtype": dtype.str, "shape": list(shape)} for name, (dtype, shape) in self.layout.items()}
+        meta = {
+            "version": FORMAT_VERSION,
+            "capacity": self.capacity,
+            "size": self.size,
+            "position": self.position,
+            "fields": fields,
+            "prioritized": self.prioritized,
+            "alpha": self.alpha,
+            "epsilon": self.epsilon,
+            "max_priority": self.max_priority,
+        }
+        arrays = dict(self.arrays)
+        if self.path is not None and os.path.samefile(path, self.path):
+            for array in arrays.values():
+                array.flush()
+            arrays = {}
+        if self.tree is not None:
+            arrays["priorities"] = self.tree.priorities
+        for name, array in arrays.items():
+            filename = os.path.join(path, f"{name}.bin")
+            target = np.memmap(filename + ".tmp", dtype=array.dtype, mode="w+", shape=array.shape)
+            target[:self.size] = array[:self.size]
+            target.flush()
+            del target
+            os.replace(filename + ".tmp", filename)
+        with open(os.path.join(path, "meta.json.tmp"), "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+
+    @classmethod
+    def load(cls, path, mmap_mode="r", seed=None):
+        """
+        Open a buffer written by ``save``
+
+        Args:
+            path: Directory written by ``save``
+            mmap_mode: 'r' (read-only, sample only), 'r+' (adds write through
+                to the files; ``save(path)`` records them), 'c' (copy-on-write)
+                or None (read into memory)
+            seed: Seed of the sampling
+
+        Returns:
+            buffer: ReplayBuffer whose arrays are memory-mapped files (or in-memory copies)
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["version"] > FORMAT_VERSION:
+            raise ValueError(f"{path} uses format version {meta['version']}, "
+                             f"this code reads up to version {FORMAT_VERSION}")
+        buffer = object.__new__(cls)
+        buffer.capacity = meta["capacity"]
+        buffer.layout = {name: (np.dtype(field["dtype"]), tuple(field["shape"]))
+                         for name, field in meta["fields"].items()}
+        buffer.arrays = {name: cls._open(path, name, dtype, (buffer.capacity,) + shape, mmap_mode)
+                         for name, (dtype, shape) in buffer.layout.items()}
+        buffer.position = meta["position"]
+        buffer.size = meta["size"]
+        buffer.prioritized = meta["prioritized"]
+        buffer.alpha = meta["alpha"]
+        buffer.epsilon = meta["epsilon"]
+        buffer.max_priority = meta["max_priority"]
+        buffer.tree = None
+        if buffer.prioritized:
+            # The tree itself is rebuilt in memory (O(N)); only the leaves are stored
+            buffer.tree = SumTree(buffer.capacity)
+            buffer.tree.priorities[:] = cls._open(path, "priorities", np.dtype(float), (buffer.capacity,), "r")
+            buffer.tree.rebuild()
+        buffer.rng = np.random.default_rng(seed)
+        buffer.path = path if mmap_mode == "r+" else None
+        return buffer
+
+    @staticmethod
+    def _open(path, name, dtype, shape, mmap_mode):
+        array = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode=mmap_mode or "r", shape=shape)
+        return np.array(array) if mmap_mode is None else array
@@ -0,0 +1,300 @@
+"""
+Parallel multi-seed / hyperparameter sweeps for Blackjack MC control.
+
+``run_sweep`` trains one Monte Carlo control run per ``SweepConfig`` in a pool
+of worker processes. Every worker builds its own Blackjack env once, and every
+run reseeds ``random``, ``np.random`` and the env from its config, so a run
+gives the same Q-table whichever worker picks it up. Each finished run is
+written to ``results_dir`` straight away; calling ``run_sweep`` again with the
+same directory only trains the configs that have no result file yet.
+
+``merge_results`` then averages the runs of every hyperparameter setting over
+seeds (Q-tables, learning curves and ``test_policy`` scores).
+"""
+
+import itertools
+import json
+import os
+import random
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import gymnasium as gym
+import numpy as np
+
+from rl_training.blackjack import INDEXER as BLACKJACK_STATES, N_ACTIONS
+from rl_training.curves import SNAPSHOT_FIELDS, LearningCurve
+from rl_training.lazy import progress as progress_bar
+from rl_training.monte_carlo import (
+    constant_alpha_monte_carlo_control,
+    every_visit_monte_carlo_control,
+    extract_policy,
+    test_policy,
+)
+from rl_training.tabular import QTable
+
+# Control algorithms a sweep can run, by config name
+ALGORITHMS = {
+    "constant_alpha": constant_alpha_monte_carlo_control,
+    "every_visit": every_visit_monte_carlo_control,
+}
+
+SweepConfig = namedtuple(
+    "SweepConfig", ["algorithm", "alpha", "epsilon", "seed", "num_episodes", "batch_size"]
+)
+SweepConfig.__doc__ = """
+One training run of a sweep
+
+Fields:
+    algorithm: Key of ``ALGORITHMS``
+    alpha: Constant step size α
+    epsilon: Exploration rate ε
+    seed: Seeds ``random``, ``np.random`` and the env for this run
+    num_episodes: Training episodes
+    batch_size: Episodes per batch for the NumPy engine, None for the env loop
+"""
+
+# Env of the current worker process, built once by ``_init_worker``
+_worker_env = None
+
+
+def make_grid(algorithms=("constant_alpha",), alphas=(0.01,), epsilons=(0.1,), seeds=(0,),
+              num_episodes=100000, batch_size=None):
+    """
+    Cartesian product of hyperparameters and seeds
+
+    Returns:
+        configs: List of SweepConfig
+    """
+    return [SweepConfig(algorithm, alpha, epsilon, seed, num_episodes, batch_size)
+            for algorithm, alpha, epsilon, seed in itertools.product(algorithms, alphas, epsilons, seeds)]
+
+
+def config_name(config):
+    """File name (without extension) of a config's result"""
+    name = f"{config.algorithm}_alpha{config.alpha}_eps{config.epsilon}_n{config.num_episodes}"
+    if config.batch_size is not None:
+        name += f"_batch{config.batch_size}"
+    return f"{name}_seed{config.seed}"
+
+
+def run_config(config, env, eval_episodes=10000):
+    """
+    Train and evaluate one config in this process
+
+    Args:
+        config: SweepConfig
+        env: Blackjack env (reseeded from the config)
+        eval_episodes: Episodes for ``test_policy`` on the greedy policy
+
+    Returns:
+        result: dict with 'config', 'Q' (QTable), 'curve' (LearningCurve, None
+        for algorithms that do not record one), 'metrics' (``test_policy``
+        output) and 'train_seconds'
+    """
+    random.seed(config.seed)
+    np.random.seed(config.seed)
+    env.reset(seed=config.seed)
+    env.action_space.seed(config.seed)
+
+    start = time.perf_counter()
+    output = ALGORITHMS[config.algorithm](
+        env, num_episodes=config.num_episodes, alpha=config.alpha, epsilon=config.epsilon,
+        batch_size=config.batch_size, verbose=False
+    )
+    train_seconds = time.perf_counter() - start
+    Q, curve = output if isinstance(output, tuple) else (output, None)
+
+    return {
+        "config": config,
+        "Q": Q,
+        "curve": curve,
+        "metrics": test_policy(env, extract_policy(Q), eval_episodes),
+        "train_seconds": train_seconds,
+    }
+
+
+def _init_worker(env_id, env_kwargs):
+    global _worker_env
+    _worker_env = gym.make(env_id, **env_kwargs)
+
+
+def _run_in_worker(config, eval_episodes):
+    return run_config(config, _worker_env, eval_episodes)
+
+
+def save_result(result, results_dir):
+    """
+    Write a run to ``results_dir/<config_name>.npz``
+
+    The file is written under a temporary name and renamed into place, so an
+    interrupted sweep never leaves a truncated result behind.
+    """
+    config = result["config"]
+    path = os.path.join(results_dir, config_name(config) + ".npz")
+    meta = {
+        "config": config._asdict(),
+        "metrics": result["metrics"],
+        "train_seconds": result["train_seconds"],
+    }
+    curve = result["curve"]
+    curve_arrays = {} if curve is None else {f"curve_{name}": array for name, array in curve.to_arrays().items()}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            q_values=result["Q"].values,
+            counts=result["Q"].counts,
+            visited=result["Q"].visited,
+            meta=np.array(json.dumps(meta)),
+            **curve_arrays,
+        )
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_result(path):
+    """Read a run written by ``save_result``"""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        Q = QTable(BLACKJACK_STATES, N_ACTIONS)
+        Q.values[:] = data["q_values"]
+        Q.counts[:] = data["counts"]
+        Q.visited[:] = data["visited"]
+        curve_arrays = {name[len("curve_"):]: data[name] for name in data.files if name.startswith("curve_")}
+    return {
+        "config": SweepConfig(**meta["config"]),
+        "Q": Q,
+        "curve": LearningCurve.from_arrays(curve_arrays) if curve_arrays else None,
+        "metrics": meta["metrics"],
+        "train_seconds": meta["train_seconds"],
+    }
+
+
+def load_results(results_dir):
+    """Read every finished run in ``results_dir``"""
+    return [load_result(os.path.join(results_dir, name))
+            for name in sorted(os.listdir(results_dir)) if name.endswith(".npz")]
+
+
+def run_sweep(configs, results_dir, max_workers=None, eval_episodes=10000, env_id="Blackjack-v1",
+              env_kwargs=None, verbose=True):
+    """
+    Run every config on a process pool, streaming results to disk
+
+    Configs whose result file already exists in ``results_dir`` are loaded
+    instead of retrained, so an interrupted sweep resumes where it stopped.
+
+    Args:
+        configs: Iterable of SweepConfig
+        results_dir: Directory for the per-run ``.npz`` files
+        max_workers: Worker processes (None = one per CPU, 0 = run in this process)
+        eval_episodes: Episodes for ``test_policy`` after training
+        env_id: Gymnasium env id every worker builds
+        env_kwargs: Keyword arguments for ``gym.make`` (default {'sab': True},
+            the rules of the notebook and ``rl_training.blackjack``)
+        verbose: Show a progress bar over finished runs
+
+    Returns:
+        results: One result dict per config (see ``run_config``), in config order
+    """
+    configs = list(configs)
+    env_kwargs = {"sab": True} if env_kwargs is None else env_kwargs
+    os.makedirs(results_dir, exist_ok=True)
+
+    results = {}
+    pending = []
+    for config in configs:
+        path = os.path.join(results_dir, config_name(config) + ".npz")
+        if os.path.exists(path):
+            results[config] = load_result(path)
+        else:
+            pending.append(config)
+
+    if verbose:
+        print(f"Sweep: {len(configs)} runs, {len(results)} already in {results_dir}, {len(pending)} to train")
+    progress = progress_bar(total=len(pending)) if verbose else None
+
+    def finish(result):
+        save_result(result, results_dir)
+        results[result["config"]] = result
+        if progress is not None:
+            progress.update()
+
+    if max_workers == 0:
+        env = gym.make(env_id, **env_kwargs)
+        try:
+            for config in pending:
+                finish(run_config(config, env, eval_episodes))
+        finally:
+            env.close()
+    elif pending:
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(env_id, env_kwargs)) as pool:
+            futures = [pool.submit(_run_in_worker, config, eval_episodes) for config in pending]
+            for future in as_completed(futures):
+                finish(future.result())
+
+    if progress is not None:
+        progress.close()
+    return [results[config] for config in configs]
+
+
+def merge_results(results):
+    """
+    Average runs that differ only in their seed
+
+    Args:
+        results: Result dicts from ``run_sweep`` / ``load_results``
+
+    Returns:
+        merged: One dict per hyperparameter setting, best average reward first,
+        with 'config' (seed set to None), 'seeds', 'Q' (QTable of the mean
+        Q-values over the states any seed visited, each averaged over the
+        seeds that visited it), 'Q_std' (over the same seeds), 'curve' (the
+        seeds' ``LearningCurve.snapshots`` averaged point by point, cut to the
+        shortest run, with the spread over seeds as 'mean_std'; None without
+        curves), 'metrics' (mean of every ``test_policy`` number),
+        'metrics_std' and 'train_seconds' (mean)
+    """
+    groups = defaultdict(list)
+    for result in results:
+        groups[result["config"]._replace(seed=None)].append(result)
+
+    merged = []
+    for config, runs in groups.items():
+        q_values = np.stack([run["Q"].values for run in runs])
+        # Average each state over the seeds that visited it, not the zeros of those that did not
+        mask = np.stack([run["Q"].visited for run in runs])[:, :, None]
+        visits = np.maximum(mask.sum(axis=0), 1)
+        q_mean = np.sum(q_values * mask, axis=0) / visits
+        Q = QTable(BLACKJACK_STATES, N_ACTIONS)
+        Q.values[:] = q_mean
+        Q.counts[:] = sum(run["Q"].counts for run in runs)
+        Q.visited[:] = mask.any(axis=0)[:, 0]
+
+        curve = None
+        if all(run["curve"] is not None for run in runs):
+            points = [run["curve"].snapshots() for run in runs]
+            length = min(len(point["episode"]) for point in points)
+            curve = {name: np.mean([point[name][:length] for point in points], axis=0)
+                     for name in SNAPSHOT_FIELDS}
+            curve["episode"] = points[0]["episode"][:length]
+            curve["mean_std"] = np.std([point["mean"][:length] for point in points], axis=0)
+
+        keys = runs[0]["metrics"].keys()
+        scores = {key: np.array([run["metrics"][key] for run in runs], dtype=float) for key in keys}
+
+        merged.append({
+            "config": config,
+            "seeds": [run["config"].seed for run in runs],
+            "Q": Q,
+            "Q_std": np.sqrt(np.sum(np.square(q_values - q_mean) * mask, axis=0) / visits),
+            "curve": curve,
+            "metrics": {key: float(value.mean()) for key, value in scores.items()},
+            "metrics_std": {key: float(value.std()) for key, value in scores.items()},
+            "train_seconds": float(np.mean([run["train_seconds"] for run in runs])),
+        })
+
+    merged.sort(key=lambda group: group["metrics"]["avg_reward"], reverse=True)
+    return merged
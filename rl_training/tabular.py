@@ -0,0 +1,288 @@
+"""
+Dense, index-encoded value tables for discrete observation spaces.
+
+The MC notebook used ``defaultdict(lambda: np.zeros(2))`` keyed by observation
+tuples and kept every return in a list to average it. The tables here store
+Q/V values and visit counts in preallocated arrays instead: an observation is
+mapped to a row with a precomputed index, updates are incremental running
+means (or constant-α steps), and whole batches of updates are scattered in
+with a few array operations.
+
+``QTable`` and ``VTable`` keep the mapping interface the notebook code relies
+on (``Q[state][action]``, ``state in Q``, ``len(Q)``, ``Q.items()``), so they
+drop into the existing functions.
+"""
+
+import itertools
+
+import numpy as np
+
+
+class StateIndexer:
+    """Bijection between observations of a Discrete / Tuple(Discrete...) space and 0..n_states-1"""
+
+    def __init__(self, dims, starts=None):
+        """
+        Args:
+            dims: Size of every component, e.g. (32, 11, 2) for Blackjack;
+                a single int for a Discrete space
+            starts: Smallest value of every component (Discrete ``start``)
+        """
+        self.scalar = np.ndim(dims) == 0
+        self.dims = tuple(int(d) for d in np.atleast_1d(dims))
+        self.starts = np.zeros(len(self.dims), dtype=np.int64) if starts is None \
+            else np.atleast_1d(np.asarray(starts, dtype=np.int64))
+        self.n_states = int(np.prod(self.dims))
+        # Row-major strides: (32, 11, 2) -> (22, 2, 1)
+        self.strides = np.cumprod((1,) + self.dims[:0:-1])[::-1].astype(np.int64)
+
+        # Precomputed observation -> index lookup for tuple spaces
+        self._index = None
+        if not self.scalar:
+            ranges = [range(s, s + d) for s, d in zip(self.starts, self.dims)]
+            self._index = {obs: i for i, obs in enumerate(itertools.product(*ranges))}
+
+    @classmethod
+    def from_space(cls, space):
+        """Build an indexer for a gymnasium Discrete or Tuple-of-Discrete space"""
+        if hasattr(space, "spaces"):
+            return cls([s.n for s in space.spaces], [s.start for s in space.spaces])
+        return cls(space.n, [space.start])
+
+    def encode(self, obs):
+        """Index of a single observation"""
+        if self.scalar:
+            return int(obs) - int(self.starts[0])
+        return self._index[tuple(obs)]
+
+    def encode_batch(self, *columns):
+        """Indices of a batch of observations given one array per component"""
+        index = np.zeros(np.shape(columns[0]), dtype=np.int64)
+        for column, start, stride in zip(columns, self.starts, self.strides):
+            index += (np.asarray(column) - start) * stride
+        return index
+
+    def decode(self, index):
+        """Observation for an index, in the same form the env returns it"""
+        components = []
+        for start, stride, dim in zip(self.starts, self.strides, self.dims):
+            components.append(int(index // stride % dim + start))
+        return components[0] if self.scalar else tuple(components)
+
+
+def constant_alpha_update(values, rows, targets, alpha):
+    """
+    Apply v ← v + α[G - v] to ``values[rows]`` for a batch of targets, in order
+
+    Repeated updates of the same entry compose to
+    (1-α)^k v + Σ_i α(1-α)^(k-1-i) G_i, so the result is identical to applying
+    the updates one by one but costs a handful of array operations.
+
+    Args:
+        values: Flat value array, updated in place
+        rows: Flat indices into ``values`` [n_updates]
+        targets: Targets in the order they would be applied [n_updates]
+        alpha: Step size
+    """
+    order = np.argsort(rows, kind="stable")
+    rows, targets = rows[order], targets[order]
+
+    entries, starts, counts = np.unique(rows, return_index=True, return_counts=True)
+    # Number of later updates to the same entry
+    later = np.repeat(starts + counts, counts) - 1 - np.arange(len(rows))
+    contributions = np.bincount(rows, weights=alpha * (1 - alpha) ** later * targets,
+                                minlength=len(values))
+    values[entries] = (1 - alpha) ** counts * values[entries] + contributions[entries]
+
+
+def running_mean_update(values, counts, rows, targets):
+    """
+    Fold a batch of samples into running means: v ← (N·v + ΣG) / (N + k)
+
+    Args:
+        values: Flat mean array, updated in place
+        counts: Flat sample-count array, updated in place
+        rows: Flat indices into ``values`` [n_samples]
+        targets: Samples [n_samples]
+    """
+    sums = np.bincount(rows, weights=targets, minlength=len(values))
+    added = np.bincount(rows, minlength=len(values))
+    touched = np.flatnonzero(added)
+    total = counts[touched] + added[touched]
+    values[touched] += (sums[touched] - added[touched] * values[touched]) / total
+    counts[touched] = total
+
+
+class _Table:
+    """Shared mapping interface over the visited rows of a dense table"""
+
+    def __init__(self, indexer, shape):
+        self.indexer = indexer
+        self.values = np.zeros(shape)
+        self.counts = np.zeros(shape, dtype=np.int64)
+        self.visited = np.zeros(indexer.n_states, dtype=bool)
+
+    @classmethod
+    def from_arrays(cls, indexer, values, counts, visited):
+        """Wrap existing arrays (e.g. memory-mapped ones) without copying them"""
+        table = cls.__new__(cls)
+        table.indexer = indexer
+        table.values = values
+        table.counts = counts
+        table.visited = visited
+        return table
+
+    def __contains__(self, state):
+        try:
+            return bool(self.visited[self.indexer.encode(state)])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return False
+
+    def __len__(self):
+        return int(np.count_nonzero(self.visited))
+
+    def __iter__(self):
+        return (self.indexer.decode(i) for i in np.flatnonzero(self.visited))
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(self.indexer.decode(i), self.values[i]) for i in np.flatnonzero(self.visited)]
+
+    def to_dict(self):
+        return {state: np.copy(value) if np.ndim(value) else float(value)
+                for state, value in self.items()}
+
+
+class QTable(_Table):
+    """Q(s,a) and visit counts N(s,a) in dense [n_states, n_actions] arrays"""
+
+    def __init__(self, indexer, n_actions):
+        super().__init__(indexer, (indexer.n_states, n_actions))
+        self.n_actions = n_actions
+
+    @classmethod
+    def from_arrays(cls, indexer, values, counts, visited):
+        table = super().from_arrays(indexer, values, counts, visited)
+        table.n_actions = values.shape[1]
+        return table
+
+    def __getitem__(self, state):
+        """Row view Q[state] - writes through, and marks the state as visited"""
+        index = self.indexer.encode(state)
+        self.visited[index] = True
+        return self.values[index]
+
+    def update(self, state, action, target, alpha=None):
+        """
+        Move Q(s,a) towards a target
+
+        Args:
+            state: Observation
+            action: Action
+            target: Return G
+            alpha: Constant step size, or None for the running mean 1/N(s,a)
+        """
+        index = self.indexer.encode(state)
+        self.visited[index] = True
+        self.counts[index, action] += 1
+        step = 1.0 / self.counts[index, action] if alpha is None else alpha
+        self.values[index, action] += step * (target - self.values[index, action])
+
+    def update_batch(self, states, actions, targets, alpha=None):
+        """
+        Scatter a batch of updates into the table
+
+        Args:
+            states: Encoded state indices [batch]
+            actions: Actions [batch]
+            targets: Returns, in the order they would be applied [batch]
+            alpha: Constant step size, or None for running means
+        """
+        rows = np.asarray(states) * self.n_actions + np.asarray(actions)
+        if alpha is None:
+            running_mean_update(self.values.reshape(-1), self.counts.reshape(-1), rows, targets)
+        else:
+            constant_alpha_update(self.values.reshape(-1), rows, targets, alpha)
+            np.add.at(self.counts.reshape(-1), rows, 1)
+        self.visited[states] = True
+
+    def greedy_actions(self):
+        """argmax_a Q(s,a) for every state (ties go to the lowest action) [n_states]"""
+        return np.argmax(self.values, axis=1)
+
+    def greedy_policy(self, default_action=0):
+        """Deterministic greedy policy over the visited states"""
+        return TabularPolicy(self.indexer, self.greedy_actions(), self.visited.copy(), default_action)
+
+
+class VTable(_Table):
+    """V(s) and visit counts N(s) in dense [n_states] arrays"""
+
+    def __init__(self, indexer):
+        super().__init__(indexer, indexer.n_states)
+
+    def __getitem__(self, state):
+        return float(self.values[self.indexer.encode(state)])
+
+    def update(self, state, target):
+        """Fold one return into the running mean of V(state)"""
+        index = self.indexer.encode(state)
+        self.visited[index] = True
+        self.counts[index] += 1
+        self.values[index] += (target - self.values[index]) / self.counts[index]
+
+    def update_batch(self, states, targets):
+        """Fold a batch of returns into the running means [batch]"""
+        running_mean_update(self.values, self.counts, np.asarray(states), targets)
+        self.visited[states] = True
+
+
+class TabularPolicy:
+    """Deterministic policy stored as one action per state index"""
+
+    def __init__(self, indexer, actions, known=None, default_action=0):
+        """
+        Args:
+            indexer: StateIndexer of the observation space
+            actions: Action for every state index [n_states]
+            known: States the policy was learned for (others fall back to
+                ``default_action``); all states when None
+            default_action: Action returned for unknown states
+        """
+        self.indexer = indexer
+        self.actions = np.asarray(actions, dtype=np.int64)
+        self.known = np.ones(len(self.actions), dtype=bool) if known is None else np.asarray(known)
+        self.default_action = default_action
+        # Unknown states answer with the default, so batched lookups need no mask
+        self.table = np.where(self.known, self.actions, default_action)
+
+    def __getitem__(self, state):
+        return int(self.table[self.indexer.encode(state)])
+
+    def __contains__(self, state):
+        try:
+            return bool(self.known[self.indexer.encode(state)])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return False
+
+    def __len__(self):
+        return int(np.count_nonzero(self.known))
+
+    def __iter__(self):
+        return (self.indexer.decode(i) for i in np.flatnonzero(self.known))
+
+    def get(self, state, default=None):
+        try:
+            index = self.indexer.encode(state)
+        except (KeyError, IndexError, TypeError, ValueError):
+            return default
+        return int(self.actions[index]) if self.known[index] else default
+
+    def items(self):
+        return [(self.indexer.decode(i), int(self.actions[i])) for i in np.flatnonzero(self.known)]
+
+    def __call__(self, state):
+        """Use the policy directly as ``policy(state)``, e.g. with test_policy"""
+        return int(self.table[self.indexer.encode(state)])
@@ -0,0 +1,221 @@
+"""
+Online temporal-difference control for discrete gymnasium envs.
+
+Q-learning, SARSA and Expected SARSA share one engine, ``td_control``. It
+steps ``num_envs`` copies of the env through ``gymnasium.vector`` and updates
+a preallocated ``QTable`` after every step: ε-greedy actions for all envs
+come from one argmax over the table, the TD targets of all envs are computed
+with a few array operations, and the updates are scattered in with
+``constant_alpha_update``. Nothing is buffered per episode; only the episode
+returns go into a ``LearningCurve``.
+
+Works with any env whose observation space is Discrete or a Tuple of
+Discrete spaces (FrozenLake, Taxi, CliffWalking, Blackjack). The returned
+``QTable`` plugs into ``extract_policy`` / ``test_policy`` from
+``rl_training.monte_carlo``.
+
+``alpha`` and ``epsilon`` can be constants or schedules - callables mapping
+the number of completed episodes to a value, e.g. ``linear_schedule``.
+"""
+
+import numpy as np
+
+from rl_training.curves import LearningCurve
+from rl_training.evaluation import _encode_observations, make_vector_env
+from rl_training.lazy import progress as progress_bar
+from rl_training.profiling import NULL_PROFILER
+from rl_training.tabular import QTable, StateIndexer
+
+TD_METHODS = ("q_learning", "sarsa", "expected_sarsa")
+
+
+def constant_schedule(value):
+    """Schedule that always returns ``value``"""
+    return lambda episode: value
+
+
+def linear_schedule(start, end, duration):
+    """Interpolate from ``start`` to ``end`` over ``duration`` episodes, then stay at ``end``"""
+    def schedule(episode):
+        return end + (start - end) * max(1.0 - episode / duration, 0.0)
+    return schedule
+
+
+def exponential_schedule(start, end=0.0, decay=0.999):
+    """``start * decay**episode``, never below ``end``"""
+    return lambda episode: max(start * decay ** episode, end)
+
+
+def _as_schedule(value):
+    return value if callable(value) else constant_schedule(value)
+
+
+def epsilon_greedy_batch(values, states, epsilon, rng):
+    """
+    Vectorized ε-greedy action selection with random tie-breaking
+
+    Unlike ``blackjack.epsilon_greedy_actions`` (ties to the highest action,
+    as in the MC notebook), ties between greedy actions are broken at random,
+    so that a fresh all-zero table does not send every env the same way.
+
+    Args:
+        values: Q table [n_states, n_actions]
+        states: Encoded states [batch]
+        epsilon: Exploration rate
+        rng: numpy Generator
+
+    Returns:
+        actions: [batch]
+    """
+    q = values[states]
+    ties = q == q.max(axis=1, keepdims=True)
+    greedy = np.argmax(ties * rng.random(q.shape), axis=1)
+    explore = rng.random(len(states)) < epsilon
+    return np.where(explore, rng.integers(0, q.shape[1], size=len(states)), greedy)
+
+
+def td_targets(method, values, rewards, next_states, next_actions, terminated, gamma, epsilon):
+    """
+    One-step TD targets r + γ·(value of s') for a batch of transitions
+
+    Args:
+        method: 'q_learning' (max_a Q(s',a)), 'sarsa' (Q(s',a') for the
+            action actually chosen next) or 'expected_sarsa' (expectation of
+            Q(s',·) under the ε-greedy policy)
+        values: Q table [n_states, n_actions]
+        rewards: [batch]
+        next_states: Encoded next states [batch]
+        next_actions: Actions chosen in the next states [batch]
+        terminated: No bootstrapping where True (truncated episodes still
+            bootstrap) [batch]
+        gamma: Discount factor
+        epsilon: Exploration rate of the behaviour policy
+
+    Returns:
+        targets: [batch]
+    """
+    q_next = values[next_states]
+    if method == "q_learning":
+        next_value = q_next.max(axis=1)
+    elif method == "sarsa":
+        next_value = q_next[np.arange(len(next_states)), next_actions]
+    elif method == "expected_sarsa":
+        # ε/n on every action plus (1-ε) on the greedy ones (ties all have the max value)
+        next_value = epsilon * q_next.mean(axis=1) + (1.0 - epsilon) * q_next.max(axis=1)
+    else:
+        raise ValueError(f"Unknown TD method '{method}', expected one of {TD_METHODS}")
+    return rewards + gamma * np.where(terminated, 0.0, next_value)
+
+
+def td_control(env, num_episodes=10000, method="q_learning", alpha=0.1, epsilon=0.1, gamma=0.99,
+               num_envs=16, seed=None, vectorization_mode="sync", max_episode_steps=None,
+               verbose=True, curve_window=1000, profiler=NULL_PROFILER):
+    """
+    Learn Q online with one-step TD updates on a vector of envs
+
+    Every step updates Q(s,a) ← Q(s,a) + α[target - Q(s,a)] for the
+    transitions of all envs at once (see ``td_targets``). The transitions of
+    one step are applied in env order, each target computed from Q before
+    the step. gymnasium's autoreset steps (the reset that follows a finished
+    episode) carry no transition and are skipped.
+
+    Args:
+        env: Env id, EnvSpec or env to copy (see ``make_vector_env``)
+        num_episodes: Episodes to learn from (counted as they finish)
+        method: 'q_learning', 'sarsa' or 'expected_sarsa'
+        alpha: Step size, or a schedule episode -> step size
+        epsilon: Exploration rate, or a schedule episode -> exploration rate
+        gamma: Discount factor
+        num_envs: Envs stepped together
+        seed: Seeds the envs (env i gets seed + i) and the action sampling
+        vectorization_mode: 'sync' or 'async' (see ``make_vector_env``)
+        max_episode_steps: Override the env's time limit
+        verbose: Show a progress bar and the final throughput
+        curve_window: Episodes in the moving window of the returned curve
+        profiler: rl_training.profiling.Profiler timing 'env.step',
+            'policy' and 'learn', and the latency of every episode (from
+            its env's reset to the step that ends it)
+
+    Returns:
+        (Q, curve): QTable and the LearningCurve of the episode returns
+    """
+    if method not in TD_METHODS:
+        raise ValueError(f"Unknown TD method '{method}', expected one of {TD_METHODS}")
+    alpha_at, epsilon_at = _as_schedule(alpha), _as_schedule(epsilon)
+    rng = np.random.default_rng(seed)
+
+    envs = make_vector_env(env, num_envs, vectorization_mode, max_episode_steps)
+    indexer = StateIndexer.from_space(envs.single_observation_space)
+    Q = QTable(indexer, int(envs.single_action_space.n))
+    curve = LearningCurve(curve_window)
+
+    returns = np.zeros(num_envs)
+    # Envs whose next step is gymnasium's autoreset step (no transition)
+    autoreset = np.zeros(num_envs, dtype=bool)
+    episodes = steps = 0
+    progress = progress_bar(total=num_episodes) if verbose else None
+
+    try:
+        observations, _ = envs.reset(seed=seed)
+        # When each env's current episode started, for the profiler's episode latencies
+        episode_starts = [profiler.now()] * num_envs
+        states = _encode_observations(indexer, observations)
+        actions = epsilon_greedy_batch(Q.values, states, epsilon_at(0), rng)
+        while episodes < num_episodes:
+            t = profiler.now()
+            observations, rewards, terminated, truncated, _ = envs.step(actions)
+            t = profiler.lap("env.step", t)
+
+            epsilon_now = epsilon_at(episodes)
+            next_states = _encode_observations(indexer, observations)
+            next_actions = epsilon_greedy_batch(Q.values, next_states, epsilon_now, rng)
+            t = profiler.lap("policy", t)
+
+            active = np.flatnonzero(~autoreset)
+            targets = td_targets(method, Q.values, rewards[active], next_states[active],
+                                 next_actions[active], terminated[active], gamma, epsilon_now)
+            Q.update_batch(states[active], actions[active], targets, alpha=alpha_at(episodes))
+            returns[active] += rewards[active]
+            steps += len(active)
+
+            finished = np.flatnonzero((terminated | truncated) & ~autoreset)
+            if len(finished):
+                finished = finished[:num_episodes - episodes]
+                curve.update_many(returns[finished])
+                returns[finished] = 0.0
+                episodes += len(finished)
+                if profiler.enabled:
+                    for i in finished:
+                        profiler.end_episode(start_ns=episode_starts[i])
+                        episode_starts[i] = profiler.now()
+                if progress is not None:
+                    progress.update(len(finished))
+            autoreset = terminated | truncated
+            states, actions = next_states, next_actions
+            profiler.lap("learn", t)
+            profiler.step(len(active))
+    finally:
+        envs.close()
+        if progress is not None:
+            progress.close()
+
+    if verbose:
+        elapsed = progress.format_dict["elapsed"]
+        print(f"{method}: {episodes} episodes, {steps} steps"
+              + (f" ({steps / elapsed:,.0f} steps/s)" if elapsed else ""))
+    return Q, curve
+
+
+def q_learning(env, num_episodes=10000, **kwargs):
+    """Off-policy TD control: bootstrap from max_a Q(s',a) (see ``td_control``)"""
+    return td_control(env, num_episodes, "q_learning", **kwargs)
+
+
+def sarsa(env, num_episodes=10000, **kwargs):
+    """On-policy TD control: bootstrap from Q(s',a') (see ``td_control``)"""
+    return td_control(env, num_episodes, "sarsa", **kwargs)
+
+
+def expected_sarsa(env, num_episodes=10000, **kwargs):
+    """TD control bootstrapping from E_π[Q(s',·)] (see ``td_control``)"""
+    return td_control(env, num_episodes, "expected_sarsa", **kwargs)